@@ -3,6 +3,8 @@ from .client import (  # NOQA
     UserCapability,
     PAGE_SIZE
 )
+from .capabilities_cache import CapabilitiesCache  # NOQA
+from .catalog_mirror import CatalogMirror  # NOQA
 from .data_browser import DataBrowserQuery  # NOQA
 from .dataset import Dataset  # NOQA
 from .publisher import Publisher, PublisherTheme  # NOQA
@@ -19,9 +21,12 @@ from .enums import (  # NOQA
     Capability,
     PublicAccessType,
     PublisherType,
-    UserDatasetCapability
+    UserDatasetCapability,
+    RequestPriority
 )
 from .layer_utils import LayerUtils  # NOQA
+from .query_cache import QueryResultCache  # NOQA
 from .repo import Repo  # NOQA
+from .request_engine import ApiRequest, RequestEngine  # NOQA
 from .utils import ApiUtils  # NOQA
 from .explore_section import ExploreSection  # NOQA
@@ -0,0 +1,243 @@
+import hashlib
+import os
+import sqlite3
+from typing import (
+    Dict,
+    Optional
+)
+
+from qgis.PyQt.QtCore import (
+    QDateTime,
+    QUrl
+)
+from qgis.PyQt.QtNetwork import (
+    QNetworkCacheMetaData,
+    QNetworkRequest
+)
+from qgis.core import (
+    QgsApplication,
+    QgsNetworkAccessManager
+)
+
+
+class CapabilitiesCache:
+    """
+    A persistent on-disk cache for WMTS capabilities documents.
+
+    Documents are keyed by their capabilities URL and are stored with a
+    version string derived from the dataset they were retrieved for, so
+    that a document is refetched when its dataset is republished.
+
+    Cached documents are seeded into the QGIS network cache before a
+    layer is created from them, so that the WMS provider reads the
+    capabilities locally instead of making a blocking request.
+    """
+
+    # increment to invalidate all previously cached documents
+    FORMAT_VERSION = 1
+    DEFAULT_MAX_DOCUMENTS = 500
+
+    # lookups are frequent (e.g. when hovering over add buttons), so
+    # access times are only written to the database in batches
+    ACCESS_FLUSH_COUNT = 50
+
+    # the time a seeded document remains fresh in the QGIS network cache
+    NETWORK_CACHE_LIFETIME_SECONDS = 60 * 60
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_documents: int = DEFAULT_MAX_DOCUMENTS):
+        self._path = path or CapabilitiesCache.default_path()
+        self._max_documents = max_documents
+        self._connection: Optional[sqlite3.Connection] = None
+        # access clock used to order documents by recency of use
+        self._access_clock = 0
+        # access times which haven't been written yet, by key
+        self._pending_access: Dict[str, int] = {}
+
+    @staticmethod
+    def default_path() -> str:
+        """
+        Returns the default location for the cache database
+        """
+        return os.path.join(QgsApplication.qgisSettingsDirPath(),
+                            'koordinates',
+                            'capabilities_cache.sqlite')
+
+    @staticmethod
+    def cache_key(url: str) -> str:
+        """
+        Returns the cache key for a capabilities URL.
+
+        Capabilities URLs include the API key, so only a hash of the
+        URL is stored.
+        """
+        return hashlib.sha256(url.encode()).hexdigest()
+
+    @staticmethod
+    def version_for_details(details: dict) -> str:
+        """
+        Returns the version string for a dataset's capabilities, from
+        the dataset details
+        """
+        return '{}|{}'.format(
+            CapabilitiesCache.FORMAT_VERSION,
+            details.get('published_at') or details.get('updated_at') or ''
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the database connection, creating the database if required
+        """
+        if self._connection is None:
+            if self._path != ':memory:':
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self._path)
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS capabilities (
+                key TEXT PRIMARY KEY,
+                version TEXT NOT NULL,
+                content BLOB NOT NULL,
+                last_access INTEGER NOT NULL)"""
+            )
+            self._connection.execute(
+                """CREATE INDEX IF NOT EXISTS capabilities_last_access
+                ON capabilities(last_access)"""
+            )
+            self._connection.commit()
+            self._access_clock = self._connection.execute(
+                'SELECT COALESCE(MAX(last_access), 0) FROM capabilities'
+            ).fetchone()[0]
+
+        return self._connection
+
+    def lookup(self, url: str, version: str) -> Optional[bytes]:
+        """
+        Returns the cached document for a capabilities URL, or None if
+        the URL is not cached or the cached document is for a different
+        version
+        """
+        key = CapabilitiesCache.cache_key(url)
+        row = self._db().execute(
+            'SELECT version, content FROM capabilities WHERE key=?',
+            (key,)
+        ).fetchone()
+        if row is None or row[0] != version:
+            return None
+
+        self._pending_access[key] = self._next_access()
+        if len(self._pending_access) >= CapabilitiesCache.ACCESS_FLUSH_COUNT:
+            self.flush()
+        return row[1]
+
+    def flush(self):
+        """
+        Writes any pending document access times to the database
+        """
+        if not self._pending_access:
+            return
+
+        db = self._db()
+        db.executemany(
+            'UPDATE capabilities SET last_access=? WHERE key=?',
+            [(access, key) for key, access in self._pending_access.items()]
+        )
+        db.commit()
+        self._pending_access = {}
+
+    def store(self, url: str, version: str, content: bytes):
+        """
+        Stores a document in the cache, replacing any other version of
+        the document
+        """
+        db = self._db()
+        # eviction must respect the pending access times
+        self.flush()
+        db.execute(
+            """INSERT OR REPLACE INTO capabilities
+            (key, version, content, last_access)
+            VALUES (?, ?, ?, ?)""",
+            (CapabilitiesCache.cache_key(url), version, content,
+             self._next_access())
+        )
+        self._evict()
+        db.commit()
+
+    def _next_access(self) -> int:
+        """
+        Returns the next value of the access clock used to order
+        documents by recency of use
+        """
+        self._db()
+        self._access_clock += 1
+        return self._access_clock
+
+    def count(self) -> int:
+        """
+        Returns the number of cached documents
+        """
+        return self._db().execute(
+            'SELECT COUNT(*) FROM capabilities'
+        ).fetchone()[0]
+
+    def _evict(self):
+        """
+        Evicts the least recently used documents until the cache fits
+        within the maximum document count
+        """
+        db = self._db()
+        excess = self.count() - self._max_documents
+        if excess <= 0:
+            return
+
+        db.execute(
+            """DELETE FROM capabilities WHERE key IN (
+            SELECT key FROM capabilities ORDER BY last_access LIMIT ?)""",
+            (excess,)
+        )
+
+    def clear(self):
+        """
+        Removes all documents from the cache
+        """
+        db = self._db()
+        db.execute('DELETE FROM capabilities')
+        db.commit()
+        self._pending_access = {}
+
+    @staticmethod
+    def seed_network_cache(url: str, content: bytes) -> bool:
+        """
+        Inserts a capabilities document into the QGIS network cache, so
+        that requests for the URL which prefer cached content (such as
+        the WMS provider's capabilities request) are answered locally.
+
+        Returns False if the network cache is not available.
+        """
+        cache = QgsNetworkAccessManager.instance().cache()
+        if cache is None:
+            return False
+
+        meta_data = QNetworkCacheMetaData()
+        meta_data.setUrl(QUrl(url))
+        meta_data.setSaveToDisk(True)
+        meta_data.setExpirationDate(
+            QDateTime.currentDateTimeUtc().addSecs(
+                CapabilitiesCache.NETWORK_CACHE_LIFETIME_SECONDS))
+        meta_data.setRawHeaders([
+            (b'Content-Type', b'application/xml'),
+            (b'Content-Length', str(len(content)).encode())
+        ])
+        meta_data.setAttributes({
+            QNetworkRequest.HttpStatusCodeAttribute: 200,
+            QNetworkRequest.HttpReasonPhraseAttribute: 'OK'
+        })
+
+        device = cache.prepare(meta_data)
+        if device is None:
+            return False
+
+        device.write(content)
+        cache.insert(device)
+        return True
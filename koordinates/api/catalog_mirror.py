@@ -0,0 +1,299 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+
+from qgis.core import (
+    QgsApplication,
+    QgsSettings
+)
+
+from .utils import ApiUtils
+
+
+class CatalogMirror:
+    """
+    An optional persistent local mirror of the catalog.
+
+    Every dataset, publisher and set of facets retrieved from the API is
+    recorded in a SQLite database, together with an FTS5 full text index
+    over the dataset title, description and publisher name. This allows
+    searches to be answered locally while the server results are
+    retrieved, and allows previously seen datasets to be browsed offline.
+
+    Each account uses a separate database, so that private datasets are
+    never shown to other accounts.
+    """
+
+    ENABLED_SETTING = "koordinates/catalog_mirror_enabled"
+    DEFAULT_MAX_DATASETS = 20000
+
+    # relative weights of the title, description and publisher name
+    # columns when ranking search results
+    RANK_WEIGHTS = (10.0, 1.0, 5.0)
+
+    _available: Optional[bool] = None
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 max_datasets: int = DEFAULT_MAX_DATASETS):
+        self._path = path or CatalogMirror.default_path()
+        self._max_datasets = max_datasets
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @staticmethod
+    def default_path(auth: Optional[str] = None) -> str:
+        """
+        Returns the default location for the mirror database for the
+        specified authentication header
+        """
+        auth_hash = hashlib.sha256((auth or '').encode()).hexdigest()
+        return os.path.join(QgsApplication.qgisSettingsDirPath(),
+                            'koordinates',
+                            'catalog_{}.sqlite'.format(auth_hash[:16]))
+
+    @staticmethod
+    def is_enabled() -> bool:
+        """
+        Returns True if the catalog mirror is enabled
+        """
+        return QgsSettings().value(CatalogMirror.ENABLED_SETTING,
+                                   False, bool, QgsSettings.Plugins)
+
+    @staticmethod
+    def set_enabled(enabled: bool):
+        """
+        Sets whether the catalog mirror is enabled
+        """
+        QgsSettings().setValue(CatalogMirror.ENABLED_SETTING,
+                               enabled, QgsSettings.Plugins)
+
+    @staticmethod
+    def is_available() -> bool:
+        """
+        Returns True if the SQLite library supports FTS5, which is
+        required for the catalog mirror
+        """
+        if CatalogMirror._available is None:
+            try:
+                connection = sqlite3.connect(':memory:')
+                connection.execute('CREATE VIRTUAL TABLE t USING fts5(a)')
+                connection.close()
+                CatalogMirror._available = True
+            except sqlite3.Error:
+                CatalogMirror._available = False
+
+        return CatalogMirror._available
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the database connection, creating the database if required
+        """
+        if self._connection is None:
+            if self._path != ':memory:':
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self._path)
+            self._connection.executescript(
+                """CREATE TABLE IF NOT EXISTS datasets (
+                row INTEGER PRIMARY KEY,
+                id TEXT NOT NULL UNIQUE,
+                publisher_id TEXT,
+                content TEXT NOT NULL,
+                last_seen INTEGER NOT NULL);
+                CREATE INDEX IF NOT EXISTS datasets_last_seen
+                ON datasets(last_seen);
+                CREATE TABLE IF NOT EXISTS publishers (
+                id TEXT PRIMARY KEY,
+                content TEXT NOT NULL);
+                CREATE TABLE IF NOT EXISTS facets (
+                key TEXT PRIMARY KEY,
+                content TEXT NOT NULL);
+                CREATE VIRTUAL TABLE IF NOT EXISTS datasets_fts USING fts5(
+                title, description, publisher_name,
+                tokenize='unicode61 remove_diacritics 2');"""
+            )
+            self._connection.commit()
+
+        return self._connection
+
+    def store_datasets(self, datasets: List[Dict]):
+        """
+        Records datasets, and their publishers, in the mirror
+        """
+        if not datasets:
+            return
+
+        db = self._db()
+        last_seen = db.execute(
+            'SELECT COALESCE(MAX(last_seen), 0) FROM datasets'
+        ).fetchone()[0]
+        for dataset in datasets:
+            dataset_id = dataset.get('id')
+            if dataset_id is None:
+                continue
+
+            last_seen += 1
+            publisher = dataset.get('publisher') or {}
+            publisher_id = publisher.get('id')
+            if publisher_id is not None:
+                db.execute(
+                    """INSERT OR REPLACE INTO publishers (id, content)
+                    VALUES (?, ?)""",
+                    (str(publisher_id), json.dumps(publisher))
+                )
+
+            values = (str(publisher_id) if publisher_id is not None else None,
+                      json.dumps(dataset),
+                      last_seen,
+                      str(dataset_id))
+            existing = db.execute('SELECT row FROM datasets WHERE id=?',
+                                  (str(dataset_id),)).fetchone()
+            if existing is not None:
+                # keep the existing row, so that the full text index
+                # entry can be updated in place
+                row = existing[0]
+                db.execute(
+                    """UPDATE datasets SET publisher_id=?, content=?,
+                    last_seen=? WHERE id=?""",
+                    values
+                )
+                db.execute('DELETE FROM datasets_fts WHERE rowid=?', (row,))
+            else:
+                row = db.execute(
+                    """INSERT INTO datasets
+                    (publisher_id, content, last_seen, id)
+                    VALUES (?, ?, ?, ?)""",
+                    values
+                ).lastrowid
+
+            db.execute(
+                """INSERT INTO datasets_fts
+                (rowid, title, description, publisher_name)
+                VALUES (?, ?, ?, ?)""",
+                (row,
+                 dataset.get('title') or '',
+                 dataset.get('description') or '',
+                 publisher.get('name') or '')
+            )
+
+        self._evict()
+        db.commit()
+
+    def _evict(self):
+        """
+        Evicts the least recently seen datasets until the mirror fits
+        within the maximum dataset count
+        """
+        db = self._db()
+        excess = self.dataset_count() - self._max_datasets
+        if excess <= 0:
+            return
+
+        rows = db.execute(
+            'SELECT row FROM datasets ORDER BY last_seen LIMIT ?',
+            (excess,)
+        ).fetchall()
+        db.executemany('DELETE FROM datasets_fts WHERE rowid=?', rows)
+        db.executemany('DELETE FROM datasets WHERE row=?', rows)
+
+    def dataset_count(self) -> int:
+        """
+        Returns the number of datasets in the mirror
+        """
+        return self._db().execute(
+            'SELECT COUNT(*) FROM datasets'
+        ).fetchone()[0]
+
+    def publisher(self, publisher_id: str) -> Optional[Dict]:
+        """
+        Returns the mirrored details for a publisher, or None if the
+        publisher has not been seen
+        """
+        row = self._db().execute(
+            'SELECT content FROM publishers WHERE id=?',
+            (str(publisher_id),)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    @staticmethod
+    def match_expression(search: Optional[str]) -> Optional[str]:
+        """
+        Converts a search string to an FTS5 match expression, which
+        matches datasets containing all of the search terms (or words
+        starting with the final search term, which may be incomplete)
+        """
+        terms = ApiUtils.search_terms(search)
+        if not terms:
+            return None
+
+        quoted = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search(self, search: Optional[str], limit: int) -> List[Dict]:
+        """
+        Returns mirrored datasets matching a search string, ordered by
+        relevance.
+
+        If the search string is empty then the most recently seen
+        datasets are returned.
+        """
+        expression = CatalogMirror.match_expression(search)
+        if expression is None:
+            rows = self._db().execute(
+                """SELECT content FROM datasets
+                ORDER BY last_seen DESC LIMIT ?""",
+                (limit,)
+            )
+        else:
+            rows = self._db().execute(
+                """SELECT datasets.content FROM datasets_fts
+                JOIN datasets ON datasets.row = datasets_fts.rowid
+                WHERE datasets_fts MATCH ?
+                ORDER BY bm25(datasets_fts, ?, ?, ?) LIMIT ?""",
+                (expression, *CatalogMirror.RANK_WEIGHTS, limit)
+            )
+
+        return [json.loads(row[0]) for row in rows]
+
+    def store_facets(self, key: str, facets: Dict):
+        """
+        Records the facets for a query key in the mirror
+        """
+        db = self._db()
+        db.execute('INSERT OR REPLACE INTO facets (key, content) VALUES (?, ?)',
+                   (key, json.dumps(facets)))
+        db.commit()
+
+    def facets(self, key: str) -> Optional[Dict]:
+        """
+        Returns the mirrored facets for a query key, or None if the
+        facets have not been seen
+        """
+        row = self._db().execute(
+            'SELECT content FROM facets WHERE key=?', (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return json.loads(row[0])
+
+    def clear(self):
+        """
+        Removes all content from the mirror
+        """
+        db = self._db()
+        db.execute('DELETE FROM datasets_fts')
+        db.execute('DELETE FROM datasets')
+        db.execute('DELETE FROM publishers')
+        db.execute('DELETE FROM facets')
+        db.commit()
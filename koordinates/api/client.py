@@ -1,6 +1,9 @@
 import json
+import weakref
 from enum import Enum
 from typing import (
+    Callable,
+    List,
     Optional,
     Tuple,
     Dict,
@@ -12,7 +15,8 @@ from qgis.PyQt import sip
 from qgis.PyQt.QtCore import (
     pyqtSignal,
     QObject,
-    QUrl
+    QUrl,
+    QUrlQuery
 )
 from qgis.PyQt.QtNetwork import (
     QNetworkRequest,
@@ -29,9 +33,23 @@ from .utils import ApiUtils
 from .repo import Repo
 from .enums import (
     DataType,
-    PublisherType
+    PublisherType,
+    RequestPriority
 )
+from .capabilities_cache import CapabilitiesCache
+from .catalog_mirror import CatalogMirror
 from .dataset import Dataset
+from .extent_index import DatasetExtentIndex
+from .metadata_cache import (
+    CachedMetadata,
+    MetadataCache
+)
+from .query_cache import QueryResultCache
+from .request_engine import (
+    ApiRequest,
+    ReplyContent,
+    RequestEngine
+)
 
 PAGE_SIZE = 20
 
@@ -52,6 +70,9 @@ class KoordinatesClient(QObject):
 
     BASE64_ENCODED_SVG_HEADER = 'data:image/svg+xml;base64,'
 
+    # headers which are ignored when coalescing identical requests
+    CONDITIONAL_HEADERS = {b'If-None-Match', b'If-Modified-Since'}
+
     __instance = None
 
     @staticmethod
@@ -72,15 +93,25 @@ class KoordinatesClient(QObject):
         self._explore_sections_reply: Optional[QNetworkReply] = None
         self._data_options_reply: Optional[QNetworkReply] = None
 
+        self._request_engine = RequestEngine(parent=self)
+        self._metadata_cache: Optional[MetadataCache] = None
+        self._capabilities_cache: Optional[CapabilitiesCache] = None
+        self._query_result_cache = QueryResultCache()
+        self._catalog_mirror: Optional[CatalogMirror] = None
+        self._extent_index = DatasetExtentIndex()
+
         self.layers = {}
         self._dataset_details = {}
+        # shared Dataset objects, by dataset ID
+        self._datasets: Dict[str, Dataset] = weakref.WeakValueDictionary()
+        self._repositories: Dict[str, Dict] = {}
+        self._pending_requests: Dict[Tuple, ApiRequest] = {}
         self._categories = None
 
         self.reset_domain()
 
         self.apiKey = None
         self.headers = {}
-        self._datasets = None
         self._user_details = None
 
     def reset_domain(self):
@@ -90,6 +121,16 @@ class KoordinatesClient(QObject):
     def login(self, apiKey):
         self.headers = {"Authorization": f"key {apiKey}"}
 
+        # repository user capabilities and dataset permissions are
+        # specific to the logged in user
+        self._repositories = {}
+        self._datasets = weakref.WeakValueDictionary()
+        self._dataset_details = {}
+        self._query_result_cache.clear()
+        self._extent_index.clear()
+        # each account has its own catalog mirror
+        self._catalog_mirror = None
+
         try:
             self._user_details = self._get("users/me/")['json']
         except Exception:
@@ -182,6 +223,10 @@ class KoordinatesClient(QObject):
         if not is_facets:
             params.update({"page_size": PAGE_SIZE, "page": page})
         else:
+            # facets don't depend on the result order, so leave it out
+            # to allow facets to be reused when only the order changes
+            for param in ('sort', 'country_boost', 'multiplier_boost'):
+                params.pop(param, None)
             params['facets'] = True
 
         context = context or {"type": "site", "domain": "all"}
@@ -274,30 +319,220 @@ class KoordinatesClient(QObject):
             network_request, b"OPTIONS", None
         )
 
-    def datasets_async(self,
-                       page=1,
-                       query: Optional[DataBrowserQuery] = None,
-                       context=None) -> QNetworkReply:
+    def datasets_query_key(self,
+                           page=1,
+                           query: Optional[DataBrowserQuery] = None,
+                           context=None,
+                           is_facets: bool = False) -> str:
         """
-        Retrieve datasets asynchronously
+        Returns the canonical query result cache key for a datasets
+        request
+        """
+        endpoint, _, params = self._build_datasets_request(
+            page, query, context, is_facets=is_facets)
+        return QueryResultCache.canonical_key(
+            endpoint, params, self.domain, self.headers.get('Authorization'))
+
+    def query_result_cache(self) -> QueryResultCache:
+        """
+        Returns the in-memory cache of recent query results
+        """
+        return self._query_result_cache
+
+    def datasets_async(
+            self,
+            page=1,
+            query: Optional[DataBrowserQuery] = None,
+            context=None,
+            callback: Optional[Callable[[Tuple[List[Dict], str, bool]],
+                                        None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve a page of datasets asynchronously.
+
+        The result is a tuple of the datasets, the total count of
+        datasets and whether the page is the last page. Results are
+        parsed on a worker thread.
         """
         endpoint, headers, params = self._build_datasets_request(page, query, context)
         network_request = self._build_request(endpoint, headers, params)
+        request = self._submit(network_request,
+                               KoordinatesClient._parse_datasets_page_reply,
+                               callback=callback,
+                               priority=priority,
+                               threaded=True,
+                               shared_callback=self._datasets_page_retrieved)
+        return request
+
+    def _datasets_page_retrieved(
+            self,
+            result: Optional[Tuple[List[Dict], str, bool]]):
+        """
+        Called when a page of datasets has been retrieved
+        """
+        if result is None:
+            return
 
-        return QgsNetworkAccessManager.instance().get(network_request)
+        self._extent_index.add_datasets(result[0])
+        mirror = self.catalog_mirror()
+        if mirror is not None:
+            mirror.store_datasets(result[0])
 
-    def facets_async(self,
-                     page=1,
-                     query: Optional[DataBrowserQuery] = None,
-                     context=None) -> QNetworkReply:
+    def extent_index(self) -> DatasetExtentIndex:
         """
-        Retrieve dataset facets asynchronously
+        Returns the spatial index of retrieved dataset extents
         """
-        endpoint, headers, params = self._build_datasets_request(page, query, context,
-                                                                 is_facets=True)
-        network_request = self._build_request(endpoint, headers, params)
+        return self._extent_index
 
-        return QgsNetworkAccessManager.instance().get(network_request)
+    @staticmethod
+    def _is_local_context(context) -> bool:
+        """
+        Returns True if queries for a context can be answered locally,
+        i.e. the context is the whole catalog
+        """
+        return context is None or context == {"type": "site",
+                                              "domain": "all"}
+
+    def datasets_in_extent(self,
+                           query: DataBrowserQuery,
+                           context=None) -> Optional[Tuple[List[Dict], bool]]:
+        """
+        Returns the datasets matching a query with an extent from the
+        local extent index.
+
+        The result is a tuple of the matching datasets and whether the
+        datasets are the complete results for the query. If not, the
+        datasets are only approximate matches for the search string and
+        the server must still be queried. None is returned if the query
+        can't be answered locally, i.e. it has no extent or has filters
+        other than the search string.
+        """
+        if query.extent is None or query.has_filters() or \
+                not self._is_local_context(context):
+            return None
+
+        datasets = self._extent_index.covered_datasets(query.extent,
+                                                       query.search)
+        is_complete = datasets is not None
+        if not is_complete:
+            datasets = self._extent_index.intersecting(query.extent,
+                                                       query.search)
+
+        return ApiUtils.sort_datasets(datasets, query.order), is_complete
+
+    def extent_query_completed(self,
+                               query: DataBrowserQuery,
+                               datasets: List[Dict],
+                               context=None):
+        """
+        Called when all results for a query have been retrieved, so that
+        the same query within the query's extent can be answered locally
+        in future
+        """
+        if query.extent is None or query.has_filters() or \
+                not self._is_local_context(context):
+            return
+
+        self._extent_index.mark_covered(query.extent, query.search, datasets)
+
+    def catalog_mirror(self) -> Optional[CatalogMirror]:
+        """
+        Returns the local catalog mirror for the current account, or None
+        if the mirror is not enabled
+        """
+        if not CatalogMirror.is_enabled() or not CatalogMirror.is_available():
+            return None
+
+        if self._catalog_mirror is None:
+            self._catalog_mirror = CatalogMirror(
+                CatalogMirror.default_path(self.headers.get('Authorization'))
+            )
+
+        return self._catalog_mirror
+
+    def mirrored_datasets(self,
+                          query: Optional[DataBrowserQuery] = None,
+                          context=None) -> Optional[List[Dict]]:
+        """
+        Returns a page of datasets matching a query from the local catalog
+        mirror.
+
+        The mirror can only answer queries which search the whole catalog
+        without any other filters, so None is returned for other queries
+        (or if the mirror is not enabled).
+        """
+        mirror = self.catalog_mirror()
+        if mirror is None:
+            return None
+
+        if not self._is_local_context(context) or (
+                query is not None and (query.has_filters() or
+                                       query.extent is not None)):
+            return None
+
+        return mirror.search(query.search if query else None, PAGE_SIZE)
+
+    def mirrored_facets(self,
+                        query: Optional[DataBrowserQuery] = None,
+                        context=None) -> Optional[Dict]:
+        """
+        Returns the dataset facets for a query from the local catalog
+        mirror, or None if they are not available
+        """
+        mirror = self.catalog_mirror()
+        if mirror is None:
+            return None
+
+        return mirror.facets(self.datasets_query_key(query=query,
+                                                     context=context,
+                                                     is_facets=True))
+
+    def facets_async(
+            self,
+            query: Optional[DataBrowserQuery] = None,
+            context=None,
+            callback: Optional[Callable[[Dict], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve dataset facets asynchronously.
+
+        Facets are cached in the query result cache, so repeated queries
+        (or queries which differ only in their order) don't require
+        another request. Results are parsed on a worker thread.
+        """
+        key = self.datasets_query_key(query=query, context=context,
+                                      is_facets=True)
+        cached = self._query_result_cache.lookup(key)
+        if cached is not None:
+            # facets are only used to tweak the filter choices, so there's
+            # no need to revalidate stale results
+            request = ApiRequest.completed(cached.value)
+        else:
+            endpoint, headers, params = self._build_datasets_request(
+                query=query, context=context, is_facets=True)
+            network_request = self._build_request(endpoint, headers, params)
+            request = self._submit(network_request,
+                                   KoordinatesClient._parse_facets_reply,
+                                   priority=priority,
+                                   threaded=True,
+                                   shared_callback=partial(
+                                       self._facets_retrieved, key))
+
+        if callback is not None:
+            request.add_callback(callback)
+        return request
+
+    def _facets_retrieved(self, key: str, facets: Optional[Dict]):
+        """
+        Called when dataset facets have been retrieved
+        """
+        if facets is not None:
+            self._query_result_cache.insert(key, facets)
+            mirror = self.catalog_mirror()
+            if mirror is not None:
+                mirror.store_facets(key, facets)
 
     def explore_sections_async(self,
                                context=None) -> QNetworkReply:
@@ -351,75 +586,169 @@ class KoordinatesClient(QObject):
         Retrieve datasets blocking
         """
         endpoint, headers, params = self._build_datasets_request(page, query, context)
-        ret = self._get(endpoint, headers, params)
-
-        tokens = ret['reply'].rawHeader(b"X-Resource-Range").data().decode().split("/")
-        total = tokens[-1]
-        last = tokens[0].split("-")[-1]
-        return ret['json'], last == total
+        request = self._get_async(endpoint,
+                                  KoordinatesClient._parse_datasets_reply,
+                                  headers=headers,
+                                  params=params)
+        return self._wait_for_request(request) or ([], True)
+
+    def data_revisions_count_async(
+            self,
+            id,
+            callback: Optional[Callable[[Optional[int]], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve data revisions asynchronously
+        """
+        endpoint = "layers/{}/versions/".format(id)
+        return self._get_async(endpoint,
+                               KoordinatesClient._parse_resource_total,
+                               callback=callback,
+                               priority=priority)
 
     def data_revisions_count(self, id) -> Optional[int]:
         """
         Retrieve data revisions blocking
         """
-        params = {}
-
-        endpoint = "layers/{}/versions/".format(id)
-        headers = {}
-        headers.update(self.headers)
-
-        ret = self._get(endpoint, headers, params)
-
-        tokens = ret['reply'].rawHeader(b"X-Resource-Range").data().decode().split("/")
-        try:
-            total = int(tokens[-1])
-        except ValueError:
-            return None
+        return self._wait_for_request(
+            self.data_revisions_count_async(id)
+        )
 
-        return total
+    def layer_styles_async(
+            self,
+            style_url,
+            callback: Optional[Callable[[Dict], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve layer styles asynchronously
+        """
+        return self._submit_cached_json(self._build_request(style_url),
+                                        callback=callback,
+                                        priority=priority)
 
     def layer_styles(self, style_url) -> Dict:
         """
         Retrieve layer styles blocking
         """
-        params = {}
-
-        headers = {}
-        headers.update(self.headers)
-
-        ret = self._get(style_url, headers, params)
-
-        return ret['json']
-
-    def total_revisions_count(self, id) -> Optional[int]:
+        return self._wait_for_request(
+            self.layer_styles_async(style_url)
+        ) or {}
+
+    def total_revisions_count_async(
+            self,
+            id,
+            callback: Optional[Callable[[Optional[int]], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
         """
-        Retrieve total revisions blocking
+        Retrieve total revisions asynchronously
         """
         params = {'data_import': True}
 
         endpoint = "layers/{}/versions/".format(id)
-        headers = {}
-        headers.update(self.headers)
-
-        ret = self._get(endpoint, headers, params)
+        return self._get_async(endpoint,
+                               KoordinatesClient._parse_resource_total,
+                               params=params,
+                               callback=callback,
+                               priority=priority)
 
-        tokens = ret['reply'].rawHeader(b"X-Resource-Range").data().decode().split("/")
-        try:
-            total = int(tokens[-1])
-        except ValueError:
-            return None
-        return total
+    def total_revisions_count(self, id) -> Optional[int]:
+        """
+        Retrieve total revisions blocking
+        """
+        return self._wait_for_request(
+            self.total_revisions_count_async(id)
+        )
 
     def retrieve_repository(self, url) -> Optional[Repo]:
         """
         Retrieve repository details blocking
         """
-        res = self.get_json(url)
-        if res:
-            return Repo(res)
+        details = self.repository_details(url)
+        if details:
+            return Repo(details)
 
         return None
 
+    def cached_repository_details(self, url: str) -> Optional[Dict]:
+        """
+        Returns the previously retrieved repository details for a
+        repository URL, or None if they have not been retrieved yet
+        """
+        return self._repositories.get(url)
+
+    def repository_details_async(
+            self,
+            url: str,
+            callback: Optional[Callable[[Dict], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve the repository details for a repository URL
+        asynchronously.
+
+        Results are memoized by repository URL.
+        """
+        if url in self._repositories:
+            request = ApiRequest.completed(self._repositories[url])
+        else:
+            request = self.get_json_async(url, priority=priority)
+            request.add_callback(
+                partial(self._repository_details_retrieved, url))
+
+        if callback is not None:
+            request.add_callback(callback)
+        return request
+
+    def _repository_details_retrieved(self, url: str,
+                                      details: Optional[Dict]):
+        """
+        Called when repository details have been retrieved.
+
+        Failed requests are not cached, so that they are retried.
+        """
+        if details is not None:
+            self._repositories[url] = details
+
+    def repository_details(self, url: str) -> Dict:
+        """
+        Retrieve the repository details for a repository URL blocking
+        """
+        if url in self._repositories:
+            return self._repositories[url]
+
+        return self._wait_for_request(
+            self.repository_details_async(url)
+        ) or {}
+
+    def prefetch_repositories(self,
+                              urls,
+                              callback: Callable[[], None]):
+        """
+        Retrieves the repository details for multiple repository URLs
+        in parallel, calling callback once all requests are finished.
+
+        The callback is called even if requests fail or are canceled.
+        """
+        pending = {url for url in urls if url not in self._repositories}
+        if not pending:
+            callback()
+            return
+
+        def repository_finished(url, _):
+            pending.discard(url)
+            if not pending:
+                callback()
+
+        for url in list(pending):
+            request = self.repository_details_async(url)
+            if request.is_finished():
+                repository_finished(url, request)
+            else:
+                request.finished.connect(partial(repository_finished, url))
+
     def user_details(self) -> dict:
         """
         Returns a diction of user details
@@ -436,25 +765,75 @@ class KoordinatesClient(QObject):
 
         return res
 
-    def dataset_details(self, dataset: Dataset) -> Dict:
+    def dataset(self, details: Dict) -> Dataset:
         """
-        Retrieve dataset details
+        Returns the shared Dataset object for dataset details.
+
+        Datasets are shared for as long as they are referenced anywhere,
+        so that lazily retrieved information such as styles and
+        repository details are only retrieved once. The details of an
+        existing dataset are updated from the specified details.
+        """
+        str_id = str(details['id'])
+        dataset = self._datasets.get(str_id)
+        if dataset is None:
+            dataset = Dataset(details)
+            self._datasets[str_id] = dataset
+        else:
+            dataset.merge_details(details)
+
+        return dataset
+
+    def dataset_details_async(
+            self,
+            dataset: Dataset,
+            callback: Optional[Callable[[Dict], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieve dataset details asynchronously
         """
         str_id = str(dataset.id)
-        if str_id not in self._dataset_details:
-            if dataset.datatype == DataType.PointClouds:
-                endpoint = f"datasets/{str_id}/"
-            elif dataset.datatype == DataType.Tables:
-                endpoint = f"tables/{str_id}/"
-            else:
-                endpoint = f"layers/{str_id}/"
-            self._dataset_details[str_id] = self._get(endpoint)['json']
+        if str_id in self._dataset_details:
+            request = ApiRequest.completed(self._dataset_details[str_id])
+            if callback is not None:
+                request.add_callback(callback)
+            return request
+
+        if dataset.datatype == DataType.PointClouds:
+            endpoint = f"datasets/{str_id}/"
+        elif dataset.datatype == DataType.Tables:
+            endpoint = f"tables/{str_id}/"
+        else:
+            endpoint = f"layers/{str_id}/"
+
+        request = self._submit_cached_json(self._build_request(endpoint),
+                                           priority=priority)
+        request.add_callback(
+            partial(self._dataset_details_retrieved, str_id))
+        if callback is not None:
+            request.add_callback(callback)
+        return request
+
+    def _dataset_details_retrieved(self, dataset_id: str,
+                                   details: Optional[Dict]):
+        """
+        Called when dataset details have been retrieved
+        """
+        if details:
+            self._dataset_details[dataset_id] = details
 
-        return self._dataset_details[str_id]
+    def dataset_details(self, dataset: Dataset) -> Dict:
+        """
+        Retrieve dataset details
+        """
+        return self._wait_for_request(
+            self.dataset_details_async(dataset)
+        ) or {}
 
     def categories(self):
         if self._categories is None:
-            self._categories = self._get("categories")['json']
+            self._categories = self._get("categories", use_cache=True)['json']
         return self._categories
 
     @waitcursor
@@ -499,37 +878,362 @@ class KoordinatesClient(QObject):
 
         return network_request
 
-    @waitcursor
-    def _get(self, endpoint, headers=None, params=None):
+    def _get_async(self,
+                   endpoint: str,
+                   parser: Callable[[QNetworkReply], object],
+                   headers=None,
+                   params=None,
+                   callback: Optional[Callable[[object], None]] = None,
+                   priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Queues a GET request for an API endpoint through the request engine
+        """
         network_request = self._build_request(endpoint, headers, params)
+        return self._submit(network_request,
+                            parser,
+                            callback=callback,
+                            priority=priority)
+
+    def _submit(self,
+                network_request: QNetworkRequest,
+                parser: Callable[[QNetworkReply], object],
+                callback: Optional[Callable[[object], None]] = None,
+                priority: RequestPriority = RequestPriority.Interactive,
+                parser_key: Optional[object] = None,
+                threaded: bool = False,
+                shared_callback: Optional[Callable[[object], None]] = None) \
+            -> ApiRequest:
+        """
+        Queues a network request through the request engine.
 
-        request = QgsBlockingNetworkRequest()
-        if request.get(network_request) != QgsBlockingNetworkRequest.NoError:
-            self.error_occurred.emit(request.reply().errorString())
-            reply_json = {}
+        Concurrent requests for the same URL with the same headers and
+        parser are coalesced, so that they share a single network request.
+        Each caller is returned a separate handle for the shared request,
+        so that canceling the request only detaches that caller. The
+        parser_key argument can be used to identify parsers which are
+        equivalent but not identical objects.
+
+        The shared_callback is called once with the result of the shared
+        request, regardless of the number of callers sharing it.
+
+        If threaded is True then the parser is called on a worker thread
+        with a ReplyContent snapshot of the reply.
+        """
+        key = self._request_key(network_request,
+                                parser_key if parser_key is not None
+                                else parser)
+        request = self._pending_requests.get(key)
+        if request is not None and not request.is_finished():
+            # only ever raise the priority of the shared request
+            if priority.value < request.priority.value:
+                request.set_priority(priority)
         else:
-            reply_json = json.loads(request.reply().content().data().decode())
+            request = self._request_engine.submit(network_request,
+                                                  parser,
+                                                  priority,
+                                                  threaded=threaded)
+            self._pending_requests[key] = request
+            request.finished.connect(
+                partial(self._request_finished, key))
+            if shared_callback is not None:
+                request.add_callback(shared_callback)
+
+        handle = request.share()
+        if callback is not None:
+            handle.add_callback(callback)
+        return handle
 
+    @staticmethod
+    def _request_key(network_request: QNetworkRequest,
+                     parser_key: object) -> Tuple:
+        """
+        Returns the key used to coalesce identical requests
+        """
+        headers = tuple(
+            sorted((header.data(), network_request.rawHeader(header).data())
+                   for header in network_request.rawHeaderList()
+                   if header.data() not in KoordinatesClient.CONDITIONAL_HEADERS)
+        )
+        return network_request.url().toString(), headers, parser_key
+
+    def _request_finished(self, key: Tuple, request: ApiRequest):
+        """
+        Called when a request from the request engine is finished
+        """
+        if self._pending_requests.get(key) is request:
+            del self._pending_requests[key]
+
+    def average_request_latency(self) -> Optional[float]:
+        """
+        Returns the recent average latency of API requests, in seconds,
+        or None if no requests have completed yet
+        """
+        return self._request_engine.average_latency()
+
+    def metadata_cache(self) -> MetadataCache:
+        """
+        Returns the persistent metadata cache
+        """
+        if self._metadata_cache is None:
+            self._metadata_cache = MetadataCache()
+
+        return self._metadata_cache
+
+    def capabilities_cache(self) -> CapabilitiesCache:
+        """
+        Returns the persistent WMTS capabilities cache
+        """
+        if self._capabilities_cache is None:
+            self._capabilities_cache = CapabilitiesCache()
+
+        return self._capabilities_cache
+
+    def wmts_capabilities_async(
+            self,
+            dataset: Dataset,
+            callback: Optional[Callable[[Optional[bytes]], None]] = None,
+            priority: RequestPriority = RequestPriority.Background) \
+            -> ApiRequest:
+        """
+        Retrieves the WMTS capabilities document for a dataset
+        asynchronously, using the capabilities cache.
+
+        Documents are only requested if the cache doesn't contain the
+        current version of the document.
+        """
+        from .layer_utils import LayerUtils
+
+        url = LayerUtils.wmts_capabilities_url(dataset.id, self.apiKey)
+        version = CapabilitiesCache.version_for_details(dataset.details)
+        content = self.capabilities_cache().lookup(url, version)
+        if content is not None:
+            request = ApiRequest.completed(content)
+        else:
+            request = self._submit(
+                QNetworkRequest(QUrl(url)),
+                partial(self._parse_capabilities_reply, url, version),
+                priority=priority,
+                parser_key=('capabilities', version))
+
+        if callback is not None:
+            request.add_callback(callback)
+        return request
+
+    def _parse_capabilities_reply(self,
+                                  url: str,
+                                  version: str,
+                                  reply: QNetworkReply) -> bytes:
+        """
+        Parses a WMTS capabilities reply, storing the document in the
+        capabilities cache
+        """
+        content = reply.readAll().data()
+        if not content:
+            raise ValueError('Empty capabilities document')
+
+        self.capabilities_cache().store(url, version, content)
+        return content
+
+    def seed_wmts_capabilities(self, dataset: Dataset) -> bool:
+        """
+        Makes the cached WMTS capabilities document for a dataset
+        available to the WMS provider, so that a layer for the dataset
+        can be created without a capabilities request.
+
+        Returns False if the current version of the document isn't
+        cached, in which case it is fetched in the background for
+        subsequent layers.
+        """
+        from .layer_utils import LayerUtils
+
+        url = LayerUtils.wmts_capabilities_url(dataset.id, self.apiKey)
+        content = self.capabilities_cache().lookup(
+            url, CapabilitiesCache.version_for_details(dataset.details))
+        if content is None:
+            self.wmts_capabilities_async(dataset)
+            return False
+
+        return CapabilitiesCache.seed_network_cache(url, content)
+
+    def _submit_cached_json(
+            self,
+            network_request: QNetworkRequest,
+            callback: Optional[Callable[[object], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Queues a request for a JSON document through the request engine,
+        using the metadata cache.
+
+        If the document is already cached then the request is made
+        conditional on the cached ETag/Last-Modified values, and the
+        cached document is used if the server reports it as unchanged.
+        """
+        key = MetadataCache.cache_key(
+            network_request.url().toString(),
+            self.headers.get('Authorization')
+        )
+        cached = self.metadata_cache().lookup(key)
+        if cached is not None:
+            if cached.etag:
+                network_request.setRawHeader(b'If-None-Match',
+                                             cached.etag.encode())
+            if cached.last_modified:
+                network_request.setRawHeader(b'If-Modified-Since',
+                                             cached.last_modified.encode())
+            network_request.setAttribute(
+                QNetworkRequest.CacheLoadControlAttribute,
+                QNetworkRequest.AlwaysNetwork)
+
+        return self._submit(network_request,
+                            partial(self._parse_cached_json_reply,
+                                    key, cached),
+                            callback=callback,
+                            priority=priority,
+                            parser_key='metadata_cache')
+
+    def _parse_cached_json_reply(self,
+                                 key: str,
+                                 cached: Optional[CachedMetadata],
+                                 reply: QNetworkReply):
+        """
+        Parses a JSON reply for a request made through the metadata cache
+        """
+        cache = self.metadata_cache()
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+        if status == 304 and cached is not None:
+            cache.record_hit()
+            cache.touch(key)
+            return json.loads(cached.content.decode())
+
+        cache.record_miss()
+        content = reply.readAll().data()
+        result = json.loads(content.decode())
+
+        etag = reply.rawHeader(b'ETag').data().decode()
+        last_modified = reply.rawHeader(b'Last-Modified').data().decode()
+        if etag or last_modified:
+            cache.store(key, content, etag or None, last_modified or None)
+        elif cached is not None:
+            cache.remove(key)
+
+        return result
+
+    @waitcursor
+    def _wait_for_request(self, request: ApiRequest):
+        """
+        Blocks until a request is complete, returning the parsed result.
+
+        Errors are only reported for blocking requests, as asynchronous
+        requests are handled by their callers.
+        """
+        request.wait()
+        if request.error_string() and not request.is_canceled():
+            self.error_occurred.emit(request.error_string())
+        return request.result()
+
+    @staticmethod
+    def _parse_json_reply(reply: QNetworkReply):
+        """
+        Parses a JSON reply
+        """
+        return json.loads(reply.readAll().data().decode())
+
+    @staticmethod
+    def _parse_resource_total(reply: QNetworkReply) -> Optional[int]:
+        """
+        Parses the total resource count from a reply's range header
+        """
+        tokens = reply.rawHeader(b"X-Resource-Range").data().decode().split("/")
+        try:
+            return int(tokens[-1])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _parse_datasets_reply(reply: QNetworkReply) -> Tuple[object, bool]:
+        """
+        Parses a datasets reply, returning the datasets and whether
+        the final page has been retrieved
+        """
+        tokens = reply.rawHeader(b"X-Resource-Range").data().decode().split("/")
+        total = tokens[-1]
+        last = tokens[0].split("-")[-1]
+        return KoordinatesClient._parse_json_reply(reply), last == total
+
+    @staticmethod
+    def _parse_datasets_page_reply(reply: ReplyContent) \
+            -> Tuple[List[Dict], str, bool]:
+        """
+        Parses a page of datasets, returning the datasets, the total
+        count of datasets and whether the page is the last page
+        """
+        result = KoordinatesClient._parse_json_reply(reply)
+        if 'panels' in result:
+            datasets = [item['content'] for item in
+                        result['panels'][0]['items']]
+        else:
+            datasets = result
+
+        tokens = reply.rawHeader(b"X-Resource-Range").data().decode().split(
+            "/")
+        total = tokens[-1]
+        last = tokens[0].split("-")[-1]
+        return datasets, total, last == total
+
+    @staticmethod
+    def _parse_facets_reply(reply: ReplyContent) -> Dict:
+        """
+        Parses a dataset facets reply
+        """
+        facets = KoordinatesClient._parse_json_reply(reply)
+
+        # inject context into facets, so that this is accessible to widgets
+        request_url = reply.request().url()
+        facets['from'] = QUrlQuery(request_url.query()).queryItemValue('from')
+        return facets
+
+    def _get(self, endpoint, headers=None, params=None, use_cache=False):
+        if use_cache:
+            request = self._submit_cached_json(
+                self._build_request(endpoint, headers, params))
+        else:
+            request = self._get_async(endpoint,
+                                      KoordinatesClient._parse_json_reply,
+                                      headers=headers,
+                                      params=params)
         return {
-            'json': reply_json,
-            'reply': request.reply()
+            'json': self._wait_for_request(request) or {}
         }
 
-    @waitcursor
-    def get_json(self, url: str):
-        url = QUrl(url)
-        network_request = QNetworkRequest(url)
+    def get_json_async(
+            self,
+            url: str,
+            callback: Optional[Callable[[object], None]] = None,
+            priority: RequestPriority = RequestPriority.Interactive) \
+            -> ApiRequest:
+        """
+        Retrieves a JSON document asynchronously
+        """
+        return self._submit_cached_json(self._build_json_request(url),
+                                        callback=callback,
+                                        priority=priority)
+
+    def _build_json_request(self, url: str) -> QNetworkRequest:
+        """
+        Builds a network request for a JSON document at an absolute URL
+        """
+        network_request = QNetworkRequest(QUrl(url))
         headers = {}
         headers.update(self.headers)
         for header, value in headers.items():
             network_request.setRawHeader(header.encode(),
                                          value.encode())
 
-        request = QgsBlockingNetworkRequest()
-        if request.get(network_request) != QgsBlockingNetworkRequest.NoError:
-            self.error_occurred.emit(request.reply().errorString())
-            reply_json = {}
-        else:
-            reply_json = json.loads(request.reply().content().data().decode())
+        return network_request
 
-        return reply_json
+    def get_json(self, url: str):
+        return self._wait_for_request(
+            self.get_json_async(url)
+        ) or {}
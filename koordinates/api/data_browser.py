@@ -1,6 +1,7 @@
 from typing import Dict, Set, Optional
 
 from qgis.PyQt.QtCore import QDateTime, Qt
+from qgis.core import QgsRectangle
 
 from .enums import (
     SortOrder,
@@ -35,6 +36,9 @@ class DataBrowserQuery:
 
         self.publisher: Optional[Publisher] = None
 
+        # restricts results to datasets intersecting an extent, in EPSG:4326
+        self.extent: Optional[QgsRectangle] = None
+
         self.data_types: Set[DataType] = set()
         self.vector_filters: Set[VectorFilter] = set()
         self.raster_filters: Set[RasterFilter] = set()
@@ -200,6 +204,13 @@ class DataBrowserQuery:
         elif license_types:
             params["license.type"] = license_types[0]
 
+        if self.extent is not None:
+            params['bbox'] = ','.join(
+                '{:.6f}'.format(v) for v in (self.extent.xMinimum(),
+                                             self.extent.yMinimum(),
+                                             self.extent.xMaximum(),
+                                             self.extent.yMaximum()))
+
         # extra query logic for defaults:
         # 1. If no filters are active, the query string is initialized to the default data types
         if 'kind' not in params and DataType.Vectors not in self.data_types:
@@ -238,3 +249,17 @@ class DataBrowserQuery:
             params['sort'] = '-created_at'
 
         return params
+
+    def has_filters(self) -> bool:
+        """
+        Returns True if the query has any filters, other than the search
+        string and extent
+        """
+        unfiltered = DataBrowserQuery()
+        unfiltered.order = self.order
+        unfiltered.popular_order_string = self.popular_order_string
+
+        params = self.build_query()
+        params.pop('q', None)
+        params.pop('bbox', None)
+        return params != unfiltered.build_query()
@@ -1,11 +1,13 @@
 import datetime
+from functools import partial
 from typing import (
+    Callable,
     Dict,
     List,
-    Optional
+    Optional,
+    Set
 )
 
-from dateutil import parser
 from qgis.core import (
     QgsGeometry,
     QgsMapLayer,
@@ -17,12 +19,20 @@ from qgis.core import (
     QgsWkbTypes
 )
 
-from .enums import DataType
+from .enums import (
+    DataType,
+    Capability,
+    PublicAccessType
+)
 from .repo import Repo
 from .utils import ApiUtils
 from .publisher import Publisher
 
 
+# marker for lazily computed fields which have not been computed yet
+_UNSET = object()
+
+
 class Crs:
     """
     Represents a CRS
@@ -60,6 +70,8 @@ class Style:
         self.url: str = details['url']
         self.state: str = details['url']
         self.description: Optional[str] = details['description'] or None
+        self._created_at_date = _UNSET
+        self._published_at_date = _UNSET
 
     def id(self) -> int:
         """
@@ -95,60 +107,200 @@ class Style:
         """
         Returns the created at date
         """
-        created_at_date_str: Optional[str] = self.details.get(
-            "created_at"
-        )
+        if self._created_at_date is _UNSET:
+            created_at_date_str: Optional[str] = self.details.get(
+                "created_at"
+            )
 
-        if created_at_date_str:
-            return parser.parse(created_at_date_str)
+            self._created_at_date = \
+                ApiUtils.parse_datetime(created_at_date_str) \
+                if created_at_date_str else None
 
-        return None
+        return self._created_at_date
 
     def published_at_date(self) -> Optional[datetime.date]:
         """
         Returns the published at date
         """
-        published_at_date_str: Optional[str] = self.details.get(
-            "published_at"
-        )
+        if self._published_at_date is _UNSET:
+            published_at_date_str: Optional[str] = self.details.get(
+                "published_at"
+            )
 
-        if published_at_date_str:
-            return parser.parse(published_at_date_str)
+            self._published_at_date = \
+                ApiUtils.parse_datetime(published_at_date_str) \
+                if published_at_date_str else None
 
-        return None
+        return self._published_at_date
 
 
 class Dataset:
     """
-    Represents a dataset
+    Represents a dataset.
+
+    Fields derived from the dataset details are computed on first use
+    and memoized, so that large numbers of datasets are cheap to
+    construct and hold.
     """
 
+    __slots__ = (
+        'details',
+        'id',
+        '_datatype',
+        '_geometry_type',
+        '_access',
+        '_capabilities',
+        '_repository',
+        '_styles_retrieved',
+        '_styles',
+        '_gridded_extent',
+        '_extent',
+        '_crs',
+        '_publisher',
+        '_created_at_date',
+        '_updated_at_date',
+        '__weakref__'
+    )
+
     def __init__(self, details: Dict):
         self.details = details
         self.id = details['id']
-        self.datatype = ApiUtils.data_type_from_dataset_response(self.details)
-        self.geometry_type: QgsWkbTypes.GeometryType = \
-            ApiUtils.geometry_type_from_dataset_response(
-                self.details
-            )
 
-        self.capabilities = ApiUtils.capabilities_from_dataset_response(
-            self.details
-        )
-        self.access = ApiUtils.access_from_dataset_response(self.details)
+        self._datatype = _UNSET
+        self._geometry_type = _UNSET
+        self._access = _UNSET
+        self._capabilities: Optional[Set[Capability]] = None
         self._repository: Optional[Repo] = None
         self._styles_retrieved = False
         self._styles: List[Style] = []
+        self._gridded_extent = _UNSET
+        self._extent = _UNSET
+        self._crs = _UNSET
+        self._publisher = _UNSET
+        self._created_at_date = _UNSET
+        self._updated_at_date = _UNSET
+
+    def merge_details(self, details: Dict):
+        """
+        Merges details for the dataset into the existing details.
+
+        Fields derived from the details will be recomputed, but retrieved
+        styles and repository details are retained.
+
+        If the details are not newer than the existing details (e.g. they
+        are from cached query results) then only missing fields are added,
+        so that fresher details are not overwritten.
+
+        The existing details dictionary is replaced by a merged copy,
+        not updated in place, as it may be shared (e.g. by cached query
+        results).
+        """
+        if details is self.details:
+            return
+
+        existing_updated = self.updated_at_date()
+        updated = Dataset._details_updated_at(details)
+        if existing_updated is not None and (
+                updated is None or updated <= existing_updated):
+            self.details = {**details, **self.details}
+        else:
+            self.details = {**self.details, **details}
+
+        self._datatype = _UNSET
+        self._geometry_type = _UNSET
+        self._access = _UNSET
+        self._capabilities = None
+        self._gridded_extent = _UNSET
+        self._extent = _UNSET
+        self._crs = _UNSET
+        self._publisher = _UNSET
+        self._created_at_date = _UNSET
+        self._updated_at_date = _UNSET
 
-        self.gridded_extent: Optional[QgsGeometry] = None
-        if 'data' in self.details and self.details['data'].get(
-                'gridded_extent'):
-            self.gridded_extent = ApiUtils.geometry_from_hexwkb(
-                self.details['data']['gridded_extent']
+    @property
+    def datatype(self) -> DataType:
+        """
+        Returns the dataset's data type
+        """
+        if self._datatype is _UNSET:
+            self._datatype = \
+                ApiUtils.data_type_from_dataset_response(self.details)
+
+        return self._datatype
+
+    @property
+    def geometry_type(self) -> QgsWkbTypes.GeometryType:
+        """
+        Returns the dataset's geometry type
+        """
+        if self._geometry_type is _UNSET:
+            self._geometry_type = \
+                ApiUtils.geometry_type_from_dataset_response(self.details)
+
+        return self._geometry_type
+
+    @property
+    def access(self) -> PublicAccessType:
+        """
+        Returns the dataset's public access type
+        """
+        if self._access is _UNSET:
+            self._access = \
+                ApiUtils.access_from_dataset_response(self.details)
+
+        return self._access
+
+    @property
+    def gridded_extent(self) -> Optional[QgsGeometry]:
+        """
+        Returns the dataset's gridded extent, if available
+        """
+        if self._gridded_extent is _UNSET:
+            self._gridded_extent = None
+            if 'data' in self.details and self.details['data'].get(
+                    'gridded_extent'):
+                self._gridded_extent = ApiUtils.geometry_from_hexwkb(
+                    self.details['data']['gridded_extent']
+                )
+
+        return self._gridded_extent
+
+    @property
+    def extent(self) -> Optional[QgsGeometry]:
+        """
+        Returns the dataset's extent, in EPSG:4326, if available
+        """
+        if self._extent is _UNSET:
+            self._extent = ApiUtils.geometry_from_geojson(
+                self.details.get('data', {}).get('extent')
             )
 
-        self.crs: Optional[Crs] = Crs(self.details['data']['crs']) \
-            if self.details.get('data', {}).get('crs') else None
+        return self._extent
+
+    @property
+    def crs(self) -> Optional[Crs]:
+        """
+        Returns the dataset's CRS, if available
+        """
+        if self._crs is _UNSET:
+            self._crs = Crs(self.details['data']['crs']) \
+                if self.details.get('data', {}).get('crs') else None
+
+        return self._crs
+
+    @property
+    def capabilities(self) -> Set[Capability]:
+        """
+        Returns the dataset's capabilities.
+
+        These are resolved on first use, as they may depend on the
+        dataset's repository details.
+        """
+        if self._capabilities is None:
+            self._capabilities = \
+                ApiUtils.capabilities_from_dataset_response(self.details)
+
+        return self._capabilities
 
     def title(self) -> str:
         """
@@ -172,10 +324,11 @@ class Dataset:
         """
         Returns the publisher details
         """
-        if not self.details.get("publisher"):
-            return None
+        if self._publisher is _UNSET:
+            self._publisher = Publisher.intern(self.details["publisher"]) \
+                if self.details.get("publisher") else None
 
-        return Publisher(self.details["publisher"])
+        return self._publisher
 
     def is_starred(self) -> bool:
         """
@@ -193,29 +346,40 @@ class Dataset:
         """
         Returns the created at / first published at date
         """
-        created_at_date_str: Optional[str] = self.details.get(
-            "first_published_at"
-        )
-        if not created_at_date_str:
-            created_at_date_str = self.details.get("created_at")
+        if self._created_at_date is _UNSET:
+            created_at_date_str: Optional[str] = self.details.get(
+                "first_published_at"
+            )
+            if not created_at_date_str:
+                created_at_date_str = self.details.get("created_at")
 
-        if created_at_date_str:
-            return parser.parse(created_at_date_str)
+            self._created_at_date = \
+                ApiUtils.parse_datetime(created_at_date_str) \
+                if created_at_date_str else None
 
-        return None
+        return self._created_at_date
 
     def updated_at_date(self) -> Optional[datetime.date]:
         """
         Returns the updated at date
         """
-        updated_at_date_str: Optional[str] = self.details.get("updated_at")
-        if not updated_at_date_str:
-            updated_at_date_str = self.details.get("published_at")
+        if self._updated_at_date is _UNSET:
+            self._updated_at_date = Dataset._details_updated_at(self.details)
 
-        if updated_at_date_str:
-            return parser.parse(updated_at_date_str)
+        return self._updated_at_date
 
-        return None
+    @staticmethod
+    def _details_updated_at(details: Dict) -> Optional[datetime.datetime]:
+        """
+        Returns the updated at date from dataset details, falling back
+        to the published at date
+        """
+        updated_at_date_str: Optional[str] = details.get("updated_at")
+        if not updated_at_date_str:
+            updated_at_date_str = details.get("published_at")
+
+        return ApiUtils.parse_datetime(updated_at_date_str) \
+            if updated_at_date_str else None
 
     def number_downloads(self) -> int:
         """
@@ -283,31 +447,87 @@ class Dataset:
         self._styles_retrieved = True
         return self._styles
 
+    def styles_async(self, callback: Callable[[List[Style]], None]):
+        """
+        Retrieves styles for the dataset asynchronously, calling
+        callback with the styles once they are available
+        """
+        if self._styles_retrieved or \
+                isinstance(self.details.get('styles'), list) or \
+                not self.details.get('styles'):
+            callback(self.styles())
+            return
+
+        from .client import KoordinatesClient
+        KoordinatesClient.instance().layer_styles_async(
+            self.details['styles'],
+            callback=partial(self._styles_retrieved_async, callback)
+        )
+
+    def _styles_retrieved_async(self,
+                                callback: Callable[[List[Style]], None],
+                                results: Optional[List[Dict]]):
+        """
+        Called when styles have been retrieved asynchronously
+        """
+        if results is None:
+            # the request failed, so fall back to the automatic style
+            # without caching the failure
+            callback([])
+            return
+
+        if not self._styles_retrieved:
+            for result in results:
+                self._styles.append(Style(result))
+            self._styles_retrieved = True
+        callback(self._styles)
+
+    def default_style_id(self) -> Optional[int]:
+        """
+        Returns the ID of the style to use when adding the dataset as a
+        layer, if styles have been retrieved
+        """
+        if not self._styles_retrieved or not self._styles:
+            return None
+
+        return self._styles[0].id()
+
+    def uses_wmts(self) -> bool:
+        """
+        Returns True if the dataset is added to projects as a WMTS layer
+        """
+        return self.datatype in (DataType.Vectors,
+                                 DataType.Rasters,
+                                 DataType.Grids)
+
     def to_map_layer(self, style_id: Optional[int] = None) -> Optional[QgsMapLayer]:
         """
         Converts the dataset to a map layer, if possible
         """
         from .layer_utils import LayerUtils
 
-        if self.datatype in (
-                DataType.Vectors,
-                DataType.Rasters,
-                DataType.Grids):
+        if self.uses_wmts():
             color_name = LayerUtils.get_random_color_string()
 
             from .client import KoordinatesClient
             apikey = KoordinatesClient.instance().apiKey
 
-            style = 'auto' if style_id is None else str(style_id)
+            style = LayerUtils.wmts_style(style_id,
+                                          color_name).replace('=', '%3D')
+            layer_identifier = LayerUtils.wmts_layer_identifier(self.id)
+            tile_matrix_set = LayerUtils.WMTS_TILE_MATRIX_SET
 
             uri = (
                 "contextualWMSLegend=0&crs=EPSG:3857&dpiMode=7&format=image/png"
-                f"&layers=layer-{self.id}&styles=style%3D{style},"
-                f"color%3D{color_name}&tileMatrixSet=EPSG:3857&"
+                f"&layers={layer_identifier}&styles={style}"
+                f"&tileMatrixSet={tile_matrix_set}&"
                 f"tilePixelRatio=0&url={LayerUtils.WMTS_URL_BASE};"
                 f"key%3D{apikey}/{LayerUtils.WMTS_ENDPOINT}/"
                 f"{self.id}/WMTSCapabilities.xml"
             )
+            # avoids a blocking capabilities request in the WMS provider
+            KoordinatesClient.instance().seed_wmts_capabilities(self)
+
             res = QgsRasterLayer(uri, self.title(), "wms")
             # force feature mode for identify results by default --
             # see https://github.com/koordinates/koordinates-qgis-plugin/issues/239
@@ -217,3 +217,13 @@ class PublisherType(Enum):
     Publisher = auto()
     User = auto()
     Mirror = auto()
+
+
+class RequestPriority(Enum):
+    """
+    API request priorities.
+
+    Lower values are dispatched first.
+    """
+    Interactive = 0
+    Background = 1
@@ -0,0 +1,188 @@
+from typing import (
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple
+)
+
+from qgis.core import (
+    QgsFeature,
+    QgsGeometry,
+    QgsRectangle,
+    QgsSpatialIndex
+)
+
+from .utils import ApiUtils
+
+
+class DatasetExtentIndex:
+    """
+    An in-memory spatial index of dataset extents.
+
+    All retrieved datasets are added to the index, so that the datasets
+    intersecting an extent can be found locally. The index also tracks
+    which extents have been completely retrieved from the server for a
+    search, so that the same search within those extents can be answered
+    without another request.
+
+    Local search matching doesn't follow the server's search semantics,
+    and the index also contains datasets retrieved for other queries, so
+    queries are only answered locally from the results the server
+    returned for exactly the same search.
+    """
+
+    # maximum number of completely retrieved extents to track
+    MAX_COVERED = 100
+
+    def __init__(self):
+        self._index = QgsSpatialIndex()
+        self._next_id = 1
+        # feature IDs, by dataset ID
+        self._ids: Dict[str, int] = {}
+        # dataset details and extents, by feature ID
+        self._datasets: Dict[int, Dict] = {}
+        self._extents: Dict[int, QgsGeometry] = {}
+        # extents which have been completely retrieved, with their search
+        # and the IDs of the datasets retrieved for the search
+        self._covered: List[Tuple[QgsRectangle, str, FrozenSet[str]]] = []
+
+    def add_datasets(self, datasets: List[Dict]):
+        """
+        Adds datasets to the index, replacing any existing entries
+        for the datasets
+        """
+        for dataset in datasets:
+            extent = ApiUtils.geometry_from_geojson(
+                dataset.get('data', {}).get('extent'))
+            if extent is None:
+                continue
+
+            dataset_id = str(dataset['id'])
+            feature_id = self._ids.get(dataset_id)
+            if feature_id is not None:
+                self._delete(feature_id)
+            else:
+                feature_id = self._next_id
+                self._next_id += 1
+                self._ids[dataset_id] = feature_id
+
+            self._datasets[feature_id] = dataset
+            self._extents[feature_id] = extent
+            self._index.addFeature(feature_id, extent.boundingBox())
+
+    def _delete(self, feature_id: int):
+        """
+        Removes a dataset's extent from the spatial index
+        """
+        feature = QgsFeature(feature_id)
+        feature.setGeometry(self._extents[feature_id])
+        self._index.deleteFeature(feature)
+
+    def __len__(self) -> int:
+        return len(self._datasets)
+
+    def intersecting(self,
+                     extent: QgsRectangle,
+                     search: Optional[str] = None) -> List[Dict]:
+        """
+        Returns the indexed datasets which intersect an extent and match
+        a search string, in the order they were first added
+        """
+        terms = ApiUtils.search_terms(search)
+        rect = QgsGeometry.fromRect(extent)
+
+        res = []
+        for feature_id in sorted(self._index.intersects(extent)):
+            dataset = self._datasets[feature_id]
+            if not self._extents[feature_id].intersects(rect):
+                continue
+            if terms and not ApiUtils.dataset_matches_search(dataset, terms):
+                continue
+
+            res.append(dataset)
+
+        return res
+
+    def mark_covered(self,
+                     extent: QgsRectangle,
+                     search: Optional[str],
+                     datasets: List[Dict]):
+        """
+        Records that all datasets intersecting an extent and matching a
+        search string have been retrieved from the server.
+
+        The datasets retrieved for the search must already have been added
+        to the index.
+        """
+        search = DatasetExtentIndex._normalize_search(search)
+        dataset_ids = frozenset(str(d['id']) for d in datasets)
+
+        # drop coverage which is superseded by the new extent
+        self._covered = [
+            entry for entry in self._covered
+            if not (entry[1] == search and extent.contains(entry[0]))
+        ]
+        self._covered.append((QgsRectangle(extent), search, dataset_ids))
+        del self._covered[:-DatasetExtentIndex.MAX_COVERED]
+
+    def _covering_entry(self, extent: QgsRectangle, search: Optional[str]) \
+            -> Optional[Tuple[QgsRectangle, str, FrozenSet[str]]]:
+        """
+        Returns the covered extent entry which contains an extent for
+        exactly the same search, if any
+        """
+        search = DatasetExtentIndex._normalize_search(search)
+        for entry in reversed(self._covered):
+            if entry[1] == search and entry[0].contains(extent):
+                return entry
+
+        return None
+
+    def is_covered(self, extent: QgsRectangle,
+                   search: Optional[str]) -> bool:
+        """
+        Returns True if all datasets intersecting an extent and matching
+        a search string are available from the index
+        """
+        return self._covering_entry(extent, search) is not None
+
+    def covered_datasets(self, extent: QgsRectangle,
+                         search: Optional[str]) -> Optional[List[Dict]]:
+        """
+        Returns all datasets intersecting an extent and matching a search
+        string, if these are known from a previously completed query, or
+        None if the server must be queried.
+
+        Only the datasets retrieved for the completed query are returned,
+        in the order they were first added.
+        """
+        entry = self._covering_entry(extent, search)
+        if entry is None:
+            return None
+
+        rect = QgsGeometry.fromRect(extent)
+        feature_ids = sorted(self._ids[dataset_id]
+                             for dataset_id in entry[2]
+                             if dataset_id in self._ids)
+        return [
+            self._datasets[feature_id] for feature_id in feature_ids
+            if self._extents[feature_id].intersects(rect)
+        ]
+
+    @staticmethod
+    def _normalize_search(search: Optional[str]) -> str:
+        """
+        Returns the normalized form of a search string
+        """
+        return ' '.join(ApiUtils.search_terms(search))
+
+    def clear(self):
+        """
+        Removes all datasets from the index
+        """
+        self._index = QgsSpatialIndex()
+        self._ids = {}
+        self._datasets = {}
+        self._extents = {}
+        self._covered = []
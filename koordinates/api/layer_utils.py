@@ -1,11 +1,18 @@
-from typing import Optional
+from functools import partial
+from typing import (
+    Callable,
+    List,
+    Optional
+)
 
 from qgis.core import (
     QgsApplication,
+    QgsMapLayer,
     QgsProject
 )
 
 from .dataset import Dataset
+from .enums import RequestPriority
 
 
 class LayerUtils:
@@ -15,6 +22,7 @@ class LayerUtils:
 
     WMTS_URL_BASE = 'https://koordinates.com/services'
     WMTS_ENDPOINT = 'wmts/1.0.0/layer'
+    WMTS_TILE_MATRIX_SET = 'EPSG:3857'
 
     @staticmethod
     def get_random_color_string() -> str:
@@ -25,6 +33,32 @@ class LayerUtils:
         # string '#' from color name
         return color.name()[1:]
 
+    @staticmethod
+    def wmts_capabilities_url(dataset_id, apikey: Optional[str]) -> str:
+        """
+        Returns the WMTS capabilities URL for a dataset
+        """
+        return (
+            f"{LayerUtils.WMTS_URL_BASE};key={apikey}/"
+            f"{LayerUtils.WMTS_ENDPOINT}/{dataset_id}/WMTSCapabilities.xml"
+        )
+
+    @staticmethod
+    def wmts_layer_identifier(dataset_id) -> str:
+        """
+        Returns the WMTS layer identifier for a dataset
+        """
+        return f"layer-{dataset_id}"
+
+    @staticmethod
+    def wmts_style(style_id: Optional[int], color_name: str) -> str:
+        """
+        Returns the WMTS style identifier for a dataset style and
+        color
+        """
+        style = 'auto' if style_id is None else str(style_id)
+        return f"style={style},color={color_name}"
+
     @staticmethod
     def add_layer_to_project(
             dataset: Dataset,
@@ -35,3 +69,67 @@ class LayerUtils:
         layer = dataset.to_map_layer(style_id=style_id)
         if layer:
             QgsProject.instance().addMapLayer(layer)
+
+    @staticmethod
+    def add_layers_to_project(layers: List[QgsMapLayer]):
+        """
+        Adds multiple layers to the current project in a single
+        operation.
+
+        The layers are added to the layer tree as one batch, so the
+        map canvas is only refreshed once regardless of the number of
+        layers. The first layer will be placed at the top of the batch.
+        """
+        if not layers:
+            return
+
+        QgsProject.instance().addMapLayers(layers)
+
+    @staticmethod
+    def add_datasets_to_project(
+            datasets: List[Dataset],
+            callback: Optional[Callable[[List[QgsMapLayer]], None]] = None):
+        """
+        Adds multiple datasets to the current project.
+
+        The styles and WMTS capabilities for all datasets are retrieved
+        in parallel, and the layers are then added in a single operation
+        using each dataset's default style. Datasets which can't be
+        converted to a layer are skipped. The optional callback is called
+        with the added layers.
+        """
+        from .client import KoordinatesClient
+
+        pending = {(idx, 'styles') for idx in range(len(datasets))}
+        wmts_datasets = [idx for idx, dataset in enumerate(datasets)
+                         if dataset.uses_wmts()]
+        pending.update((idx, 'capabilities') for idx in wmts_datasets)
+
+        def retrieved(item, _):
+            pending.discard(item)
+            if pending:
+                return
+
+            layers = []
+            for dataset in datasets:
+                layer = dataset.to_map_layer(
+                    style_id=dataset.default_style_id())
+                if layer:
+                    layers.append(layer)
+
+            LayerUtils.add_layers_to_project(layers)
+            if callback is not None:
+                callback(layers)
+
+        if not pending:
+            retrieved(None, None)
+            return
+
+        client = KoordinatesClient.instance()
+        for idx in wmts_datasets:
+            client.wmts_capabilities_async(
+                datasets[idx],
+                callback=partial(retrieved, (idx, 'capabilities')),
+                priority=RequestPriority.Interactive)
+        for idx, dataset in enumerate(datasets):
+            dataset.styles_async(partial(retrieved, (idx, 'styles')))
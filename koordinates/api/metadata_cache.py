@@ -0,0 +1,226 @@
+import hashlib
+import os
+import sqlite3
+from typing import (
+    Dict,
+    Optional
+)
+
+from qgis.core import (
+    QgsApplication,
+    QgsSettings
+)
+
+
+class CachedMetadata:
+    """
+    Represents a cached metadata document
+    """
+
+    def __init__(self,
+                 content: bytes,
+                 etag: Optional[str],
+                 last_modified: Optional[str]):
+        self.content = content
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+class MetadataCache:
+    """
+    A persistent on-disk cache for catalog metadata documents.
+
+    Documents are keyed by their canonical URL together with the
+    authentication context they were retrieved with, and are stored
+    with their ETag and Last-Modified validators so that they can be
+    revalidated using conditional requests. The cache size is capped,
+    with the least recently used documents evicted first.
+    """
+
+    DEFAULT_MAX_SIZE_MB = 50
+    SIZE_SETTING = "koordinates/metadata_cache_size_mb"
+
+    def __init__(self, path: Optional[str] = None):
+        self._path = path or MetadataCache.default_path()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._hits = 0
+        self._misses = 0
+
+    @staticmethod
+    def default_path() -> str:
+        """
+        Returns the default location for the cache database
+        """
+        return os.path.join(QgsApplication.qgisSettingsDirPath(),
+                            'koordinates',
+                            'metadata_cache.sqlite')
+
+    @staticmethod
+    def cache_key(url: str, auth: Optional[str] = None) -> str:
+        """
+        Returns the cache key for a URL retrieved with the specified
+        authentication header
+        """
+        auth_hash = hashlib.sha256((auth or '').encode()).hexdigest()
+        return '{}|{}'.format(url, auth_hash)
+
+    @staticmethod
+    def max_size() -> int:
+        """
+        Returns the maximum size of the cache, in bytes
+        """
+        size_mb = QgsSettings().value(MetadataCache.SIZE_SETTING,
+                                      MetadataCache.DEFAULT_MAX_SIZE_MB,
+                                      int, QgsSettings.Plugins)
+        return size_mb * 1024 * 1024
+
+    @staticmethod
+    def set_max_size(size_mb: int):
+        """
+        Sets the maximum size of the cache, in megabytes
+        """
+        QgsSettings().setValue(MetadataCache.SIZE_SETTING,
+                               size_mb, QgsSettings.Plugins)
+
+    def _db(self) -> sqlite3.Connection:
+        """
+        Returns the database connection, creating the database if required
+        """
+        if self._connection is None:
+            if self._path != ':memory:':
+                os.makedirs(os.path.dirname(self._path), exist_ok=True)
+
+            self._connection = sqlite3.connect(self._path)
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS metadata (
+                key TEXT PRIMARY KEY,
+                content BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                size INTEGER NOT NULL,
+                last_access INTEGER NOT NULL)"""
+            )
+            self._connection.execute(
+                """CREATE INDEX IF NOT EXISTS metadata_last_access
+                ON metadata(last_access)"""
+            )
+            self._connection.commit()
+
+        return self._connection
+
+    def lookup(self, key: str) -> Optional[CachedMetadata]:
+        """
+        Returns the cached document for a key, or None if the key
+        is not cached
+        """
+        row = self._db().execute(
+            'SELECT content, etag, last_modified FROM metadata WHERE key=?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        return CachedMetadata(row[0], row[1], row[2])
+
+    def store(self,
+              key: str,
+              content: bytes,
+              etag: Optional[str],
+              last_modified: Optional[str]):
+        """
+        Stores a document in the cache
+        """
+        db = self._db()
+        db.execute(
+            """INSERT OR REPLACE INTO metadata
+            (key, content, etag, last_modified, size, last_access)
+            VALUES (?, ?, ?, ?, ?, ?)""",
+            (key, content, etag, last_modified, len(content),
+             self._next_access())
+        )
+        self._evict()
+        db.commit()
+
+    def touch(self, key: str):
+        """
+        Marks a cached document as recently used
+        """
+        db = self._db()
+        db.execute('UPDATE metadata SET last_access=? WHERE key=?',
+                   (self._next_access(), key))
+        db.commit()
+
+    def _next_access(self) -> int:
+        """
+        Returns the next value of the access clock used to order
+        documents by recency of use
+        """
+        return self._db().execute(
+            'SELECT COALESCE(MAX(last_access), 0) + 1 FROM metadata'
+        ).fetchone()[0]
+
+    def remove(self, key: str):
+        """
+        Removes a document from the cache
+        """
+        db = self._db()
+        db.execute('DELETE FROM metadata WHERE key=?', (key,))
+        db.commit()
+
+    def clear(self):
+        """
+        Removes all documents from the cache
+        """
+        db = self._db()
+        db.execute('DELETE FROM metadata')
+        db.commit()
+
+    def size(self) -> int:
+        """
+        Returns the current size of the cached documents, in bytes
+        """
+        return self._db().execute(
+            'SELECT COALESCE(SUM(size), 0) FROM metadata'
+        ).fetchone()[0]
+
+    def _evict(self):
+        """
+        Evicts the least recently used documents until the cache fits
+        within the maximum size
+        """
+        db = self._db()
+        excess = self.size() - MetadataCache.max_size()
+        if excess <= 0:
+            return
+
+        evicted = 0
+        keys = []
+        for key, size in db.execute(
+                'SELECT key, size FROM metadata ORDER BY last_access'):
+            if evicted >= excess:
+                break
+            keys.append((key,))
+            evicted += size
+
+        db.executemany('DELETE FROM metadata WHERE key=?', keys)
+
+    def record_hit(self):
+        """
+        Records a cache hit
+        """
+        self._hits += 1
+
+    def record_miss(self):
+        """
+        Records a cache miss
+        """
+        self._misses += 1
+
+    def statistics(self) -> Dict[str, int]:
+        """
+        Returns the cache hit and miss counts for this session
+        """
+        return {
+            'hits': self._hits,
+            'misses': self._misses
+        }
@@ -1,3 +1,4 @@
+import weakref
 from typing import (
     Dict,
     Optional
@@ -59,6 +60,29 @@ class Publisher:
     Represents a publisher
     """
 
+    # publishers shared between datasets, by ID
+    _interned: Dict[str, 'Publisher'] = weakref.WeakValueDictionary()
+
+    @staticmethod
+    def intern(details: Dict) -> 'Publisher':
+        """
+        Returns a shared Publisher for the given publisher details.
+
+        Datasets from the same publisher will share a single Publisher
+        object, for as long as any of them hold a reference to it.
+        """
+        publisher_id = details.get('id')
+        if not publisher_id:
+            return Publisher(details)
+
+        publisher = Publisher._interned.get(publisher_id)
+        if publisher is None or (publisher.details is not details
+                                 and publisher.details != details):
+            publisher = Publisher(details)
+            Publisher._interned[publisher_id] = publisher
+
+        return publisher
+
     def __init__(self, details: Dict):
         self.details = details
         # override publisher type
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Optional
+)
+
+
+class CachedQueryResult:
+    """
+    Represents a cached query result
+    """
+
+    def __init__(self, value, timestamp: float, fresh_seconds: float):
+        self.value = value
+        self.timestamp = timestamp
+        self._fresh_seconds = fresh_seconds
+
+    def age(self) -> float:
+        """
+        Returns the age of the result, in seconds
+        """
+        return time.monotonic() - self.timestamp
+
+    def is_fresh(self) -> bool:
+        """
+        Returns True if the result is recent enough to be used without
+        revalidation
+        """
+        return self.age() < self._fresh_seconds
+
+
+class QueryResultCache:
+    """
+    An in-memory cache of query results, keyed by canonical query keys.
+
+    Cached results are fresh for a short period, after which they can
+    still be shown immediately but should be revalidated. Results expire
+    entirely once they are older than the time to live.
+    """
+
+    FRESH_SECONDS = 30
+    TTL_SECONDS = 600
+    MAX_ENTRIES = 100
+
+    def __init__(self,
+                 fresh_seconds: float = FRESH_SECONDS,
+                 ttl_seconds: float = TTL_SECONDS,
+                 max_entries: int = MAX_ENTRIES):
+        self.fresh_seconds = fresh_seconds
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._results: Dict[str, CachedQueryResult] = OrderedDict()
+
+    @staticmethod
+    def canonical_key(endpoint: str,
+                      params: Dict[str, object],
+                      *extra) -> str:
+        """
+        Returns a canonical key for a query.
+
+        Queries with the same endpoint, parameters (regardless of their
+        order) and extra values (e.g. the authentication context) will
+        have the same key.
+        """
+        canonical = json.dumps({
+            'endpoint': endpoint,
+            'params': params,
+            'extra': extra
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def lookup(self, key: str) -> Optional[CachedQueryResult]:
+        """
+        Returns the cached result for a key, or None if there is no
+        unexpired result for the key
+        """
+        result = self._results.get(key)
+        if result is None:
+            return None
+
+        if result.age() >= self.ttl_seconds:
+            del self._results[key]
+            return None
+
+        self._results.move_to_end(key)
+        return result
+
+    def insert(self, key: str, value):
+        """
+        Stores a result in the cache
+        """
+        self._results.pop(key, None)
+        self._results[key] = CachedQueryResult(value,
+                                               time.monotonic(),
+                                               self.fresh_seconds)
+        while len(self._results) > self.max_entries:
+            self._results.popitem(last=False)
+
+    def remove(self, key: str):
+        """
+        Removes a result from the cache
+        """
+        self._results.pop(key, None)
+
+    def clear(self):
+        """
+        Removes all results from the cache
+        """
+        self._results.clear()
+
+    def __len__(self) -> int:
+        return len(self._results)
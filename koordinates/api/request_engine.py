@@ -0,0 +1,562 @@
+import heapq
+import itertools
+import time
+from functools import partial
+from typing import (
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple
+)
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import (
+    QByteArray,
+    QEventLoop,
+    QObject,
+    QRunnable,
+    QThreadPool,
+    QUrl,
+    pyqtSignal
+)
+from qgis.PyQt.QtNetwork import (
+    QNetworkRequest,
+    QNetworkReply
+)
+from qgis.core import QgsNetworkAccessManager
+
+from .enums import RequestPriority
+
+
+class ReplyContent:
+    """
+    A snapshot of the content and headers of a finished network reply.
+
+    Provides the subset of the QNetworkReply interface used by reply
+    parsers, and can safely be parsed on a worker thread.
+    """
+
+    def __init__(self, reply: QNetworkReply):
+        self._content = reply.readAll()
+        self._headers: Dict[bytes, QByteArray] = {
+            header.data().lower(): reply.rawHeader(header)
+            for header in reply.rawHeaderList()
+        }
+        self._request = reply.request()
+        self._url = reply.url()
+
+    def readAll(self) -> QByteArray:  # pylint: disable=invalid-name
+        """
+        Returns the reply content
+        """
+        return self._content
+
+    def rawHeader(self, header: bytes) -> QByteArray:  # pylint: disable=invalid-name
+        """
+        Returns the value of a reply header
+        """
+        return self._headers.get(bytes(header).lower(), QByteArray())
+
+    def request(self) -> QNetworkRequest:
+        """
+        Returns the original network request
+        """
+        return self._request
+
+    def url(self) -> QUrl:
+        """
+        Returns the reply URL
+        """
+        return self._url
+
+
+class ParseJobSignals(QObject):
+    """
+    Signals for ParseJob
+    """
+
+    # emitted with the parsed result and error message
+    finished = pyqtSignal(object, object)
+
+
+class ParseJob(QRunnable):
+    """
+    Parses a reply on a worker thread
+    """
+
+    def __init__(self,
+                 parser: Callable[[ReplyContent], object],
+                 content: ReplyContent):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.parser = parser
+        self.content = content
+        self.signals = ParseJobSignals()
+
+    def run(self):
+        # exceptions can't propagate from a worker thread, so any
+        # parser failure is reported as an error
+        try:
+            result = self.parser(self.content)
+        except Exception as e:  # pylint: disable=broad-except
+            self.signals.finished.emit(None, str(e) or type(e).__name__)
+        else:
+            self.signals.finished.emit(result, None)
+
+
+class ApiRequest(QObject):
+    """
+    Represents a queued or in-flight API request.
+
+    Acts as a future for the parsed result of the request. Callbacks
+    added via add_callback() are called with the parsed result once the
+    request completes (or immediately, if it has already completed).
+
+    Threaded requests are parsed on a worker thread, with the parser
+    called with a ReplyContent snapshot of the reply instead of the
+    reply itself.
+
+    A request can be shared between several callers, with each caller
+    holding a separate handle created by share(). Canceling a handle
+    only detaches that caller, and the shared request is only canceled
+    once all of its handles have been canceled.
+    """
+
+    # emitted with the request itself when the request completes or
+    # is canceled
+    finished = pyqtSignal(object)
+
+    def __init__(self,
+                 network_request: Optional[QNetworkRequest],
+                 parser: Optional[Callable[[QNetworkReply], object]],
+                 priority: RequestPriority = RequestPriority.Interactive,
+                 verb: bytes = b'GET',
+                 threaded: bool = False):
+        super().__init__()
+        self.network_request = network_request
+        self.parser = parser
+        self.priority = priority
+        self.verb = verb
+        self.threaded = threaded
+
+        self._engine: Optional['RequestEngine'] = None
+        self._reply: Optional[QNetworkReply] = None
+        self._start_time: Optional[float] = None
+        self._result = None
+        self._error: Optional[str] = None
+        self._is_finished = False
+        self._is_canceled = False
+        self._callbacks: List[Callable[[object], None]] = []
+
+        # for handles, the shared request which the handle follows
+        self._source: Optional['ApiRequest'] = None
+        # the unfinished handles sharing the request, which are kept alive
+        # until the request finishes so that callers don't need to keep
+        # a reference to them
+        self._handles: List['ApiRequest'] = []
+
+    @staticmethod
+    def completed(result) -> 'ApiRequest':
+        """
+        Returns an already completed request with the given result,
+        e.g. for results which are available from a cache
+        """
+        request = ApiRequest(None, None)
+        request._result = result
+        request._is_finished = True
+        return request
+
+    def share(self) -> 'ApiRequest':
+        """
+        Returns a new handle for the request, for a caller sharing it.
+
+        The handle finishes with the result of this request.
+        """
+        handle = ApiRequest(self.network_request, self.parser,
+                            self.priority, self.verb, self.threaded)
+        handle._source = self
+        if self._is_finished:
+            handle._source_finished(self)
+        else:
+            self._handles.append(handle)
+            self.finished.connect(handle._source_finished)
+
+        return handle
+
+    def shared_request(self) -> 'ApiRequest':
+        """
+        Returns the shared request followed by a handle, or the request
+        itself if it is not a handle
+        """
+        return self._source or self
+
+    def url(self) -> str:
+        """
+        Returns the request URL
+        """
+        if self.network_request is None:
+            return ''
+
+        return self.network_request.url().toString()
+
+    def is_started(self) -> bool:
+        """
+        Returns True if the request has been dispatched to the network
+        """
+        if self._source is not None:
+            return self._source.is_started() or self._is_finished
+
+        return self._reply is not None or self._is_finished
+
+    def is_finished(self) -> bool:
+        """
+        Returns True if the request has completed
+        """
+        return self._is_finished
+
+    def is_canceled(self) -> bool:
+        """
+        Returns True if the request was canceled
+        """
+        return self._is_canceled
+
+    def error_string(self) -> Optional[str]:
+        """
+        Returns the error message if the request failed, or None
+        """
+        return self._error
+
+    def result(self):
+        """
+        Returns the parsed result of the request.
+
+        Will be None if the request has not finished or if it failed.
+        """
+        return self._result
+
+    def add_callback(self, callback: Callable[[object], None]):
+        """
+        Adds a callback to call with the parsed result of the request.
+
+        If the request has already finished the callback is called
+        immediately. Callbacks are not called for canceled requests.
+        """
+        if self._is_finished:
+            if not self._is_canceled:
+                callback(self._result)
+        else:
+            self._callbacks.append(callback)
+
+    def set_priority(self, priority: RequestPriority):
+        """
+        Changes the priority of a queued request.
+
+        Has no effect if the request has already been dispatched.
+        """
+        if self._source is not None:
+            # other callers may rely on the priority of the shared
+            # request, so it is only ever raised
+            self.priority = priority
+            if priority.value < self._source.priority.value:
+                self._source.set_priority(priority)
+            return
+
+        if priority == self.priority or self.is_started():
+            return
+
+        self.priority = priority
+        if self._engine is not None:
+            self._engine.requeue(self)
+
+    def cancel(self):
+        """
+        Cancels the request
+        """
+        if self._is_finished:
+            return
+
+        self._is_canceled = True
+        self._error = 'Operation canceled'
+        if self._source is not None:
+            self._source.finished.disconnect(self._source_finished)
+            self._source._release(self)
+            self._finish()
+            return
+
+        if self._reply is not None and not sip.isdeleted(self._reply):
+            # aborting finishes the reply synchronously, which normally
+            # finishes the request too
+            self._reply.abort()
+
+        self._finish()
+
+    def wait(self):
+        """
+        Blocks until the request has completed.
+
+        A queued request is dispatched immediately, regardless of the
+        number of requests already in flight.
+        """
+        if self._is_finished:
+            return
+
+        if self._source is not None:
+            # the handle is finished as soon as the shared request is
+            self._source.wait()
+            return
+
+        if not self.is_started() and self._engine is not None:
+            self._engine.start_immediately(self)
+
+        loop = QEventLoop()
+        self.finished.connect(loop.quit)
+        if not self._is_finished:
+            loop.exec_(QEventLoop.ExcludeUserInputEvents)
+
+    def _release(self, handle: 'ApiRequest'):
+        """
+        Called when a handle for the request is canceled
+        """
+        self._handles.remove(handle)
+        if not self._handles:
+            self.cancel()
+
+    def _source_finished(self, source: 'ApiRequest'):
+        """
+        Called when the shared request followed by a handle is finished
+        """
+        self._result = source.result()
+        self._error = source.error_string()
+        self._is_canceled = source.is_canceled()
+        self._finish()
+
+    def _set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def _set_error(self, error: str):
+        self._error = error
+        self._finish()
+
+    def _finish(self):
+        if self._is_finished:
+            return
+
+        self._is_finished = True
+        self._reply = None
+
+        callbacks = self._callbacks
+        self._callbacks = []
+        if not self._is_canceled:
+            for callback in callbacks:
+                callback(self._result)
+
+        self.finished.emit(self)
+        self._handles = []
+
+
+class RequestEngine(QObject):
+    """
+    Dispatches API requests asynchronously.
+
+    Requests are held in a priority queue and dispatched in priority order,
+    with a bounded number of requests in flight at any time.
+    """
+
+    DEFAULT_MAX_IN_FLIGHT = 6
+
+    # smoothing factor for the average request latency
+    LATENCY_SMOOTHING = 0.3
+
+    def __init__(self,
+                 max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+                 parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self._max_in_flight = max_in_flight
+        self._queue: List[Tuple[int, int, ApiRequest]] = []
+        self._counter = itertools.count()
+        self._in_flight: Set[ApiRequest] = set()
+        # parse jobs are kept alive until their results are delivered
+        self._parse_jobs: Set[ParseJob] = set()
+        self._average_latency: Optional[float] = None
+
+    def max_in_flight(self) -> int:
+        """
+        Returns the maximum number of requests which will be in flight
+        at any time
+        """
+        return self._max_in_flight
+
+    def set_max_in_flight(self, count: int):
+        """
+        Sets the maximum number of requests which will be in flight
+        at any time
+        """
+        self._max_in_flight = max(1, count)
+        self._dispatch()
+
+    def in_flight_count(self) -> int:
+        """
+        Returns the number of requests currently in flight
+        """
+        return len(self._in_flight)
+
+    def average_latency(self) -> Optional[float]:
+        """
+        Returns the recent average time taken for successful requests to
+        complete once dispatched, in seconds, or None if no requests have
+        completed yet
+        """
+        return self._average_latency
+
+    def queued_count(self) -> int:
+        """
+        Returns the number of requests waiting to be dispatched
+        """
+        return len({entry[2] for entry in self._queue
+                    if not entry[2].is_started()
+                    and not entry[2].is_canceled()})
+
+    def submit(self,
+               network_request: QNetworkRequest,
+               parser: Callable[[QNetworkReply], object],
+               priority: RequestPriority = RequestPriority.Interactive,
+               verb: bytes = b'GET',
+               threaded: bool = False) -> ApiRequest:
+        """
+        Queues a network request, returning the request handle.
+
+        The parser is called with the finished reply and must return the
+        parsed result of the request. If threaded is True then the parser
+        is instead called on a worker thread with a ReplyContent snapshot
+        of the reply, and must be thread-safe.
+        """
+        request = ApiRequest(network_request, parser, priority, verb,
+                             threaded)
+        request._engine = self
+        self._push(request)
+        self._dispatch()
+        return request
+
+    def requeue(self, request: ApiRequest):
+        """
+        Re-queues a request after a priority change
+        """
+        # the stale queue entry is skipped when it is popped, as the
+        # request will have been started by then
+        self._push(request)
+        self._dispatch()
+
+    def start_immediately(self, request: ApiRequest):
+        """
+        Dispatches a queued request immediately, bypassing the in flight
+        limit
+        """
+        if request.is_started() or request.is_canceled():
+            return
+
+        self._start(request)
+
+    def cancel_all(self, priority: Optional[RequestPriority] = None):
+        """
+        Cancels all queued and in flight requests, optionally
+        restricted to requests with a matching priority
+        """
+        requests = [entry[2] for entry in self._queue] + \
+            list(self._in_flight)
+        for request in requests:
+            if priority is None or request.priority == priority:
+                request.cancel()
+
+        self._queue = [entry for entry in self._queue
+                       if not entry[2].is_finished()]
+        heapq.heapify(self._queue)
+
+    def _push(self, request: ApiRequest):
+        heapq.heappush(self._queue,
+                       (request.priority.value, next(self._counter), request))
+
+    def _dispatch(self):
+        while self._queue and len(self._in_flight) < self._max_in_flight:
+            _, _, request = heapq.heappop(self._queue)
+            if request.is_started() or request.is_canceled():
+                continue
+
+            self._start(request)
+
+    def _start(self, request: ApiRequest):
+        if request.verb == b'GET':
+            reply = QgsNetworkAccessManager.instance().get(
+                request.network_request)
+        else:
+            reply = QgsNetworkAccessManager.instance().sendCustomRequest(
+                request.network_request, request.verb, None)
+
+        request._reply = reply
+        request._start_time = time.monotonic()
+        self._in_flight.add(request)
+
+        if reply.isFinished():
+            self._reply_finished(request, reply)
+        else:
+            reply.finished.connect(
+                partial(self._reply_finished, request, reply))
+
+    def _reply_finished(self, request: ApiRequest, reply: QNetworkReply):
+        if sip.isdeleted(self):
+            return
+
+        self._in_flight.discard(request)
+
+        if reply.error() == QNetworkReply.NoError and \
+                request._start_time is not None:
+            self._update_average_latency(
+                time.monotonic() - request._start_time)
+
+        if not request.is_finished():
+            if reply.error() == QNetworkReply.NoError and request.threaded:
+                # the network slot is released straight away, so that the
+                # next request is dispatched while this one is parsed
+                self._start_parse_job(request, ReplyContent(reply))
+            elif reply.error() == QNetworkReply.NoError:
+                # a parser failure must still finish the request, or
+                # callers waiting on it would never be released
+                try:
+                    result = request.parser(reply)
+                except Exception as e:  # pylint: disable=broad-except
+                    request._set_error(str(e) or type(e).__name__)
+                else:
+                    request._set_result(result)
+            else:
+                request._set_error(reply.errorString())
+
+        reply.deleteLater()
+        self._dispatch()
+
+    def _update_average_latency(self, latency: float):
+        if self._average_latency is None:
+            self._average_latency = latency
+        else:
+            self._average_latency += self.LATENCY_SMOOTHING * (
+                latency - self._average_latency)
+
+    def _start_parse_job(self, request: ApiRequest, content: ReplyContent):
+        job = ParseJob(request.parser, content)
+        self._parse_jobs.add(job)
+        job.signals.finished.connect(
+            partial(self._parse_job_finished, request, job))
+        QThreadPool.globalInstance().start(job)
+
+    def _parse_job_finished(self, request: ApiRequest, job: ParseJob,
+                            result, error: Optional[str]):
+        self._parse_jobs.discard(job)
+        if sip.isdeleted(self) or request.is_finished():
+            # e.g. canceled while being parsed
+            return
+
+        if error is not None:
+            request._set_error(error)
+        else:
+            request._set_result(result)
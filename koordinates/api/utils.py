@@ -1,17 +1,24 @@
-from typing import Dict, Set
+from typing import Dict, List, Optional, Set
 import binascii
+import datetime
+import json
+
+from dateutil import parser
 
 from qgis.PyQt.QtCore import QUrlQuery
 
 from qgis.core import (
+    QgsFields,
     QgsGeometry,
+    QgsJsonUtils,
     QgsWkbTypes
 )
 
 from .enums import (
     DataType,
     PublicAccessType,
-    Capability
+    Capability,
+    SortOrder
 )
 
 
@@ -34,6 +41,83 @@ class ApiUtils:
                 query.addQueryItem(name, str(value))
         return query
 
+    @staticmethod
+    def parse_datetime(value: str) -> datetime.datetime:
+        """
+        Parses an ISO-8601 date time string, as returned by the API.
+
+        The fixed formats returned by the API are parsed directly, with
+        dateutil only used as a fallback for other formats.
+        """
+        try:
+            if value[-1:] in ('Z', 'z'):
+                return datetime.datetime.fromisoformat(
+                    value[:-1]).replace(tzinfo=datetime.timezone.utc)
+
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            # e.g. fractional seconds which aren't 3 or 6 digits long
+            # on Python < 3.11
+            return parser.parse(value)
+
+    @staticmethod
+    def search_terms(search: Optional[str]) -> List[str]:
+        """
+        Returns the normalized terms from a search string
+        """
+        return (search or '').lower().split()
+
+    @staticmethod
+    def search_narrows(search: Optional[str],
+                       previous: Optional[str]) -> bool:
+        """
+        Returns True if a search string only extends a previous search
+        string, e.g. while the user is typing, so that the results for
+        the search are a subset of the previous results
+        """
+        search = ' '.join(ApiUtils.search_terms(search))
+        previous = ' '.join(ApiUtils.search_terms(previous))
+        return search != previous and search.startswith(previous)
+
+    @staticmethod
+    def dataset_matches_search(dataset: dict, terms: List[str]) -> bool:
+        """
+        Returns True if a dataset response matches all of a list of
+        normalized search terms.
+
+        This is a local approximation of the server side search, which
+        only considers the dataset title, description and publisher.
+        """
+        text = ' '.join((
+            dataset.get('title') or '',
+            dataset.get('description') or '',
+            (dataset.get('publisher') or {}).get('name') or ''
+        )).lower()
+        return all(term in text for term in terms)
+
+    @staticmethod
+    def sort_datasets(datasets: List[dict], order: SortOrder) -> List[dict]:
+        """
+        Sorts dataset responses locally to match a sort order.
+
+        Popularity isn't available locally, so the existing order is
+        retained for the popularity sort order.
+        """
+        if order in (SortOrder.AlphabeticalAZ, SortOrder.AlphabeticalZA):
+            return sorted(datasets,
+                          key=lambda d: (d.get('title') or '').lower(),
+                          reverse=order == SortOrder.AlphabeticalZA)
+        elif order in (SortOrder.RecentlyAdded, SortOrder.Oldest):
+            return sorted(datasets,
+                          key=lambda d: d.get('created_at') or '',
+                          reverse=order == SortOrder.RecentlyAdded)
+        elif order == SortOrder.RecentlyUpdated:
+            return sorted(datasets,
+                          key=lambda d: d.get('updated_at') or '',
+                          reverse=True)
+
+        return list(datasets)
+
     @staticmethod
     def data_type_from_dataset_response(dataset: dict) -> DataType:
         """
@@ -85,6 +169,22 @@ class ApiUtils:
 
         return PublicAccessType.Download
 
+    @staticmethod
+    def repository_url_from_dataset_response(dataset: dict) -> Optional[str]:
+        """
+        Returns the URL of the repository details which must be retrieved
+        in order to determine a dataset's capabilities, if any
+        """
+        if ApiUtils.data_type_from_dataset_response(dataset) == \
+                DataType.Repositories:
+            return None
+
+        repo = dataset.get("repository")
+        if repo and not isinstance(repo, dict):
+            return repo
+
+        return None
+
     @staticmethod
     def capabilities_from_dataset_response(dataset: dict) -> Set[Capability]:
         """
@@ -108,7 +208,7 @@ class ApiUtils:
             if repo and not isinstance(repo, dict):
                 from .client import KoordinatesClient
 
-                repo = KoordinatesClient.instance().get_json(repo)
+                repo = KoordinatesClient.instance().repository_details(repo)
             repo_user_capabilities = repo.get("user_capabilities", [])
             if "can-clone" not in repo_user_capabilities:
                 capabilities.remove(Capability.Clone)
@@ -138,3 +238,25 @@ class ApiUtils:
         g = QgsGeometry()
         g.fromWkb(wkb)
         return g
+
+    @staticmethod
+    def geometry_from_geojson(geojson) -> Optional[QgsGeometry]:
+        """
+        Converts a GeoJSON feature object to a QgsGeometry, or None if
+        the object has no valid geometry
+        """
+        if not geojson:
+            return None
+
+        try:
+            feats = QgsJsonUtils.stringToFeatureList(
+                json.dumps(geojson), QgsFields(), None
+            )
+            geom = feats[0].geometry()
+        except Exception:
+            geom = QgsGeometry()
+
+        if geom.isNull() or geom.isEmpty():
+            return None
+
+        return geom
@@ -0,0 +1,102 @@
+from typing import (
+    List,
+    Optional
+)
+from xml.etree import ElementTree
+
+WMTS_NAMESPACE = 'http://www.opengis.net/wmts/1.0'
+OWS_NAMESPACE = 'http://www.opengis.net/ows/1.1'
+
+NAMESPACES = {
+    'wmts': WMTS_NAMESPACE,
+    'ows': OWS_NAMESPACE
+}
+
+
+class WmtsCapabilities:
+    """
+    Minimal parser for the WMTS capabilities documents served for
+    datasets
+    """
+
+    def __init__(self, content: bytes):
+        try:
+            self._root = ElementTree.fromstring(content)
+        except ElementTree.ParseError as e:
+            raise ValueError('Invalid capabilities document: {}'.format(e))
+
+    def _layer(self, layer_identifier: str) -> Optional[ElementTree.Element]:
+        """
+        Returns the layer element with a matching identifier
+        """
+        for layer in self._root.iterfind('wmts:Contents/wmts:Layer',
+                                         NAMESPACES):
+            if layer.findtext('ows:Identifier', namespaces=NAMESPACES) == \
+                    layer_identifier:
+                return layer
+
+        return None
+
+    def tile_url_template(self,
+                          layer_identifier: str,
+                          style: str,
+                          tile_matrix_set: str) -> Optional[str]:
+        """
+        Returns the RESTful tile URL template for a layer, with the style
+        and tile matrix set substituted.
+
+        The returned template contains the {TileMatrix}, {TileRow} and
+        {TileCol} placeholders. None is returned if the layer doesn't
+        have a tile resource URL.
+        """
+        layer = self._layer(layer_identifier)
+        if layer is None:
+            return None
+
+        for resource in layer.iterfind('wmts:ResourceURL', NAMESPACES):
+            if resource.get('resourceType') != 'tile':
+                continue
+
+            template = resource.get('template')
+            if not template:
+                continue
+
+            return template.replace(
+                '{Style}', style
+            ).replace(
+                '{TileMatrixSet}', tile_matrix_set
+            )
+
+        return None
+
+    def tile_format(self, layer_identifier: str) -> Optional[str]:
+        """
+        Returns the MIME type of the tiles for a layer
+        """
+        layer = self._layer(layer_identifier)
+        if layer is None:
+            return None
+
+        for resource in layer.iterfind('wmts:ResourceURL', NAMESPACES):
+            if resource.get('resourceType') == 'tile':
+                return resource.get('format')
+
+        return layer.findtext('wmts:Format', namespaces=NAMESPACES)
+
+    def tile_matrices(self, tile_matrix_set: str) -> List[str]:
+        """
+        Returns the identifiers of the tile matrices in a tile matrix set
+        """
+        for matrix_set in self._root.iterfind(
+                'wmts:Contents/wmts:TileMatrixSet', NAMESPACES):
+            if matrix_set.findtext('ows:Identifier',
+                                   namespaces=NAMESPACES) != tile_matrix_set:
+                continue
+
+            return [
+                matrix.findtext('ows:Identifier', namespaces=NAMESPACES)
+                for matrix in matrix_set.iterfind('wmts:TileMatrix',
+                                                  NAMESPACES)
+            ]
+
+        return []
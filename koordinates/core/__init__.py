@@ -2,3 +2,4 @@ from .exceptions import KartNotInstalledException  # NOQA
 from .kart_utils import KartUtils  # NOQA
 from .kart_operation_manager import KartOperationManager  # NOQA
 from .enums import KartOperation, OperationStatus  # NOQA
+from .tile_export_task import TileExportTask  # NOQA
@@ -0,0 +1,481 @@
+import hashlib
+import math
+import os
+import sqlite3
+from functools import partial
+from typing import (
+    Dict,
+    Iterator,
+    Optional,
+    Set,
+    Tuple
+)
+
+from qgis.PyQt.QtCore import (
+    QEventLoop,
+    QTimer,
+    QUrl
+)
+from qgis.PyQt.QtNetwork import (
+    QNetworkReply,
+    QNetworkRequest
+)
+from qgis.core import (
+    QgsNetworkAccessManager,
+    QgsRectangle,
+    QgsTask
+)
+
+# tile coordinates, as (zoom, column, row) using the XYZ row convention
+Tile = Tuple[int, int, int]
+
+# latitude limit of the web mercator tile grid
+MAX_LATITUDE = 85.0511287798066
+
+
+class MBTilesStore:
+    """
+    Writes tiles to an MBTiles file.
+
+    Tile images are stored once by content hash, with a map table
+    referencing the images, so that repeated tiles (such as empty tiles)
+    don't increase the file size.
+    """
+
+    # tiles are committed in batches, so that an interrupted export
+    # only loses the most recent tiles
+    COMMIT_INTERVAL = 100
+
+    def __init__(self, path: str):
+        self._path = path
+        self._connection = sqlite3.connect(path)
+        self._uncommitted = 0
+        self._connection.executescript(
+            """CREATE TABLE IF NOT EXISTS metadata (
+            name TEXT PRIMARY KEY,
+            value TEXT);
+            CREATE TABLE IF NOT EXISTS map (
+            zoom_level INTEGER NOT NULL,
+            tile_column INTEGER NOT NULL,
+            tile_row INTEGER NOT NULL,
+            tile_id TEXT NOT NULL,
+            PRIMARY KEY (zoom_level, tile_column, tile_row));
+            CREATE TABLE IF NOT EXISTS images (
+            tile_id TEXT PRIMARY KEY,
+            tile_data BLOB NOT NULL);
+            CREATE VIEW IF NOT EXISTS tiles AS
+            SELECT map.zoom_level AS zoom_level,
+            map.tile_column AS tile_column,
+            map.tile_row AS tile_row,
+            images.tile_data AS tile_data
+            FROM map JOIN images ON images.tile_id = map.tile_id;"""
+        )
+        self._connection.commit()
+
+    def metadata(self) -> Dict[str, str]:
+        """
+        Returns the file metadata
+        """
+        return dict(self._connection.execute(
+            'SELECT name, value FROM metadata'
+        ).fetchall())
+
+    def set_metadata(self, metadata: Dict[str, str]):
+        """
+        Sets metadata values for the file
+        """
+        self._connection.executemany(
+            'INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)',
+            metadata.items()
+        )
+        self._connection.commit()
+
+    def clear(self):
+        """
+        Removes all tiles and metadata from the file
+        """
+        self._connection.execute('DELETE FROM map')
+        self._connection.execute('DELETE FROM images')
+        self._connection.execute('DELETE FROM metadata')
+        self._connection.commit()
+
+    def existing_tiles(self, zoom: int) -> Set[Tile]:
+        """
+        Returns the tiles at a zoom level which are already stored
+        """
+        max_row = 2 ** zoom - 1
+        return {
+            (zoom, column, max_row - row) for column, row in
+            self._connection.execute(
+                'SELECT tile_column, tile_row FROM map WHERE zoom_level=?',
+                (zoom,)
+            )
+        }
+
+    def add_tile(self, tile: Tile, data: bytes):
+        """
+        Stores a tile
+        """
+        zoom, column, row = tile
+        tile_id = hashlib.md5(data).hexdigest()
+        self._connection.execute(
+            'INSERT OR IGNORE INTO images (tile_id, tile_data) VALUES (?, ?)',
+            (tile_id, data)
+        )
+        # MBTiles uses the TMS row convention
+        self._connection.execute(
+            """INSERT OR REPLACE INTO map
+            (zoom_level, tile_column, tile_row, tile_id)
+            VALUES (?, ?, ?, ?)""",
+            (zoom, column, 2 ** zoom - 1 - row, tile_id)
+        )
+
+        self._uncommitted += 1
+        if self._uncommitted >= MBTilesStore.COMMIT_INTERVAL:
+            self.commit()
+
+    def tile_count(self) -> int:
+        """
+        Returns the number of stored tiles
+        """
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM map'
+        ).fetchone()[0]
+
+    def image_count(self) -> int:
+        """
+        Returns the number of distinct stored tile images
+        """
+        return self._connection.execute(
+            'SELECT COUNT(*) FROM images'
+        ).fetchone()[0]
+
+    def commit(self):
+        """
+        Commits stored tiles to the file
+        """
+        self._connection.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        """
+        Commits and closes the file
+        """
+        self.commit()
+        self._connection.close()
+
+
+class TileExportTask(QgsTask):
+    """
+    A task for downloading the WMTS tiles for a dataset over an extent
+    and zoom range to an MBTiles file, for offline use.
+
+    Tiles are fetched in parallel. Exporting to an existing file for the
+    same source resumes the export, with tiles which are already stored
+    being skipped, so an interrupted or failed export can be completed
+    later (or extended to a larger extent or zoom range).
+
+    The source identifies the tiles independently of the URL template,
+    which contains the API key and randomly chosen style colors. Any
+    details required to resume an export with identical tiles (such as
+    the style color) must be stored in the file metadata.
+    """
+
+    MAX_PARALLEL_REQUESTS = 8
+    MAX_ATTEMPTS = 3
+
+    # interval for checking whether the task has been canceled
+    CANCEL_CHECK_INTERVAL_MS = 100
+
+    def __init__(self,
+                 description: str,
+                 url_template: str,
+                 extent: QgsRectangle,
+                 min_zoom: int,
+                 max_zoom: int,
+                 destination: str,
+                 name: str,
+                 source: str,
+                 tile_format: str = 'png',
+                 metadata: Optional[Dict[str, str]] = None):
+        """
+        :param url_template: tile URL template, containing the
+         {TileMatrix}, {TileRow} and {TileCol} placeholders
+        :param extent: export extent, in EPSG:4326
+        :param source: identifies the tile source, for resuming exports
+        :param metadata: additional metadata to store in the file
+        """
+        super().__init__(description)
+        self.url_template = url_template
+        self.source = source
+        self.metadata = dict(metadata or {})
+        self.extent = QgsRectangle(extent)
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.destination = destination
+        self.name = name
+        self.tile_format = tile_format
+
+        self.downloaded_count = 0
+        self.skipped_count = 0
+        self.failed_count = 0
+        self.error: Optional[str] = None
+
+        self._total = 0
+        self._store: Optional[MBTilesStore] = None
+        self._loop: Optional[QEventLoop] = None
+        self._pending: Optional[Iterator[Tuple[Tile, int]]] = None
+        self._in_flight: Dict[QNetworkReply, Tuple[Tile, int]] = {}
+
+    @staticmethod
+    def tile_range(extent: QgsRectangle,
+                   zoom: int) -> Tuple[int, int, int, int]:
+        """
+        Returns the range of tile columns and rows covering an extent
+        in EPSG:4326 at a zoom level, as (min column, max column,
+        min row, max row)
+        """
+        count = 2 ** zoom
+
+        def column(longitude: float) -> int:
+            return min(count - 1, max(0, math.floor(
+                (longitude + 180) / 360 * count)))
+
+        def row(latitude: float) -> int:
+            latitude = math.radians(max(-MAX_LATITUDE,
+                                        min(MAX_LATITUDE, latitude)))
+            return min(count - 1, max(0, math.floor(
+                (1 - math.asinh(math.tan(latitude)) / math.pi) / 2 * count)))
+
+        return (column(extent.xMinimum()), column(extent.xMaximum()),
+                row(extent.yMaximum()), row(extent.yMinimum()))
+
+    @staticmethod
+    def tile_count(extent: QgsRectangle, min_zoom: int, max_zoom: int) -> int:
+        """
+        Returns the number of tiles covering an extent in EPSG:4326
+        over a zoom range
+        """
+        total = 0
+        for zoom in range(min_zoom, max_zoom + 1):
+            min_column, max_column, min_row, max_row = \
+                TileExportTask.tile_range(extent, zoom)
+            total += (max_column - min_column + 1) * (max_row - min_row + 1)
+        return total
+
+    def tile_url(self, tile: Tile) -> str:
+        """
+        Returns the URL for a tile
+        """
+        zoom, column, row = tile
+        return self.url_template.replace(
+            '{TileMatrix}', str(zoom)
+        ).replace(
+            '{TileRow}', str(row)
+        ).replace(
+            '{TileCol}', str(column)
+        )
+
+    @staticmethod
+    def source_hash(source: str) -> str:
+        """
+        Returns the hash identifying a tile source which is stored in
+        exported files, used to check whether an existing file can be
+        resumed
+        """
+        return hashlib.sha256(source.encode()).hexdigest()
+
+    @staticmethod
+    def resume_metadata(path: str, source: str) -> Dict[str, str]:
+        """
+        Returns the metadata of an existing file which an export for a
+        source would resume, or an empty dictionary if the file doesn't
+        exist or is for a different source
+        """
+        if not os.path.exists(path):
+            return {}
+
+        try:
+            store = MBTilesStore(path)
+            try:
+                metadata = store.metadata()
+            finally:
+                store.close()
+        except sqlite3.Error:
+            return {}
+
+        if metadata.get('koordinates_source') != \
+                TileExportTask.source_hash(source):
+            return {}
+
+        return metadata
+
+    def _tiles(self) -> Iterator[Tuple[Tile, int]]:
+        """
+        Yields the tiles which need to be downloaded, with their
+        attempt number
+        """
+        for zoom in range(self.min_zoom, self.max_zoom + 1):
+            existing = self._store.existing_tiles(zoom)
+            min_column, max_column, min_row, max_row = \
+                TileExportTask.tile_range(self.extent, zoom)
+            for row in range(min_row, max_row + 1):
+                for column in range(min_column, max_column + 1):
+                    tile = (zoom, column, row)
+                    if tile in existing:
+                        self.skipped_count += 1
+                        continue
+
+                    yield tile, 1
+
+    def _prepare_store(self):
+        """
+        Opens the output file, discarding existing content if it is
+        from a different source and updating the file metadata
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(self.destination)),
+                    exist_ok=True)
+        self._store = MBTilesStore(self.destination)
+
+        metadata = self._store.metadata()
+        if metadata and metadata.get('koordinates_source') != \
+                TileExportTask.source_hash(self.source):
+            self._store.clear()
+            metadata = {}
+
+        extent = QgsRectangle(self.extent)
+        min_zoom = self.min_zoom
+        max_zoom = self.max_zoom
+        if metadata.get('bounds'):
+            # resuming, so extend the existing bounds and zoom range
+            x_min, y_min, x_max, y_max = (
+                float(v) for v in metadata['bounds'].split(','))
+            extent.combineExtentWith(QgsRectangle(x_min, y_min,
+                                                  x_max, y_max))
+            min_zoom = min(min_zoom, int(metadata['minzoom']))
+            max_zoom = max(max_zoom, int(metadata['maxzoom']))
+
+        self._store.set_metadata({
+            **self.metadata,
+            'name': self.name,
+            'format': self.tile_format,
+            'type': 'baselayer',
+            'version': '1.1',
+            'bounds': '{:.6f},{:.6f},{:.6f},{:.6f}'.format(
+                extent.xMinimum(), extent.yMinimum(),
+                extent.xMaximum(), extent.yMaximum()),
+            'minzoom': str(min_zoom),
+            'maxzoom': str(max_zoom),
+            'koordinates_source': TileExportTask.source_hash(self.source)
+        })
+
+    def run(self):
+        try:
+            self._prepare_store()
+        except (OSError, sqlite3.Error) as e:
+            self.error = str(e)
+            return False
+
+        self._total = TileExportTask.tile_count(self.extent,
+                                                self.min_zoom,
+                                                self.max_zoom)
+        self._pending = self._tiles()
+
+        self._loop = QEventLoop()
+        cancel_timer = QTimer()
+        cancel_timer.setInterval(TileExportTask.CANCEL_CHECK_INTERVAL_MS)
+        cancel_timer.timeout.connect(self._check_canceled)
+        cancel_timer.start()
+
+        self._start_requests()
+        if self._in_flight:
+            self._loop.exec_()
+
+        cancel_timer.stop()
+        self._loop = None
+
+        self._store.close()
+        self._store = None
+
+        if self.isCanceled():
+            return False
+
+        if self.failed_count:
+            self.error = '{} tiles could not be downloaded'.format(
+                self.failed_count)
+            return False
+
+        return True
+
+    def _update_progress(self):
+        """
+        Updates the task progress
+        """
+        if self._total:
+            done = self.downloaded_count + self.skipped_count + \
+                self.failed_count
+            self.setProgress(100 * done / self._total)
+
+    def _start_requests(self):
+        """
+        Starts tile requests until the maximum number of parallel
+        requests are in flight
+        """
+        while len(self._in_flight) < TileExportTask.MAX_PARALLEL_REQUESTS \
+                and not self.isCanceled():
+            try:
+                tile, attempt = next(self._pending)
+            except StopIteration:
+                break
+
+            self._request(tile, attempt)
+
+        self._update_progress()
+        if not self._in_flight and self._loop is not None:
+            self._loop.quit()
+
+    def _request(self, tile: Tile, attempt: int):
+        """
+        Starts the request for a tile
+        """
+        request = QNetworkRequest(QUrl(self.tile_url(tile)))
+        request.setAttribute(QNetworkRequest.CacheLoadControlAttribute,
+                             QNetworkRequest.PreferNetwork)
+        reply = QgsNetworkAccessManager.instance().get(request)
+        self._in_flight[reply] = (tile, attempt)
+        reply.finished.connect(partial(self._reply_finished, reply))
+
+    def _reply_finished(self, reply: QNetworkReply):
+        """
+        Called when a tile request is finished
+        """
+        tile, attempt = self._in_flight.pop(reply)
+        status = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+
+        if self.isCanceled():
+            pass
+        elif reply.error() == QNetworkReply.NoError and status != 204:
+            data = reply.readAll().data()
+            if data:
+                self._store.add_tile(tile, data)
+            self.downloaded_count += 1
+        elif status in (204, 404):
+            # no tile content for the location
+            self.downloaded_count += 1
+        elif attempt < TileExportTask.MAX_ATTEMPTS:
+            self._request(tile, attempt + 1)
+        else:
+            self.failed_count += 1
+
+        reply.deleteLater()
+        self._start_requests()
+
+    def _check_canceled(self):
+        """
+        Aborts in flight requests if the task has been canceled
+        """
+        if not self.isCanceled():
+            return
+
+        for reply in list(self._in_flight.keys()):
+            reply.abort()
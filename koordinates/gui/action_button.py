@@ -3,7 +3,8 @@ from typing import Optional
 
 from qgis.PyQt.QtCore import (
     Qt,
-    QSize
+    QSize,
+    QTimer
 )
 from qgis.PyQt.QtGui import (
     QPainter,
@@ -23,9 +24,11 @@ from qgis.utils import iface
 
 from .gui_utils import GuiUtils
 from ..api import (
+    ApiRequest,
     KoordinatesClient,
     LayerUtils,
     Dataset,
+    RequestPriority,
     UserDatasetCapability
 )
 from ..core import (
@@ -173,12 +176,49 @@ authoritative publishers.</p>
             )
 
 
+class OfflineButton(ActionButton):
+    """
+    A button for exporting a dataset's tiles for offline use
+    """
+
+    BUTTON_COLOR = "#f5f5f7"
+    BUTTON_OUTLINE = "#c4c4c6"
+    BUTTON_TEXT = "#323233"
+    BUTTON_HOVER = "#e4e4e6"
+
+    def __init__(self, dataset: Dataset, parent=None):
+        super().__init__(parent)
+
+        self.dataset = dataset
+        self.setToolButtonStyle(Qt.ToolButtonTextOnly)
+        self.setText(self.tr('Offline…'))
+        self.setToolTip(self.tr('Export tiles for offline use'))
+        self.setFixedSize(86, self.BUTTON_HEIGHT)
+        self.clicked.connect(self.export_tiles)
+
+    def export_tiles(self):
+        from .tile_export_dialog import TileExportDialog
+
+        dialog = TileExportDialog(self.dataset, self.window())
+        dialog.exec_()
+
+
 class AddButton(ActionButton):
 
+    # delay before prefetching WMTS capabilities while hovering over the
+    # button, so that moving the mouse across the results doesn't
+    # trigger a burst of requests
+    PREFETCH_DELAY_MS = 400
+
     def __init__(self, dataset: Dataset, parent=None):
         super().__init__(parent)
 
         self.dataset = dataset
+        self._capabilities_request: Optional[ApiRequest] = None
+        self._prefetch_timer = QTimer(self)
+        self._prefetch_timer.setSingleShot(True)
+        self._prefetch_timer.setInterval(self.PREFETCH_DELAY_MS)
+        self._prefetch_timer.timeout.connect(self._prefetch_capabilities)
 
         self.styles = self.dataset.styles()
 
@@ -206,6 +246,31 @@ class AddButton(ActionButton):
         self.setIconSize(QSize(53, 11))
         self.setFixedSize(72, self.BUTTON_HEIGHT)
 
+    def enterEvent(self, event):
+        super().enterEvent(event)
+        if self.dataset.uses_wmts():
+            self._prefetch_timer.start()
+
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        self._prefetch_timer.stop()
+
+    def _prefetch_capabilities(self):
+        """
+        Fetches the WMTS capabilities for the dataset in the background,
+        as the dataset is likely to be added.
+
+        Capabilities which are cached or already being fetched are not
+        requested again.
+        """
+        if self._capabilities_request is not None and \
+                not self._capabilities_request.is_finished():
+            return
+
+        self._capabilities_request = \
+            KoordinatesClient.instance().wmts_capabilities_async(
+                self.dataset, priority=RequestPriority.Background)
+
     def paintEvent(self, event):
         super().paintEvent(event)
         if self._show_divider:
@@ -1,21 +1,25 @@
-import json
 import platform
+import weakref
 from enum import (
     Enum,
     auto
 )
+from functools import partial
 from typing import (
     Optional,
-    Dict
+    Dict,
+    Tuple
 )
 
+from qgis.PyQt import sip
 from qgis.PyQt.QtCore import (
     Qt,
     QPointF,
     QRect,
     QRectF,
     QSize,
-    QTimer
+    QTimer,
+    pyqtSignal
 )
 from qgis.PyQt.QtGui import (
     QColor,
@@ -42,14 +46,17 @@ from qgis.core import (
     QgsProject,
     QgsGeometry,
     QgsCoordinateTransform,
-    QgsCoordinateReferenceSystem,
-    QgsFields,
-    QgsJsonUtils
+    QgsCoordinateReferenceSystem
 )
 from qgis.utils import iface
 
 from koordinates.gui.dataset_dialog import DatasetDialog
-from koordinates.gui.thumbnails import downloadThumbnail
+from koordinates.gui.footprint_overlay import footprint_overlay
+from koordinates.gui.thumbnails import (
+    composited_thumbnail_cache,
+    downloadThumbnail,
+    run_thumbnail_job
+)
 from .action_button import (
     CloneButton,
     AddButton
@@ -65,7 +72,8 @@ from ..api import (
     DataType,
     Capability,
     PublicAccessType,
-    Dataset
+    KoordinatesClient,
+    RequestPriority
 )
 
 
@@ -220,11 +228,20 @@ class DatasetItemLayout(QLayout):
         if rect is None:
             rect = self.geometry()
 
-        if self._columns > 1:
+        return DatasetItemLayout.arrangement_for_width(self._columns,
+                                                       rect.width())
+
+    @staticmethod
+    def arrangement_for_width(columns: int, width: int) -> CardLayout:
+        """
+        Returns the arrangement of cards for the given table column count
+        and card width
+        """
+        if columns > 1:
             return CardLayout.Tall
-        elif not rect.width():
+        elif not width:
             return CardLayout.Empty
-        elif rect.width() < DatasetItemLayout.COMPACT_WIDTH_THRESHOLD:
+        elif width < DatasetItemLayout.COMPACT_WIDTH_THRESHOLD:
             return CardLayout.Compact
         else:
             return CardLayout.Wide
@@ -551,11 +568,57 @@ class EmptyDatasetItemWidget(DatasetItemWidgetBase):
         self.dataset_layout.set_details_layout(self.details_layout)
 
 
+class DatasetThumbnailSpec:
+    """
+    Describes how a dataset card's thumbnail should be composited.
+
+    Only holds plain values, so that thumbnails can be composited on
+    a worker thread.
+    """
+
+    def __init__(self,
+                 size: QSize,
+                 arrangement: CardLayout,
+                 scale_factor: float,
+                 icon: Optional[str],
+                 description: Optional[str],
+                 subtitle: Optional[str],
+                 overlay_font_size: float):
+        self.size = size
+        self.arrangement = arrangement
+        self.scale_factor = scale_factor
+        self.icon = icon
+        self.description = description
+        self.subtitle = subtitle
+        self.overlay_font_size = overlay_font_size
+
+    def cache_key(self, source: str) -> Tuple:
+        """
+        Returns the composited thumbnail cache key for the thumbnail
+        when composited from the specified source image
+        """
+        return (source,
+                self.size.width(),
+                self.size.height(),
+                self.arrangement,
+                self.scale_factor,
+                self.icon,
+                self.description,
+                self.subtitle,
+                self.overlay_font_size)
+
+
 class DatasetItemWidget(DatasetItemWidgetBase):
     """
     Shows details for a dataset item
     """
 
+    SELECTED_COLOR = '#0a9b46'
+
+    # emitted with the keyboard modifiers when the item is clicked
+    # with a selection modifier (ctrl/shift) held
+    selection_requested = pyqtSignal(int)
+
     def __init__(self,
                  dataset: Dict,
                  column_count,
@@ -564,12 +627,19 @@ class DatasetItemWidget(DatasetItemWidgetBase):
         super().__init__(parent, mode)
 
         self.setMouseTracking(True)
-        self.dataset = Dataset(dataset)
+        self.dataset = KoordinatesClient.instance().dataset(dataset)
+
+        # True if the item can be selected by ctrl/shift clicking
+        self.selectable = False
 
         self.old_arrangement = None
 
         self.raw_thumbnail = None
+        # the URL or SVG name for the raw thumbnail
+        self.thumbnail_source: Optional[str] = None
         self.timer = None
+        self._thumbnail_generation = 0
+        self._thumbnail_key: Optional[Tuple] = None
 
         try:
             font_scale = self.screen().logicalDotsPerInch() / 92
@@ -589,12 +659,16 @@ class DatasetItemWidget(DatasetItemWidgetBase):
             self.dataset
         )
         if thumbnail_svg:
+            self.thumbnail_source = thumbnail_svg
             self.setThumbnail(GuiUtils.get_svg_as_image(thumbnail_svg,
                                                         150, 150))
         else:
             thumbnail_url = self.dataset.thumbnail_url()
             if thumbnail_url:
-                downloadThumbnail(thumbnail_url, self)
+                self.thumbnail_source = thumbnail_url
+                # the parent table raises the priority for visible cards
+                downloadThumbnail(thumbnail_url, self,
+                                  priority=RequestPriority.Background)
 
         if self.dataset.access == PublicAccessType.none:
             private_icon = QSvgWidget(GuiUtils.get_icon_svg('private.svg'))
@@ -670,7 +744,10 @@ class DatasetItemWidget(DatasetItemWidgetBase):
                 border: 1px solid rgb(180, 180, 180);
                 background: #fcfcfc;
             }
-        """
+            DatasetItemWidget[selected="true"] {
+                border: 2px solid %s;
+            }
+        """ % self.SELECTED_COLOR
         self.setStyleSheet(base_style)
 
         if (Capability.Clone in self.dataset.capabilities
@@ -688,15 +765,7 @@ class DatasetItemWidget(DatasetItemWidgetBase):
 
         self.dataset_layout.set_button_layout(buttons_layout)
 
-        self.bbox: Optional[QgsGeometry] = self._geomFromGeoJson(
-            self.dataset.details.get("data", {}).get("extent"))
-        # if self.bbox:
-        #     self.footprint = QgsRubberBand(iface.mapCanvas(), QgsWkbTypes.PolygonGeometry)
-        #     self.footprint.setWidth(2)
-        #     self.footprint.setColor(QColor(255, 0, 0, 200))
-        #     self.footprint.setFillColor(QColor(255, 0, 0, 40))
-        # else:
-        #     self.footprint = None
+        self.bbox: Optional[QgsGeometry] = self.dataset.extent
 
         self.setCursor(QCursor(Qt.PointingHandCursor))
 
@@ -784,10 +853,71 @@ class DatasetItemWidget(DatasetItemWidgetBase):
             self.raw_thumbnail = GuiUtils.get_svg_as_image(
                 thumbnail_svg, size, size)
 
-        thumbnail = self.process_thumbnail(self.raw_thumbnail)
-        if not thumbnail:
+        spec = self.thumbnail_spec()
+        if spec is None:
             return
 
+        # placeholder thumbnails (while the raw thumbnail is still
+        # downloading) are not cached
+        key = spec.cache_key(self.thumbnail_source) \
+            if self.raw_thumbnail is not None and self.thumbnail_source \
+            else None
+        if key is not None:
+            if key == self._thumbnail_key:
+                # already showing this exact thumbnail, just discard
+                # any in progress composition
+                self._thumbnail_generation += 1
+                return
+
+            thumbnail = composited_thumbnail_cache().get(key)
+            if thumbnail is not None:
+                self._thumbnail_generation += 1
+                self._thumbnail_key = key
+                self.show_thumbnail(thumbnail)
+                return
+
+        # scaling and compositing is done on a worker thread, only the
+        # final pixmap is created on the GUI thread
+        self._thumbnail_generation += 1
+        run_thumbnail_job(
+            partial(DatasetItemWidget._thumbnail_composed,
+                    weakref.ref(self),
+                    self._thumbnail_generation,
+                    key),
+            DatasetItemWidget.compose_thumbnail,
+            self.raw_thumbnail,
+            spec
+        )
+
+    @staticmethod
+    def _thumbnail_composed(widget_ref: weakref.ref,
+                            generation: int,
+                            key: Optional[Tuple],
+                            thumbnail: Optional[QImage]):
+        """
+        Called on the GUI thread when a thumbnail has been composited
+        """
+        if thumbnail and key is not None:
+            # cache even if the widget has gone, another card may
+            # show the same thumbnail
+            composited_thumbnail_cache().insert(key, thumbnail)
+
+        widget = widget_ref()
+        if widget is None or sip.isdeleted(widget):
+            return
+
+        if generation != widget._thumbnail_generation:
+            # superseded by a later update
+            return
+
+        if thumbnail:
+            widget._thumbnail_key = key
+            widget.show_thumbnail(thumbnail)
+
+    def show_thumbnail(self, thumbnail: QImage):
+        """
+        Shows a composited thumbnail image
+        """
         try:
             dpi_ratio = self.window().screen().devicePixelRatio()
         except AttributeError:
@@ -798,20 +928,70 @@ class DatasetItemWidget(DatasetItemWidgetBase):
         self.thumbnail_label.setFixedSize(QSize(width, height))
         self.thumbnail_label.setPixmap(QPixmap.fromImage(thumbnail))
 
-    def process_thumbnail(self, img: Optional[QImage]) -> QImage:
+    def thumbnail_spec(self) -> Optional[DatasetThumbnailSpec]:
+        """
+        Returns the specification for the card's thumbnail at the
+        current card size, or None if the card has not been sized yet
+        """
         size = self.dataset_layout.thumbnail_size_for_rect()
         if size.width() == 0 or size.height() == 0:
-            return
-
-        arrangement = self.dataset_layout.arrangement()
+            return None
 
-        image_size = size
         try:
             scale_factor = self.window().screen().devicePixelRatio()
         except AttributeError:
             # requires Qt 5.14+
             scale_factor = 1
 
+        try:
+            font_scale = self.screen().logicalDotsPerInch() / 92
+        except AttributeError:
+            # requires Qt 5.14 +
+            font_scale = 1
+
+        overlay_font_size = 7.5
+        if platform.system() == 'Darwin':
+            overlay_font_size = 9
+        elif font_scale > 1:
+            overlay_font_size = 7.5 / font_scale
+
+        return DatasetThumbnailSpec(
+            size=QSize(size),
+            arrangement=self.dataset_layout.arrangement(),
+            scale_factor=scale_factor,
+            icon=DatasetGuiUtils.get_icon_for_dataset(self.dataset,
+                                                      IconStyle.Light),
+            description=DatasetGuiUtils.get_type_description(
+                self.dataset
+            ),
+            subtitle=DatasetGuiUtils.get_subtitle(self.dataset,
+                                                  short_format=True),
+            overlay_font_size=overlay_font_size
+        )
+
+    def process_thumbnail(self, img: Optional[QImage]) -> QImage:
+        spec = self.thumbnail_spec()
+        if spec is None:
+            return
+
+        return DatasetItemWidget.compose_thumbnail(img, spec)
+
+    @staticmethod
+    def compose_thumbnail(img: Optional[QImage],
+                          spec: DatasetThumbnailSpec) -> QImage:
+        """
+        Composites a card thumbnail from a raw thumbnail image.
+
+        Only uses QImage based painting, so is safe to call on a
+        worker thread.
+        """
+        size = QSize(spec.size)
+        arrangement = spec.arrangement
+        radius = DatasetItemWidgetBase.THUMBNAIL_CORNER_RADIUS
+
+        image_size = size
+        scale_factor = spec.scale_factor
+
         if scale_factor > 1:
             image_size *= scale_factor
 
@@ -829,39 +1009,39 @@ class DatasetItemWidget(DatasetItemWidgetBase):
 
         path = QPainterPath()
         if arrangement in (CardLayout.Wide, CardLayout.Compact):
-            path.moveTo(self.THUMBNAIL_CORNER_RADIUS, 0)
+            path.moveTo(radius, 0)
             path.lineTo(size.width(), 0)
             path.lineTo(size.width(), size.height())
-            path.lineTo(self.THUMBNAIL_CORNER_RADIUS, size.height())
+            path.lineTo(radius, size.height())
             path.arcTo(0,
-                       size.height() - self.THUMBNAIL_CORNER_RADIUS * 2,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
+                       size.height() - radius * 2,
+                       radius * 2,
+                       radius * 2,
                        270, -90
                        )
-            path.lineTo(0, self.THUMBNAIL_CORNER_RADIUS)
+            path.lineTo(0, radius)
             path.arcTo(0,
                        0,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
+                       radius * 2,
+                       radius * 2,
                        180, -90
                        )
         else:
-            path.moveTo(self.THUMBNAIL_CORNER_RADIUS, 0)
-            path.lineTo(size.width() - self.THUMBNAIL_CORNER_RADIUS, 0)
-            path.arcTo(size.width() - self.THUMBNAIL_CORNER_RADIUS * 2,
+            path.moveTo(radius, 0)
+            path.lineTo(size.width() - radius, 0)
+            path.arcTo(size.width() - radius * 2,
                        0,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
+                       radius * 2,
+                       radius * 2,
                        90, -90
                        )
             path.lineTo(size.width(), size.height())
             path.lineTo(0, size.height())
-            path.lineTo(0, self.THUMBNAIL_CORNER_RADIUS)
+            path.lineTo(0, radius)
             path.arcTo(0,
                        0,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
-                       self.THUMBNAIL_CORNER_RADIUS * 2,
+                       radius * 2,
+                       radius * 2,
                        180, -90
                        )
 
@@ -912,29 +1092,15 @@ class DatasetItemWidget(DatasetItemWidgetBase):
         painter.setBrush(QBrush(QColor(0, 0, 0, 150)))
         painter.drawRoundedRect(QRectF(15, 100, 117, 32), 4, 4)
 
-        icon = DatasetGuiUtils.get_icon_for_dataset(self.dataset,
-                                                    IconStyle.Light)
+        icon = spec.icon
         if icon:
             painter.drawImage(QRectF(21, 106, 20, 20),
                               GuiUtils.get_svg_as_image(icon,
                                                         int(20 * scale_factor),
                                                         int(20 * scale_factor)))
 
-        description = DatasetGuiUtils.get_type_description(
-            self.dataset
-        )
-
-        try:
-            font_scale = self.screen().logicalDotsPerInch() / 92
-        except AttributeError:
-            # requires Qt 5.14 +
-            font_scale = 1
-
-        overlay_font_size = 7.5
-        if platform.system() == 'Darwin':
-            overlay_font_size = 9
-        elif font_scale > 1:
-            overlay_font_size = 7.5 / font_scale
+        description = spec.description
+        overlay_font_size = spec.overlay_font_size
 
         if description:
             font = QFont('Arial')
@@ -946,8 +1112,7 @@ class DatasetItemWidget(DatasetItemWidgetBase):
             painter.setPen(QPen(QColor(255, 255, 255)))
             painter.drawText(QPointF(47, 112), description)
 
-        subtitle = DatasetGuiUtils.get_subtitle(self.dataset,
-                                                short_format=True)
+        subtitle = spec.subtitle
         if subtitle:
             font = QFont('Arial')
             font.setPointSizeF(overlay_font_size / scale_factor)
@@ -974,10 +1139,28 @@ class DatasetItemWidget(DatasetItemWidgetBase):
 
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
-            self.show_details()
+            if self.selectable and \
+                    event.modifiers() & (Qt.ControlModifier |
+                                         Qt.ShiftModifier):
+                self.selection_requested.emit(int(event.modifiers()))
+            else:
+                self.show_details()
         else:
             super().mousePressEvent(event)
 
+    def set_selected(self, selected: bool):
+        """
+        Sets whether the item is shown as selected
+        """
+        if bool(self.property('selected')) == selected:
+            return
+
+        self.setProperty('selected', selected)
+        # force the style sheet to be reapplied for the new property value
+        self.style().unpolish(self)
+        self.style().polish(self)
+        self.update()
+
     def show_details(self):
         """
         Shows the details dialog for the item
@@ -989,27 +1172,16 @@ class DatasetItemWidget(DatasetItemWidgetBase):
             dlg = DatasetDialog(self, self.dataset)
         dlg.exec()
 
-    def _geomFromGeoJson(self, geojson) -> Optional[QgsGeometry]:
-        try:
-            feats = QgsJsonUtils.stringToFeatureList(
-                json.dumps(geojson), QgsFields(), None
-            )
-            geom = feats[0].geometry()
-        except Exception:
-            geom = QgsGeometry()
+    def enterEvent(self, event):
+        super().enterEvent(event)
+        if self.bbox is not None:
+            footprint_overlay().set_highlighted(self.dataset.id)
 
-        if geom.isNull() or geom.isEmpty():
-            return None
-
-        return geom
-
-    # def enterEvent(self, event):
-    #     if self.footprint is not None:
-    #         self.showFootprint()
-
-    # def leaveEvent(self, event):
-    #     if self.footprint is not None:
-    #         self.hideFootprint()
+    def leaveEvent(self, event):
+        super().leaveEvent(event)
+        if self.bbox is not None and \
+                footprint_overlay().highlighted() == str(self.dataset.id):
+            footprint_overlay().set_highlighted(None)
 
     def _bboxInProjectCrs(self):
         geom = QgsGeometry(self.bbox)
@@ -1021,12 +1193,6 @@ class DatasetItemWidget(DatasetItemWidgetBase):
         geom.transform(transform)
         return geom
 
-    # def showFootprint(self):
-    #     self.footprint.setToGeometry(self._bboxInProjectCrs())
-
-    # def hideFootprint(self):
-    #     self.footprint.reset(QgsWkbTypes.PolygonGeometry)
-
     def zoomToBoundingBox(self):
         rect = self.bbox.boundingBox()
         rect.scale(1.05)
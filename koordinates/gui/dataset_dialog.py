@@ -31,7 +31,8 @@ from qgis.PyQt.QtWidgets import (
 
 from .action_button import (
     AddButton,
-    CloneButton
+    CloneButton,
+    OfflineButton
 )
 from .dataset_utils import (
     DatasetGuiUtils,
@@ -136,6 +137,13 @@ class DatasetDialog(QDialog):
         else:
             self.clone_button = None
 
+        if (Capability.Add in self.dataset.capabilities
+                and self.dataset.uses_wmts()):
+            self.offline_button = OfflineButton(self.dataset)
+            title_hl.addWidget(self.offline_button)
+        else:
+            self.offline_button = None
+
         if Capability.Add in self.dataset.capabilities:
             self.add_button = AddButton(self.dataset)
             title_hl.addWidget(self.add_button)
@@ -475,13 +483,19 @@ class DatasetDialog(QDialog):
             res.append(('Last updated', DatasetGuiUtils.format_date(last_updated)))
 
         if Capability.RevisionCount in self.dataset.capabilities:
-            data_revisions_count = \
-                KoordinatesClient.instance().data_revisions_count(
+            # fire both requests before waiting, so that they run in parallel
+            data_revisions_request = \
+                KoordinatesClient.instance().data_revisions_count_async(
                     self.dataset.id)
-            total_revisions_count = \
-                KoordinatesClient.instance().total_revisions_count(
+            total_revisions_request = \
+                KoordinatesClient.instance().total_revisions_count_async(
                     self.dataset.id)
 
+            data_revisions_request.wait()
+            total_revisions_request.wait()
+            data_revisions_count = data_revisions_request.result()
+            total_revisions_count = total_revisions_request.result()
+
             if data_revisions_count is not None or total_revisions_count is not None:
                 res.append(
                     ('Revisions',
@@ -0,0 +1,328 @@
+import platform
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+
+from qgis.PyQt.QtCore import (
+    Qt,
+    QAbstractItemModel,
+    QModelIndex,
+    QObject,
+    QRect,
+    QRectF,
+    QSize
+)
+from qgis.PyQt.QtGui import (
+    QBrush,
+    QColor,
+    QFont,
+    QFontMetrics,
+    QPainter,
+    QPen
+)
+from qgis.PyQt.QtWidgets import (
+    QStyle,
+    QStyledItemDelegate,
+    QStyleOptionViewItem
+)
+
+from .dataset_browser_items import (
+    CardLayout,
+    DatasetItemLayout,
+    DatasetItemWidget,
+    DatasetItemWidgetBase
+)
+from .enums import StandardExploreModes
+
+
+class DatasetListModel(QAbstractItemModel):
+    """
+    Qt model for dataset search results
+    """
+
+    TitleRole = Qt.UserRole + 1
+    DatasetRole = Qt.UserRole + 2
+    PublisherNameRole = Qt.UserRole + 3
+
+    def __init__(self, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.datasets: List[Dict] = []
+
+    def clear(self):
+        """
+        Removes all datasets from the model
+        """
+        self.beginResetModel()
+        self.datasets = []
+        self.endResetModel()
+
+    def append_datasets(self, datasets: List[Dict]):
+        """
+        Appends datasets to the end of the model
+        """
+        if not datasets:
+            return
+
+        self.beginInsertRows(QModelIndex(), len(self.datasets),
+                             len(self.datasets) + len(datasets) - 1)
+        self.datasets.extend(datasets)
+        self.endInsertRows()
+
+    def set_datasets(self, datasets: List[Dict]):
+        """
+        Replaces the datasets in the model.
+
+        The new datasets are diffed against the existing datasets by
+        dataset ID, so that existing rows are kept (and moved if required)
+        and only the differences are removed or inserted.
+        """
+        new_ids = [dataset.get('id') for dataset in datasets]
+        if len(set(new_ids)) != len(new_ids):
+            # can't diff by ID
+            self.beginResetModel()
+            self.datasets = list(datasets)
+            self.endResetModel()
+            return
+
+        new_id_set = set(new_ids)
+
+        # remove rows for datasets which are no longer present, as
+        # contiguous blocks from the end
+        row = len(self.datasets) - 1
+        while row >= 0:
+            if self.datasets[row].get('id') in new_id_set:
+                row -= 1
+                continue
+
+            last = row
+            while row > 0 and \
+                    self.datasets[row - 1].get('id') not in new_id_set:
+                row -= 1
+            self.beginRemoveRows(QModelIndex(), row, last)
+            del self.datasets[row:last + 1]
+            self.endRemoveRows()
+            row -= 1
+
+        # move and insert rows to match the new order
+        existing_ids = {dataset.get('id') for dataset in self.datasets}
+        row = 0
+        while row < len(datasets):
+            dataset_id = new_ids[row]
+            if dataset_id not in existing_ids:
+                # insert the new datasets as a contiguous block
+                last = row
+                while last + 1 < len(datasets) and \
+                        new_ids[last + 1] not in existing_ids:
+                    last += 1
+                self.beginInsertRows(QModelIndex(), row, last)
+                self.datasets[row:row] = datasets[row:last + 1]
+                self.endInsertRows()
+                row = last + 1
+                continue
+
+            if self.datasets[row].get('id') != dataset_id:
+                source_row = next(
+                    i for i in range(row + 1, len(self.datasets))
+                    if self.datasets[i].get('id') == dataset_id)
+                self.beginMoveRows(QModelIndex(), source_row, source_row,
+                                   QModelIndex(), row)
+                self.datasets.insert(row, self.datasets.pop(source_row))
+                self.endMoveRows()
+
+            if self.datasets[row] != datasets[row]:
+                self.datasets[row] = datasets[row]
+                index = self.index(row, 0)
+                self.dataChanged.emit(index, index)
+            else:
+                self.datasets[row] = datasets[row]
+
+            row += 1
+
+    # Qt model interface
+
+    # pylint: disable=missing-docstring, unused-arguments
+    def index(self, row, column, parent=QModelIndex()):
+        if column < 0 or column >= self.columnCount():
+            return QModelIndex()
+
+        if not parent.isValid() and 0 <= row < len(self.datasets):
+            return self.createIndex(row, column)
+
+        return QModelIndex()
+
+    def parent(self, index):
+        return QModelIndex()  # all are top level items
+
+    def rowCount(self, parent=QModelIndex()):
+        if not parent.isValid():
+            return len(self.datasets)
+        # no child items
+        return 0
+
+    def columnCount(self, parent=QModelIndex()):
+        return 1
+
+    def data(self, index, role=Qt.DisplayRole):
+        dataset = self.index2dataset(index)
+        if dataset:
+            if role == self.DatasetRole:
+                return dataset
+
+            if role in (self.TitleRole, Qt.DisplayRole):
+                return dataset.get('title', 'Layer')
+
+            if role == self.PublisherNameRole:
+                return (dataset.get('publisher') or {}).get('name')
+
+        return None
+
+    def flags(self, index):
+        f = super().flags(index)
+        if not index.isValid():
+            return f
+
+        return f | Qt.ItemIsEnabled
+
+    # pylint: enable=missing-docstring, unused-arguments
+    def index2dataset(self, index: QModelIndex) -> Optional[Dict]:
+        """
+        Returns the dataset at the given model index
+        """
+        if not index.isValid() or index.row() < 0 or index.row() >= len(
+                self.datasets):
+            return None
+
+        return self.datasets[index.row()]
+
+
+class DatasetCardDelegate(QStyledItemDelegate):
+    """
+    Lightweight delegate for painting dataset cards which don't have
+    an interactive widget, e.g. cards which are scrolled out of view.
+
+    Follows the Tall, Wide and Compact card arrangements used by
+    DatasetItemWidget.
+    """
+
+    COMPACT_THUMBNAIL_WIDTH = 111
+
+    def __init__(self,
+                 parent: Optional[QObject] = None,
+                 mode: str = StandardExploreModes.Browse):
+        super().__init__(parent)
+        self._mode = mode
+        self._column_count = 1
+
+    def set_column_count(self, count: int):
+        """
+        Sets the number of table columns in the parent table
+        """
+        self._column_count = count
+
+    def arrangement(self, rect: QRect) -> CardLayout:
+        """
+        Returns the card arrangement for a card rect
+        """
+        return DatasetItemLayout.arrangement_for_width(self._column_count,
+                                                       rect.width())
+
+    def sizeHint(self, option, index):
+        return QSize(
+            option.rect.width(),
+            DatasetItemLayout.fixed_height_for_arrangement(
+                self.arrangement(option.rect)
+            )
+        )
+
+    def paint(self, painter: QPainter, option: QStyleOptionViewItem,
+              index: QModelIndex):
+        rect = option.rect
+        arrangement = self.arrangement(rect)
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+        painter.setRenderHint(QPainter.TextAntialiasing, True)
+
+        border_rect = QRectF(rect).adjusted(0.5, 0.5, -0.5, -0.5)
+        if option.state & QStyle.State_Selected:
+            pen = QPen(QColor(DatasetItemWidget.SELECTED_COLOR))
+            pen.setWidth(2)
+            border_rect = QRectF(rect).adjusted(1, 1, -1, -1)
+        elif self._mode == StandardExploreModes.Browse:
+            pen = QPen(QColor('#dddddd'))
+            pen.setWidth(0)
+        else:
+            pen = QPen(QColor(0, 0, 0, 0))
+            pen.setWidth(0)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.setBrush(QBrush(QColor(255, 255, 255)))
+        painter.drawRoundedRect(
+            border_rect,
+            DatasetItemWidgetBase.THUMBNAIL_CORNER_RADIUS,
+            DatasetItemWidgetBase.THUMBNAIL_CORNER_RADIUS)
+
+        if arrangement == CardLayout.Tall:
+            thumbnail_rect = QRect(rect.left() + 1, rect.top() + 1,
+                                   rect.width() - 2,
+                                   DatasetItemWidgetBase.THUMBNAIL_SIZE)
+            title_rect = QRect(rect.left() + 17, rect.top() + 165,
+                               rect.width() - 17 * 2 - 20, 60)
+        elif arrangement == CardLayout.Wide:
+            thumbnail_rect = QRect(rect.left() + 1, rect.top() + 1,
+                                   DatasetItemWidgetBase.THUMBNAIL_SIZE,
+                                   DatasetItemWidgetBase.THUMBNAIL_SIZE)
+            title_rect = QRect(rect.left() + 160, rect.top() + 15,
+                               rect.width() - 160 - 40, 90)
+        else:
+            thumbnail_rect = QRect(rect.left() + 1, rect.top() + 1,
+                                   self.COMPACT_THUMBNAIL_WIDTH,
+                                   rect.height() - 2)
+            left = 11 + self.COMPACT_THUMBNAIL_WIDTH
+            title_rect = QRect(rect.left() + left, rect.top() + 15,
+                               rect.width() - left - 40, 90)
+
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(QBrush(QColor('#e6e6e6')))
+        painter.drawRoundedRect(
+            QRectF(thumbnail_rect),
+            DatasetItemWidgetBase.THUMBNAIL_CORNER_RADIUS,
+            DatasetItemWidgetBase.THUMBNAIL_CORNER_RADIUS)
+
+        title = index.data(DatasetListModel.TitleRole)
+        publisher_name = index.data(DatasetListModel.PublisherNameRole)
+
+        title_font_size = 11
+        if platform.system() == 'Darwin':
+            title_font_size = 14
+
+        font = QFont('Arial')
+        font.setPointSizeF(title_font_size)
+        font.setBold(True)
+        painter.setFont(font)
+        metrics = QFontMetrics(font)
+
+        painter.setBrush(Qt.NoBrush)
+        painter.setPen(QPen(QColor(0, 0, 0)))
+        if title:
+            painter.drawText(
+                title_rect.left(),
+                title_rect.top() + metrics.ascent(),
+                metrics.elidedText(title, Qt.ElideRight, title_rect.width())
+            )
+
+        if publisher_name:
+            font.setBold(False)
+            painter.setFont(font)
+            painter.setPen(QPen(QColor('#868889')))
+            painter.drawText(
+                title_rect.left(),
+                title_rect.top() + int(metrics.height() * 1.3) +
+                metrics.ascent(),
+                metrics.elidedText(publisher_name, Qt.ElideRight,
+                                   title_rect.width())
+            )
+
+        painter.restore()
@@ -108,5 +108,7 @@ class ExtentSelectionPanel(QWidget, WIDGET):
         elif self.combo_mode.currentData() == ExtentSelectionPanel.MODE_SELECT:
             return self._custom_extent
         elif self.combo_mode.currentData() == ExtentSelectionPanel.MODE_LAYER:
+            if self.layer_combo.currentLayer() is None:
+                return None
             return QgsReferencedRectangle(self.layer_combo.currentLayer().extent(),
                                           self.layer_combo.currentLayer().crs())
@@ -1,3 +1,4 @@
+import time
 from typing import (
     Optional,
     List,
@@ -43,11 +44,27 @@ from ..api import (
 
 class FilterWidget(QWidget):
     filters_changed = pyqtSignal()
+    # emitted immediately when the search text is edited, before the
+    # (debounced) filters_changed signal
+    search_text_edited = pyqtSignal(str)
     explore = pyqtSignal(str)
     explore_publishers = pyqtSignal()
     publisher_changed = pyqtSignal(object)
     clear_all = pyqtSignal()
 
+    # bounds for the delay before searching after the search text is edited
+    SEARCH_DEBOUNCE_MIN_MS = 150
+    SEARCH_DEBOUNCE_MAX_MS = 800
+
+    # typing interval assumed before the user's typing cadence is known,
+    # in seconds
+    DEFAULT_TYPING_INTERVAL = 0.2
+    # gaps between keystrokes longer than this are pauses in typing, and
+    # are excluded from the typing cadence
+    TYPING_PAUSE = 1.0
+    # smoothing factor for the average typing interval
+    TYPING_SMOOTHING = 0.3
+
     def __init__(self, parent):
         super().__init__(parent)
 
@@ -73,8 +90,9 @@ class FilterWidget(QWidget):
 
         self.explore_tab_bar.mode_changed.connect(self._explore_mode_changed)
         self.advanced_filter_widget = AdvancedFilterWidget(self)
+        # changes to the advanced filters are already debounced
         self.advanced_filter_widget.filters_changed.connect(
-            self._filter_widget_changed)
+            self._update_query)
         self.advanced_filter_widget.publisher_changed.connect(
             self.publisher_changed)
 
@@ -90,8 +108,8 @@ class FilterWidget(QWidget):
 
         vl.addWidget(self.narrow_widget)
 
-        # changes to filter parameters are deferred to a small timeout, to avoid
-        # starting lots of queries while a user is mid-operation (such as dragging a slider)
+        # changes to the search text are deferred to a small timeout, to avoid
+        # starting lots of queries while a user is mid-word
         self._update_query_timeout = QTimer(self)
         self._update_query_timeout.setSingleShot(True)
         self._update_query_timeout.timeout.connect(self._update_query)
@@ -138,6 +156,9 @@ class FilterWidget(QWidget):
         self.setLayout(vl)
 
         self.search_line_edit: Optional[QgsFilterLineEdit] = None
+        self._search_text = ''
+        self._last_keystroke_time: Optional[float] = None
+        self._typing_interval: Optional[float] = None
 
         KoordinatesClient.instance().explore_sections_retrieved.connect(
             self._explore_sections_retrieved
@@ -232,9 +253,61 @@ class FilterWidget(QWidget):
         self.search_line_edit.textChanged.connect(self._search_text_changed)
 
     def _search_text_changed(self):
-        if self.search_line_edit.text().strip():
+        self._record_keystroke()
+
+        search_text = self.search_line_edit.text().strip()
+        if search_text == self._search_text:
+            return
+
+        self._search_text = search_text
+        if not search_text:
+            return
+
+        if self.explore_mode() != StandardExploreModes.Browse:
+            # switching to the browse mode immediately starts a search
             self.set_explore_mode(StandardExploreModes.Browse)
-            self._filter_widget_changed()
+            return
+
+        self.search_text_edited.emit(search_text)
+        self._update_query_timeout.start(self._search_debounce_interval())
+
+    def _record_keystroke(self):
+        """
+        Updates the user's typing cadence after a search text edit
+        """
+        now = time.monotonic()
+        if self._last_keystroke_time is not None:
+            interval = now - self._last_keystroke_time
+            if interval < self.TYPING_PAUSE:
+                if self._typing_interval is None:
+                    self._typing_interval = interval
+                else:
+                    self._typing_interval += self.TYPING_SMOOTHING * (
+                        interval - self._typing_interval)
+
+        self._last_keystroke_time = now
+
+    def _search_debounce_interval(self) -> int:
+        """
+        Returns the delay before searching after the search text is
+        edited, in milliseconds.
+
+        The delay is a little longer than the user's typical interval
+        between keystrokes, so that searches aren't started mid-word. It
+        is extended when API requests are slow, as every superseded
+        search then wastes more time.
+        """
+        typing_interval = self._typing_interval \
+            if self._typing_interval is not None \
+            else self.DEFAULT_TYPING_INTERVAL
+        delay = typing_interval * 1.5
+
+        latency = KoordinatesClient.instance().average_request_latency()
+        if latency is not None:
+            delay = max(delay, latency / 2)
+
+        return int(min(max(delay * 1000, self.SEARCH_DEBOUNCE_MIN_MS),
+                       self.SEARCH_DEBOUNCE_MAX_MS))
 
     def set_is_browse_tab(self, is_browse: bool):
         """
@@ -341,11 +414,6 @@ class FilterWidget(QWidget):
         self._starred = starred
         self._update_query()
 
-    def _filter_widget_changed(self):
-        # changes to filter parameters are deferred to a small timeout, to avoid
-        # starting lots of queries while a user is mid-operation (such as dragging a slider)
-        self._update_query_timeout.start(500)
-
     def build_query(self) -> DataBrowserQuery:
         """
         Returns a query representing the current widget state
@@ -390,6 +458,7 @@ class FilterWidget(QWidget):
         self.advanced_filter_widget.set_from_query(query)
 
     def _update_query(self):
+        self._update_query_timeout.stop()
         self.filters_changed.emit()
 
     def remove_publisher_filter(self):
@@ -2,6 +2,7 @@ from .access_filter_widget import AccessFilterWidget  # NOQA
 from .category_filter_widget import CategoryFilterWidget  # NOQA
 from .data_type_filter_widget import DataTypeFilterWidget  # NOQA
 from .date_filter_widget import DateFilterWidget  # NOQA
+from .extent_filter_widget import ExtentFilterWidget  # NOQA
 from .group_filter_widget import GroupFilterWidget  # NOQA
 from .license_filter_widget import LicenseFilterWidget  # NOQA
 from .publisher_filter_widget import PublisherFilterWidget  # NOQA
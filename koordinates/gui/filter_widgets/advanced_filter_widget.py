@@ -22,6 +22,7 @@ from qgis.PyQt.QtWidgets import (
 from .access_filter_widget import AccessFilterWidget
 from .data_type_filter_widget import DataTypeFilterWidget
 from .date_filter_widget import DateFilterWidget
+from .extent_filter_widget import ExtentFilterWidget
 from .publisher_filter_widget import PublisherFilterWidget
 from .group_filter_widget import GroupFilterWidget
 from .license_filter_widget import LicenseFilterWidget
@@ -47,6 +48,7 @@ class AdvancedFilterWidget(QWidget):
 
         self.should_show = False
         self.appearance = FilterWidgetAppearance.Horizontal
+        self._facets = {}
 
         # self.category_filter_widget = CategoryFilterWidget(self)
         self.data_type_filter_widget = DataTypeFilterWidget(self)
@@ -56,6 +58,7 @@ class AdvancedFilterWidget(QWidget):
         self.license_widget = LicenseFilterWidget(self)
         self.group_widget = GroupFilterWidget(self)
         self.access_widget = AccessFilterWidget(self)
+        self.extent_widget = ExtentFilterWidget(self)
 
         self.filter_widgets = (  # self.category_filter_widget,
             self.data_type_filter_widget,
@@ -64,7 +67,8 @@ class AdvancedFilterWidget(QWidget):
             self.date_filter_widget,
             self.license_widget,
             self.group_widget,
-            self.access_widget,)
+            self.access_widget,
+            self.extent_widget,)
 
         min_filter_widget_width = QFontMetrics(self.font()).width('x') * 25
         # self.category_filter_widget.setMinimumWidth(min_filter_widget_width)
@@ -217,10 +221,17 @@ class AdvancedFilterWidget(QWidget):
 
     def set_facets(self, facets: dict):
         """
-        Sets corresponding facets response for tweaking the widget choices
+        Sets corresponding facets response for tweaking the widget choices.
+
+        Only widgets which depend on facets which have changed since the
+        previous response are updated.
         """
         for w in self.filter_widgets:
-            w.set_facets(facets)
+            if any(facets.get(key) != self._facets.get(key)
+                   for key in w.FACET_KEYS):
+                w.set_facets(facets)
+
+        self._facets = facets
 
     def set_should_show(self, show):
         self.should_show = show
@@ -17,6 +17,8 @@ class CategoryFilterWidget(FilterWidgetComboBase):
     Custom widget for category based filtering
     """
 
+    FACET_KEYS = ('category',)
+
     def __init__(self, parent):
         super().__init__(parent)
 
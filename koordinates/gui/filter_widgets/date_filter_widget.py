@@ -55,6 +55,8 @@ class DateFilterWidget(FilterWidgetComboBase):
     Custom widget for date selection
     """
 
+    FACET_KEYS = ('updated_at', 'created_at')
+
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
 
@@ -0,0 +1,121 @@
+from typing import Optional
+
+from qgis.PyQt.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QCheckBox
+)
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCsException,
+    QgsProject,
+    QgsRectangle
+)
+from qgis.utils import iface
+
+from .filter_widget_combo_base import FilterWidgetComboBase
+from ...api import DataBrowserQuery
+
+
+class ExtentFilterWidget(FilterWidgetComboBase):
+    """
+    Custom widget for filtering to datasets intersecting the current
+    map canvas extent
+    """
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+
+        self.drop_down_widget = QWidget()
+        vl = QVBoxLayout()
+
+        self.canvas_checkbox = QCheckBox('Intersecting current map extent')
+        self.canvas_checkbox.toggled.connect(self._update_value)
+        vl.addWidget(self.canvas_checkbox)
+
+        self.drop_down_widget.setLayout(vl)
+
+        self.set_contents_widget(self.drop_down_widget)
+
+        if iface is not None:
+            iface.mapCanvas().extentsChanged.connect(
+                self._canvas_extent_changed)
+
+        self._update_visible_frames()
+        self._block_changes += 1
+        self._update_value()
+        self._block_changes -= 1
+
+    def _update_visible_frames(self):
+        self.drop_down_widget.adjustSize()
+        self._floating_widget.reflow()
+
+    def _canvas_extent_changed(self):
+        if self.canvas_checkbox.isChecked() and not self._block_changes:
+            # the query must follow the canvas. Changes are already
+            # debounced by the advanced filter widget, so panning doesn't
+            # start lots of queries
+            self.changed.emit()
+
+    def clear(self):
+        if not self.canvas_checkbox.isChecked():
+            return
+
+        self.canvas_checkbox.setChecked(False)
+
+    def should_show_clear(self):
+        if not self.canvas_checkbox.isChecked():
+            return False
+
+        return super().should_show_clear()
+
+    def _update_value(self):
+        text = 'Extent'
+        if self.canvas_checkbox.isChecked():
+            text = 'Current map extent'
+
+        self.set_current_text(text)
+        if not self._block_changes:
+            self.changed.emit()
+
+    @staticmethod
+    def canvas_extent() -> Optional[QgsRectangle]:
+        """
+        Returns the current map canvas extent in EPSG:4326, or None if
+        it is not available
+        """
+        if iface is None:
+            return None
+
+        canvas = iface.mapCanvas()
+        transform = QgsCoordinateTransform(
+            canvas.mapSettings().destinationCrs(),
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsProject.instance()
+        )
+        try:
+            extent = transform.transformBoundingBox(canvas.extent())
+        except QgsCsException:
+            return None
+
+        extent = extent.intersect(QgsRectangle(-180, -90, 180, 90))
+        if extent.isEmpty():
+            return None
+
+        return extent
+
+    def apply_constraints_to_query(self, query: DataBrowserQuery):
+        if self.canvas_checkbox.isChecked():
+            query.extent = ExtentFilterWidget.canvas_extent()
+        else:
+            query.extent = None
+
+    def set_from_query(self, query: DataBrowserQuery):
+        self._block_changes += 1
+
+        self.canvas_checkbox.setChecked(query.extent is not None)
+
+        self._update_value()
+        self._update_visible_frames()
+        self._block_changes -= 1
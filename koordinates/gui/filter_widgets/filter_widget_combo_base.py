@@ -11,6 +11,9 @@ class FilterWidgetComboBase(CustomComboBox):
 
     changed = pyqtSignal()
 
+    # the facets response keys which the widget choices depend on
+    FACET_KEYS = ()
+
     def __init__(self, parent):
         super().__init__(parent)
         self.set_show_clear_button(True)
@@ -18,6 +18,8 @@ class GroupFilterWidget(FilterWidgetComboBase):
     Custom widget for group based filtering
     """
 
+    FACET_KEYS = ('group', 'from')
+
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
         self._current_context: Optional[str] = None
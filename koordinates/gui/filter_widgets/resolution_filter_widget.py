@@ -18,6 +18,8 @@ class ResolutionFilterWidget(FilterWidgetComboBase):
     Custom widget for resolution selection
     """
 
+    FACET_KEYS = ('raster_resolution',)
+
     def __init__(self, parent: Optional[QWidget] = None):
         super().__init__(parent)
 
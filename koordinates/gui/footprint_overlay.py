@@ -0,0 +1,404 @@
+from typing import (
+    Dict,
+    List,
+    Optional
+)
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import (
+    Qt,
+    QObject,
+    QPointF
+)
+from qgis.PyQt.QtGui import (
+    QBrush,
+    QColor,
+    QPainter,
+    QPen,
+    QPolygonF,
+    QTransform
+)
+from qgis.core import (
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCsException,
+    QgsFeature,
+    QgsGeometry,
+    QgsPointXY,
+    QgsProject,
+    QgsRectangle,
+    QgsSpatialIndex
+)
+from qgis.gui import (
+    QgsMapCanvas,
+    QgsMapCanvasItem
+)
+from qgis.utils import iface
+
+from ..api import KoordinatesClient
+
+
+class FootprintCanvasItem(QgsMapCanvasItem):
+    """
+    A single map canvas item which draws the footprints for all
+    datasets in a FootprintOverlay
+    """
+
+    OUTLINE_COLOR = QColor(255, 0, 0, 90)
+    HIGHLIGHT_OUTLINE_COLOR = QColor(255, 0, 0, 200)
+    HIGHLIGHT_FILL_COLOR = QColor(255, 0, 0, 40)
+
+    def __init__(self, canvas: QgsMapCanvas, overlay: 'FootprintOverlay'):
+        super().__init__(canvas)
+        self._overlay = overlay
+        self.setZValue(100)
+
+    @staticmethod
+    def map_to_item_transform(extent: QgsRectangle,
+                              top_left: QPointF,
+                              top_right: QPointF,
+                              bottom_left: QPointF) -> QTransform:
+        """
+        Returns the affine transform from map coordinates to item
+        coordinates, given the item coordinates of three corners of a
+        map extent
+        """
+        x_axis = (top_right - top_left) / extent.width()
+        y_axis = (bottom_left - top_left) / -extent.height()
+
+        m11, m12 = x_axis.x(), x_axis.y()
+        m21, m22 = y_axis.x(), y_axis.y()
+        dx = top_left.x() - m11 * extent.xMinimum() - m21 * extent.yMaximum()
+        dy = top_left.y() - m12 * extent.xMinimum() - m22 * extent.yMaximum()
+        return QTransform(m11, m12, m21, m22, dx, dy)
+
+    def paint(self, painter: QPainter, option=None, widget=None):
+        extent = self.mapCanvas().extent()
+        if extent.isEmpty():
+            return
+
+        # transform the cached map coordinate polygons with a single
+        # affine transform, instead of transforming each vertex
+        pos = self.pos()
+        transform = FootprintCanvasItem.map_to_item_transform(
+            extent,
+            self.toCanvasCoordinates(
+                QgsPointXY(extent.xMinimum(), extent.yMaximum())) - pos,
+            self.toCanvasCoordinates(
+                QgsPointXY(extent.xMaximum(), extent.yMaximum())) - pos,
+            self.toCanvasCoordinates(
+                QgsPointXY(extent.xMinimum(), extent.yMinimum())) - pos
+        )
+
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing, True)
+
+        pen = QPen(self.OUTLINE_COLOR)
+        pen.setWidthF(1)
+        pen.setCosmetic(True)
+        painter.setPen(pen)
+        painter.setBrush(Qt.NoBrush)
+
+        highlighted = self._overlay.highlighted()
+        for dataset_id in self._overlay.dataset_ids_in_extent(extent):
+            if dataset_id == highlighted:
+                continue
+            for polygon in self._overlay.polygons(dataset_id):
+                painter.drawPolygon(transform.map(polygon))
+
+        if highlighted is not None:
+            pen = QPen(self.HIGHLIGHT_OUTLINE_COLOR)
+            pen.setWidthF(2)
+            pen.setCosmetic(True)
+            painter.setPen(pen)
+            painter.setBrush(QBrush(self.HIGHLIGHT_FILL_COLOR))
+            for polygon in self._overlay.polygons(highlighted):
+                painter.drawPolygon(transform.map(polygon))
+
+        painter.restore()
+
+
+class FootprintOverlay(QObject):
+    """
+    Manages the footprints of the visible dataset results on the
+    map canvas.
+
+    All footprints are drawn by one canvas item. Dataset extents are
+    transformed to the canvas CRS once, when the datasets are added or
+    the canvas CRS changes, and are stored in a spatial index for
+    culling and hit testing.
+    """
+
+    def __init__(self, canvas: Optional[QgsMapCanvas] = None):
+        super().__init__()
+        self._canvas = canvas
+        self._item: Optional[FootprintCanvasItem] = None
+        self._visible = False
+        # identifies the results which the footprints are shown for
+        self._owner: Optional[object] = None
+
+        # dataset extents in EPSG:4326, by dataset ID
+        self._extents: Dict[str, QgsGeometry] = {}
+        # dataset extents in the canvas CRS, by dataset ID
+        self._geometries: Dict[str, QgsGeometry] = {}
+        self._polygons: Dict[str, List[QPolygonF]] = {}
+
+        self._index = QgsSpatialIndex()
+        self._next_feature_id = 1
+        self._feature_ids: Dict[str, int] = {}
+        self._dataset_ids: Dict[int, str] = {}
+
+        self._highlighted: Optional[str] = None
+        self._hovered_on_map: Optional[str] = None
+
+        self._transform = QgsCoordinateTransform()
+        if self._canvas is not None:
+            self._update_transform()
+            self._canvas.destinationCrsChanged.connect(self._crs_changed)
+            self._canvas.xyCoordinates.connect(self._canvas_mouse_moved)
+
+    def _update_transform(self):
+        """
+        Updates the transform from EPSG:4326 to the canvas CRS
+        """
+        self._transform = QgsCoordinateTransform(
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            self._canvas.mapSettings().destinationCrs(),
+            QgsProject.instance()
+        )
+
+    def show_datasets(self, owner: object, datasets: List[Dict]):
+        """
+        Shows the footprints for a list of datasets, on behalf of an
+        owner object which identifies the result set.
+
+        Only the extents of datasets which aren't already shown are
+        transformed.
+        """
+        self._owner = owner
+        self._visible = True
+        self._set_datasets(datasets)
+
+    def release(self, owner: object):
+        """
+        Hides the footprints if they are shown on behalf of an owner
+        """
+        if owner is not self._owner:
+            return
+
+        self._owner = None
+        self._visible = False
+        self._set_datasets([])
+
+    def _set_datasets(self, datasets: List[Dict]):
+        """
+        Sets the datasets to show footprints for
+        """
+        details_by_id = {str(details['id']): details for details in datasets}
+        for dataset_id in set(self._extents) - set(details_by_id):
+            self._remove(dataset_id)
+
+        client = KoordinatesClient.instance()
+        for dataset_id, details in details_by_id.items():
+            if dataset_id in self._extents:
+                continue
+
+            extent = client.dataset(details).extent
+            if extent is not None:
+                self._add(dataset_id, extent)
+
+        if self._highlighted not in self._extents:
+            self._highlighted = None
+        if self._hovered_on_map not in self._extents:
+            self._hovered_on_map = None
+
+        self._update_item()
+
+    def _add(self, dataset_id: str, extent: QgsGeometry):
+        """
+        Adds a dataset footprint
+        """
+        self._extents[dataset_id] = extent
+
+        geometry = QgsGeometry(extent)
+        try:
+            geometry.transform(self._transform)
+        except QgsCsException:
+            return
+
+        if geometry.isEmpty():
+            return
+
+        feature_id = self._next_feature_id
+        self._next_feature_id += 1
+        self._feature_ids[dataset_id] = feature_id
+        self._dataset_ids[feature_id] = dataset_id
+        self._geometries[dataset_id] = geometry
+        self._polygons[dataset_id] = [
+            part.asQPolygonF() for part in geometry.asGeometryCollection()
+        ]
+        self._index.addFeature(feature_id, geometry.boundingBox())
+
+    def _remove(self, dataset_id: str):
+        """
+        Removes a dataset footprint
+        """
+        del self._extents[dataset_id]
+        feature_id = self._feature_ids.pop(dataset_id, None)
+        if feature_id is None:
+            return
+
+        feature = QgsFeature(feature_id)
+        feature.setGeometry(self._geometries.pop(dataset_id))
+        self._index.deleteFeature(feature)
+        del self._dataset_ids[feature_id]
+        del self._polygons[dataset_id]
+
+    def _crs_changed(self):
+        """
+        Called when the canvas CRS is changed, so that all footprints
+        must be transformed again
+        """
+        self._update_transform()
+
+        extents = self._extents
+        self._extents = {}
+        self._geometries = {}
+        self._polygons = {}
+        self._index = QgsSpatialIndex()
+        self._feature_ids = {}
+        self._dataset_ids = {}
+        for dataset_id, extent in extents.items():
+            self._add(dataset_id, extent)
+
+        self._update_item()
+
+    def _update_item(self):
+        """
+        Updates the canvas item after the footprints are changed
+        """
+        if self._canvas is None or sip.isdeleted(self._canvas):
+            return
+
+        if not self._visible or not self._geometries:
+            if self._item is not None:
+                self._item.hide()
+            return
+
+        if self._item is None:
+            self._item = FootprintCanvasItem(self._canvas, self)
+
+        rect = QgsRectangle()
+        rect.setMinimal()
+        for geometry in self._geometries.values():
+            rect.combineExtentWith(geometry.boundingBox())
+        self._item.setRect(rect)
+        self._item.show()
+        self._item.update()
+
+    def dataset_ids_in_extent(self, extent: QgsRectangle) -> List[str]:
+        """
+        Returns the IDs of datasets with footprints intersecting an
+        extent in the canvas CRS
+        """
+        return [self._dataset_ids[feature_id]
+                for feature_id in self._index.intersects(extent)]
+
+    def polygons(self, dataset_id: str) -> List[QPolygonF]:
+        """
+        Returns the footprint polygons for a dataset, in the canvas CRS
+        """
+        return self._polygons.get(dataset_id, [])
+
+    def dataset_at(self, point: QgsPointXY) -> Optional[str]:
+        """
+        Returns the ID of the dataset with a footprint containing a point
+        in the canvas CRS.
+
+        If multiple footprints contain the point then the smallest
+        footprint is returned.
+        """
+        candidates = [
+            dataset_id for dataset_id in self.dataset_ids_in_extent(
+                QgsRectangle(point.x(), point.y(), point.x(), point.y()))
+            if self._geometries[dataset_id].contains(point)
+        ]
+        if not candidates:
+            return None
+
+        return min(candidates,
+                   key=lambda dataset_id: self._geometries[dataset_id].area())
+
+    def highlighted(self) -> Optional[str]:
+        """
+        Returns the ID of the highlighted dataset, if any
+        """
+        return self._highlighted
+
+    def set_highlighted(self, dataset_id: Optional[object]):
+        """
+        Sets the dataset to highlight, e.g. when its result card is
+        hovered
+        """
+        dataset_id = str(dataset_id) if dataset_id is not None else None
+        if dataset_id not in self._extents:
+            dataset_id = None
+
+        if dataset_id == self._highlighted:
+            return
+
+        self._highlighted = dataset_id
+        if self._item is not None and self._item.isVisible():
+            self._item.update()
+
+    def _canvas_mouse_moved(self, point: QgsPointXY):
+        """
+        Highlights the footprint under the mouse on the canvas
+        """
+        if not self._visible or not self._geometries:
+            return
+
+        dataset_id = self.dataset_at(point)
+        if dataset_id == self._hovered_on_map:
+            return
+
+        self._hovered_on_map = dataset_id
+        self.set_highlighted(dataset_id)
+
+    def unload(self):
+        """
+        Removes the overlay from the canvas
+        """
+        if self._canvas is not None and not sip.isdeleted(self._canvas):
+            self._canvas.destinationCrsChanged.disconnect(self._crs_changed)
+            self._canvas.xyCoordinates.disconnect(self._canvas_mouse_moved)
+            if self._item is not None and not sip.isdeleted(self._item):
+                self._canvas.scene().removeItem(self._item)
+        self._item = None
+
+
+_footprint_overlay: Optional[FootprintOverlay] = None
+
+
+def footprint_overlay() -> FootprintOverlay:
+    """
+    Returns the shared footprint overlay for the map canvas
+    """
+    global _footprint_overlay
+    if _footprint_overlay is None:
+        _footprint_overlay = FootprintOverlay(
+            iface.mapCanvas() if iface is not None else None
+        )
+
+    return _footprint_overlay
+
+
+def unload_footprint_overlay():
+    """
+    Removes the shared footprint overlay from the map canvas, if it
+    has been created
+    """
+    global _footprint_overlay
+    if _footprint_overlay is not None:
+        _footprint_overlay.unload()
+    _footprint_overlay = None
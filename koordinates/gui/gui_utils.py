@@ -16,10 +16,17 @@ __revision__ = '$Format:%H$'
 import math
 import os
 import re
-from typing import Optional
+import threading
+from collections import OrderedDict
+from typing import (
+    Dict,
+    Optional,
+    Tuple
+)
 
 from qgis.PyQt.QtCore import (
     Qt,
+    QByteArray,
     QTemporaryDir
 )
 from qgis.PyQt.QtGui import (
@@ -52,6 +59,17 @@ class GuiUtils:
 
     APPLICATION_FONT_MAP = {}
 
+    # maps icon file names to their paths
+    ICON_PATHS: Optional[Dict[str, str]] = None
+
+    # rasterized SVG images, keyed by (icon, width, height, background)
+    SVG_IMAGE_CACHE: Dict[Tuple, QImage] = OrderedDict()
+    SVG_IMAGE_CACHE_SIZE = 256
+    # SVG file content, keyed by path
+    SVG_CONTENT_CACHE: Dict[str, QByteArray] = {}
+    # SVG images are rasterized on worker threads too
+    SVG_CACHE_LOCK = threading.Lock()
+
     TEMP_DIR = QTemporaryDir()
     TEMP_FILE_COUNTER = 1
 
@@ -68,6 +86,23 @@ class GuiUtils:
 
         return QIcon(path)
 
+    @staticmethod
+    def icon_paths() -> Dict[str, str]:
+        """
+        Returns an index of the plugin icon file names to their paths
+        """
+        if GuiUtils.ICON_PATHS is None:
+            icon_dir = os.path.join(
+                os.path.dirname(__file__),
+                '..',
+                'icons')
+            GuiUtils.ICON_PATHS = {
+                icon: os.path.join(icon_dir, icon)
+                for icon in os.listdir(icon_dir)
+            }
+
+        return GuiUtils.ICON_PATHS
+
     @staticmethod
     def get_icon_svg(icon: str) -> str:
         """
@@ -75,15 +110,7 @@ class GuiUtils:
         :param icon: icon name (svg file name)
         :return: icon svg path
         """
-        path = os.path.join(
-            os.path.dirname(__file__),
-            '..',
-            'icons',
-            icon)
-        if not os.path.exists(path):
-            return ''
-
-        return path
+        return GuiUtils.icon_paths().get(icon, '')
 
     @staticmethod
     def get_icon_pixmap(icon: str) -> QPixmap:
@@ -107,13 +134,32 @@ class GuiUtils:
     def get_svg_as_image(icon: str, width: int, height: int,
                          background_color: Optional[QColor] = None) -> QImage:
         """
-        Returns an SVG returned as an image
+        Returns an SVG returned as an image.
+
+        Rasterized images are cached, so this is cheap to call repeatedly.
+        Safe to call on a worker thread.
         """
+        key = (icon, width, height,
+               background_color.rgba() if background_color else None)
+        with GuiUtils.SVG_CACHE_LOCK:
+            image = GuiUtils.SVG_IMAGE_CACHE.get(key)
+            if image is not None:
+                GuiUtils.SVG_IMAGE_CACHE.move_to_end(key)
+                return QImage(image)
+
         path = GuiUtils.get_icon_svg(icon)
-        if not os.path.exists(path):
+        if not path:
             return QImage()
 
-        renderer = QSvgRenderer(path)
+        with GuiUtils.SVG_CACHE_LOCK:
+            content = GuiUtils.SVG_CONTENT_CACHE.get(path)
+        if content is None:
+            with open(path, 'rb') as f:
+                content = QByteArray(f.read())
+            with GuiUtils.SVG_CACHE_LOCK:
+                GuiUtils.SVG_CONTENT_CACHE[path] = content
+
+        renderer = QSvgRenderer(content)
         image = QImage(width, height, QImage.Format_ARGB32)
         if not background_color:
             image.fill(Qt.transparent)
@@ -124,7 +170,13 @@ class GuiUtils:
         renderer.render(painter)
         painter.end()
 
-        return image
+        with GuiUtils.SVG_CACHE_LOCK:
+            GuiUtils.SVG_IMAGE_CACHE[key] = image
+            while len(GuiUtils.SVG_IMAGE_CACHE) > \
+                    GuiUtils.SVG_IMAGE_CACHE_SIZE:
+                GuiUtils.SVG_IMAGE_CACHE.popitem(last=False)
+
+        return QImage(image)
 
     @staticmethod
     def svg_to_icon(svg_content: bytes) -> QIcon:
@@ -1,4 +1,3 @@
-import json
 import locale
 import os
 from functools import partial
@@ -17,7 +16,6 @@ from qgis.PyQt.QtCore import (
     QSize,
     QObject,
     QEvent,
-    QUrlQuery,
     pyqtSignal
 )
 from qgis.PyQt.QtGui import (
@@ -26,7 +24,6 @@ from qgis.PyQt.QtGui import (
     QColor,
     QIcon
 )
-from qgis.PyQt.QtNetwork import QNetworkReply
 from qgis.PyQt.QtWidgets import (
     QVBoxLayout,
     QAction,
@@ -68,6 +65,7 @@ from .login_widget import LoginWidget
 from .svg_label import SvgLabel
 from .thumbnails import downloadThumbnail
 from ..api import (
+    ApiRequest,
     KoordinatesClient,
     SortOrder,
     DataBrowserQuery,
@@ -413,7 +411,7 @@ class Koordinates(QgsDockWidget, WIDGET):
 
         self._block_searching = 0
         self._facets = {}
-        self._current_facets_reply = None
+        self._current_facets_request: Optional[ApiRequest] = None
         self._visible_count = -1
         self._total_count = -1
         self._contexts = []
@@ -517,6 +515,8 @@ class Koordinates(QgsDockWidget, WIDGET):
         self.results_panel.total_count_changed.connect(self._total_count_changed)
         self.results_panel.publisher_selected.connect(
             self._publisher_selected)
+        self.results_panel.selection_changed.connect(
+            self._selection_changed)
         self.oauth: Optional[OAuthWorkflow] = None
 
         self.login_widget = LoginWidget(self)
@@ -534,6 +534,17 @@ class Koordinates(QgsDockWidget, WIDGET):
         self.button_sort_order.setToolButtonStyle(Qt.ToolButtonTextOnly)
         self.button_sort_order.setAutoRaise(True)
 
+        self.button_add_selected = QToolButton()
+        self.button_add_selected.setToolButtonStyle(Qt.ToolButtonTextOnly)
+        self.button_add_selected.setAutoRaise(True)
+        self.button_add_selected.setToolTip(
+            'Add all selected datasets to the project.\n'
+            'Ctrl+click results to select them, or Shift+click to select '
+            'a range.')
+        self.button_add_selected.clicked.connect(
+            self.results_panel.add_selected_datasets)
+        self.button_add_selected.hide()
+
         self.browse_header_widget = QWidget()
         self.browse_header_widget.setSizePolicy(QSizePolicy.Ignored,
                                                 QSizePolicy.Fixed)
@@ -541,6 +552,7 @@ class Koordinates(QgsDockWidget, WIDGET):
         results_top_layout.setContentsMargins(0, 0, 0, 0)
         results_top_layout.addWidget(self.label_count)
         results_top_layout.addStretch()
+        results_top_layout.addWidget(self.button_add_selected)
         results_top_layout.addWidget(self.button_sort_order)
         self.browse_header_widget.setLayout(results_top_layout)
         results_layout.addWidget(self.browse_header_widget)
@@ -580,6 +592,8 @@ class Koordinates(QgsDockWidget, WIDGET):
         self.context_frame.color_height = int(self.filter_widget.height() / 2)
 
         self.filter_widget.filters_changed.connect(self.search)
+        self.filter_widget.search_text_edited.connect(
+            self._search_text_edited)
         self.filter_widget.explore.connect(self.explore)
         self.filter_widget.explore_publishers.connect(self.explore_publishers)
 
@@ -605,6 +619,7 @@ class Koordinates(QgsDockWidget, WIDGET):
         smaller_font_size = max(smaller_font.pointSize() - 1, 7)
         smaller_font.setPointSize(smaller_font_size)
         self.button_sort_order.setFont(smaller_font)
+        self.button_add_selected.setFont(smaller_font)
 
         self.label_count.setFont(smaller_font)
         active_color = self.palette().color(QPalette.WindowText)
@@ -662,11 +677,10 @@ class Koordinates(QgsDockWidget, WIDGET):
         """
         self.login_widget.cancel_active_requests()
 
-        if self._current_facets_reply is not None and \
-                not sip.isdeleted(self._current_facets_reply):
-            self._current_facets_reply.abort()
+        if self._current_facets_request is not None:
+            self._current_facets_request.cancel()
 
-        self._current_facets_reply = None
+        self._current_facets_request = None
 
         self.results_panel.cancel_active_requests()
 
@@ -894,6 +908,22 @@ class Koordinates(QgsDockWidget, WIDGET):
 
         self.results_panel.populate(browser_query, context)
 
+    def _search_text_edited(self, search: str):
+        """
+        Called immediately when the search text is edited, before the
+        debounced search is started
+        """
+        if self._block_searching:
+            return
+
+        # any facets still being retrieved for the previous search are
+        # superseded
+        if self._current_facets_request is not None:
+            self._current_facets_request.cancel()
+            self._current_facets_request = None
+
+        self.results_panel.prefilter_search(search)
+
     def explore(self, section_slug: str = StandardExploreModes.Popular):
         context = self._current_context
         self.browse_header_widget.hide()
@@ -907,41 +937,39 @@ class Koordinates(QgsDockWidget, WIDGET):
     def _fetch_facets(self,
                       query: Optional[DataBrowserQuery] = None,
                       context: Optional[str] = None):
-        if self._current_facets_reply is not None and not sip.isdeleted(
-                self._current_facets_reply):
-            self._current_facets_reply.abort()
-            self._current_facets_reply = None
+        if self._current_facets_request is not None:
+            self._current_facets_request.cancel()
+            self._current_facets_request = None
 
-        self._current_facets_reply = KoordinatesClient.instance().facets_async(
+        # facets are cached by query, so this is often resolved immediately
+        request = KoordinatesClient.instance().facets_async(
             query=query,
             context=context
         )
-        self._current_facets_reply.finished.connect(
-            partial(self._facets_reply_finished, self._current_facets_reply))
-
-    def _facets_reply_finished(self, reply: QNetworkReply):
+        self._current_facets_request = request
+        request.add_callback(
+            partial(self._facets_retrieved, request, query, context))
+
+    def _facets_retrieved(self, request: ApiRequest,
+                          query: Optional[DataBrowserQuery],
+                          context: Optional[str],
+                          facets: Optional[Dict]):
         if sip.isdeleted(self):
             return
 
-        if reply != self._current_facets_reply:
-            # an old reply we don't care about anymore
-            return
-
-        self._current_facets_reply = None
-        if reply.error() == QNetworkReply.OperationCanceledError:
+        if request is not self._current_facets_request:
+            # an old request we don't care about anymore
             return
 
-        if reply.error() != QNetworkReply.NoError:
-            print('error occurred :(')
+        self._current_facets_request = None
+        if facets is None:
+            # fall back to the catalog mirror, e.g. when offline
+            facets = KoordinatesClient.instance().mirrored_facets(query,
+                                                                  context)
+        if facets is None:
             return
-        #            self.error_occurred.emit(request.reply().errorString())
-
-        # inject context into facets, so that this is accessible to widgets
-        request_url = reply.request().url()
-        from_context = QUrlQuery(request_url.query()).queryItemValue('from')
 
-        self._facets = json.loads(reply.readAll().data().decode())
-        self._facets['from'] = from_context
+        self._facets = facets
         self.filter_widget.set_facets(self._facets)
 
     def _visible_count_changed(self, count):
@@ -966,6 +994,15 @@ class Koordinates(QgsDockWidget, WIDGET):
                     locale.format_string("%d", self._total_count, grouping=True))
             )
 
+    def _selection_changed(self, count: int):
+        """
+        Called when the number of selected datasets changes
+        """
+        self.button_add_selected.setText(
+            '+Add {} Selected'.format(
+                locale.format_string("%d", count, grouping=True)))
+        self.button_add_selected.setVisible(count > 0)
+
     def _publisher_selected(self, publisher: Publisher):
         query = DataBrowserQuery()
         query.data_types = {DataType.Vectors, DataType.Rasters, DataType.Grids}
@@ -1,26 +1,222 @@
-from typing import Optional
+import bisect
+from functools import partial
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Set
+)
 
 from qgis.PyQt.QtCore import (
     Qt,
+    QEvent,
+    QItemSelection,
+    QItemSelectionModel,
+    QModelIndex,
     QRect,
-    QSize
+    QSize,
+    pyqtSignal
 )
+from qgis.PyQt.QtGui import QPainter
 from qgis.PyQt.QtWidgets import (
     QLayout,
+    QLayoutItem,
     QSizePolicy,
     QStyle,
+    QStyleOptionViewItem,
     QWidget,
     QWidgetItem
 )
 
 from .dataset_browser_items import (
+    CardLayout,
     EmptyDatasetItemWidget,
-    DatasetItemWidget
+    DatasetItemLayout,
+    DatasetItemWidget,
+    DatasetItemWidgetBase
+)
+from .dataset_list_model import (
+    DatasetListModel,
+    DatasetCardDelegate
 )
 from .enums import StandardExploreModes
+from .thumbnails import thumbnail_manager
+from ..api import RequestPriority
+
+# matches QLAYOUTSIZE_MAX from qlayoutitem.h
+QLAYOUTSIZE_MAX = 16777215
+
+
+class DatasetCardItem(QLayoutItem):
+    """
+    A layout item for a dataset card in a ResponsiveTableWidget.
+
+    The interactive DatasetItemWidget for the card is only created while
+    the card is visible (see ResponsiveTableWidget.set_visible_rect),
+    otherwise the card is painted by the table's DatasetCardDelegate.
+    """
+
+    def __init__(self, table: 'ResponsiveTableWidget', row: int):
+        super().__init__()
+        self.table = table
+        self.row = row
+        self._geometry = QRect()
+        self._column_count = 1
+        self._widget: Optional[DatasetItemWidget] = None
+
+    def dataset(self) -> Dict:
+        """
+        Returns the dataset details for the card
+        """
+        return self.table.model().datasets[self.row]
+
+    def is_realized(self) -> bool:
+        """
+        Returns True if the interactive widget for the card exists
+        """
+        return self._widget is not None
+
+    def realize(self):
+        """
+        Creates the interactive widget for the card
+        """
+        if self._widget is not None:
+            return
+
+        self._widget = DatasetItemWidget(self.dataset(),
+                                         self._column_count,
+                                         self.table,
+                                         mode=self.table.mode())
+        if self._geometry.isValid():
+            self._widget.setGeometry(self._geometry)
+        if self.table.mode() == StandardExploreModes.Browse:
+            self._widget.selectable = True
+            self._widget.set_selected(self.table.is_row_selected(self.row))
+            self._widget.selection_requested.connect(
+                partial(self.table.card_selection_requested, self))
+        self._widget.show()
+
+    def unrealize(self):
+        """
+        Deletes the interactive widget for the card
+        """
+        if self._widget is None:
+            return
+
+        # clear the reference first, so that the layout doesn't try to
+        # remove this item when the widget is removed from the table
+        widget = self._widget
+        self._widget = None
+        # the card's thumbnail is no longer required
+        thumbnail_manager().release_widget(widget)
+        widget.hide()
+        widget.setParent(None)
+        widget.deleteLater()
+
+    def set_column_count(self, count: int):
+        """
+        Sets the number of columns in the parent table
+        """
+        self._column_count = count
+        if self._widget is not None:
+            self._widget.set_column_count(count)
+
+    def set_visible(self, visible: bool):
+        """
+        Sets whether the card is within the visible area of the table,
+        which determines the priority of its thumbnail download
+        """
+        if self._widget is not None:
+            thumbnail_manager().set_priority(
+                self._widget,
+                RequestPriority.Interactive if visible
+                else RequestPriority.Background
+            )
+
+    # QLayoutItem interface
+
+    # pylint: disable=missing-docstring
+    def widget(self):
+        return self._widget
+
+    def height_for_column_count(self, count: int) -> int:
+        """
+        Returns the card height when shown in a table with the given
+        column count
+        """
+        return DatasetItemLayout.fixed_height_for_arrangement(
+            CardLayout.Tall if count > 1 else CardLayout.Wide
+        )
+
+    def sizeHint(self):
+        return QSize(150, self.height_for_column_count(self._column_count))
+
+    def minimumSize(self):
+        return QSize(150, DatasetItemWidgetBase.CARD_HEIGHT)
+
+    def maximumSize(self):
+        return QSize(QLAYOUTSIZE_MAX, QLAYOUTSIZE_MAX)
+
+    def expandingDirections(self):
+        return Qt.Orientations()
+
+    def isEmpty(self):
+        return False
+
+    def geometry(self):
+        return self._geometry
+
+    def setGeometry(self, rect):
+        self._geometry = QRect(rect)
+        if self._widget is not None:
+            self._widget.setGeometry(rect)
+
+    # pylint: enable=missing-docstring
+
+
+class _RowCache:
+    """
+    Cached row assignments for a ResponsiveTableLayout at a
+    specific column count
+    """
+
+    def __init__(self):
+        # index of the first layout item in each row
+        self.row_starts: List[int] = []
+        self.row_items: List[List[QLayoutItem]] = []
+        self.row_tops: List[int] = []
+        self.row_heights: List[int] = []
+        # number of layout items which have been assigned to rows
+        self.processed_count = 0
+
+    def truncate(self, index: int):
+        """
+        Discards the rows containing the layout item at index and
+        all following items
+        """
+        if index >= self.processed_count:
+            return
+
+        row = bisect.bisect_right(self.row_starts, index) - 1
+        if row < 0:
+            row = 0
+
+        self.processed_count = self.row_starts[row] if self.row_starts \
+            else 0
+        del self.row_starts[row:]
+        del self.row_items[row:]
+        del self.row_tops[row:]
+        del self.row_heights[row:]
 
 
 class ResponsiveTableLayout(QLayout):
+    """
+    A responsive table layout, with the number of columns dependent on
+    the available width.
+
+    Row assignments and row heights are cached for each column count, so
+    that appending items only requires the new items to be laid out.
+    """
 
     def __init__(self, parent, hspacing, vspacing):
         super().__init__(parent)
@@ -32,18 +228,95 @@ class ResponsiveTableLayout(QLayout):
 
         self.itemList = []
 
+        self._row_caches: Dict[int, _RowCache] = {}
+        # the rect and column count last applied to the item geometries
+        self._applied_rect: Optional[QRect] = None
+        self._applied_column_count: Optional[int] = None
+        # index of the first item which needs its geometry applied
+        self._applied_index = 0
+
+        self._minimum_size = QSize()
+        self._minimum_size_count = 0
+
     def __del__(self):
         item = self.takeAt(0)
         while item:
             item = self.takeAt(0)
 
+    def _items_changed(self, index: int):
+        """
+        Invalidates cached layout details for the item at index
+        and all following items
+        """
+        for cache in self._row_caches.values():
+            cache.truncate(index)
+
+        self._applied_index = min(self._applied_index, index)
+        if index < self._minimum_size_count:
+            self._minimum_size = QSize()
+            self._minimum_size_count = 0
+
+    def _watch_visibility(self, item: QLayoutItem):
+        """
+        Watches for visibility changes of a widget item's widget, as
+        hidden widgets are skipped when assigning rows
+        """
+        if isinstance(item, QWidgetItem) and item.widget() is not None:
+            item.widget().installEventFilter(self)
+
+    def eventFilter(self, obj, event):  # pylint: disable=invalid-name
+        if event.type() in (QEvent.ShowToParent, QEvent.HideToParent):
+            # e.g. newly added widgets are only shown by a queued call,
+            # after they may already have been skipped
+            for idx, item in enumerate(self.itemList):
+                if item.widget() is obj:
+                    self._items_changed(idx)
+                    self.invalidate()
+                    break
+
+        return False
+
     def addItem(self, item):
         self.itemList.append(item)
+        self._watch_visibility(item)
 
     def insert_widget(self, idx, widget):
         self.addChildWidget(widget)
         item = QWidgetItem(widget)
+        self.insert_item(idx, item)
+
+    def insert_item(self, idx, item):
         self.itemList.insert(idx, item)
+        self._watch_visibility(item)
+        self._items_changed(idx)
+        self.invalidate()
+
+    def insert_items(self, idx: int, items: List[QLayoutItem]):
+        """
+        Inserts multiple items at the specified index
+        """
+        self.itemList[idx:idx] = items
+        self._items_changed(idx)
+        self.invalidate()
+
+    def take_items(self, idx: int, count: int) -> List[QLayoutItem]:
+        """
+        Removes multiple items from the specified index, returning the
+        removed items
+        """
+        items = self.itemList[idx:idx + count]
+        del self.itemList[idx:idx + count]
+        self._items_changed(idx)
+        self.invalidate()
+        return items
+
+    def replace_items(self, idx: int, items: List[QLayoutItem]):
+        """
+        Replaces the items from the specified index with a list of items,
+        e.g. to reorder items
+        """
+        self.itemList[idx:idx + len(items)] = items
+        self._items_changed(idx)
         self.invalidate()
 
     def horizontalSpacing(self):
@@ -67,6 +340,7 @@ class ResponsiveTableLayout(QLayout):
 
     def takeAt(self, index):
         if 0 <= index < len(self.itemList):
+            self._items_changed(index)
             return self.itemList.pop(index)
 
         return None
@@ -85,6 +359,10 @@ class ResponsiveTableLayout(QLayout):
         super().setGeometry(rect)
         self._doLayout(rect, False)
 
+        table = self.parentWidget()
+        if isinstance(table, ResponsiveTableWidget):
+            table.layout_changed()
+
     def sizeHint(self):
         return self.minimumSize()
 
@@ -95,109 +373,155 @@ class ResponsiveTableLayout(QLayout):
         """
         Returns the actual height of the layout
         """
-        height = 0
+        cache = self._row_caches.get(self._column_count)
+        if cache is None:
+            return 0
 
-        row_height = 0
-        col = 0
-        for w in self.itemList:
-            row_height = max(row_height, w.widget().height())
-            col += 1
-            if col == self._column_count:
-                height += row_height
-                height += self.vspacing
+        self._update_row_cache(cache, self._column_count)
+        if not cache.row_heights:
+            return 0
 
-                col = 0
-                row_height = 0
-        height += row_height
+        height = cache.row_tops[-1] + cache.row_heights[-1]
+        if len(cache.row_items[-1]) == self._column_count:
+            height += self.vspacing
 
         return height
 
     def minimumSize(self):
-        size = QSize()
-
-        for item in self.itemList:
-            size = size.expandedTo(item.minimumSize())
+        for item in self.itemList[self._minimum_size_count:]:
+            self._minimum_size = self._minimum_size.expandedTo(
+                item.minimumSize())
+        self._minimum_size_count = len(self.itemList)
 
+        size = QSize(self._minimum_size)
         margins = self.contentsMargins()
         size += QSize(margins.left() + margins.right(),
                       margins.top() + margins.bottom())
         return size
 
-    def _doLayout(self, rect, testOnly):
-        margins = self.contentsMargins()
-        left = margins.left()
-        top = margins.top()
-        right = margins.right()
-        bottom = margins.bottom()
-
-        effective_rect = rect.adjusted(left, top, -right, -bottom)
-
-        if effective_rect.width() < 500:
+    @staticmethod
+    def _column_count_for_width(width: int) -> int:
+        """
+        Returns the number of columns to use for a given width
+        """
+        if width < 500:
             col_count = 1
         else:
-            col_count = int(effective_rect.width() / 270)
+            col_count = int(width / 270)
 
-        col_count = max(1, col_count)
+        return max(1, col_count)
 
-        space_x = self.horizontalSpacing()
-        space_y = self.verticalSpacing()
+    @staticmethod
+    def _item_height(item: QLayoutItem, col_count: int) -> int:
+        """
+        Returns the height of an item when shown in a table with the
+        given column count
+        """
+        if isinstance(item, DatasetCardItem):
+            return item.height_for_column_count(col_count)
 
-        width_without_spacing = effective_rect.width() - (col_count - 1) * space_x
-        col_width = int(width_without_spacing / col_count)
+        if isinstance(item.widget(), DatasetItemWidgetBase):
+            return DatasetItemLayout.fixed_height_for_arrangement(
+                CardLayout.Tall if col_count > 1 else CardLayout.Wide
+            )
 
-        x = effective_rect.x()
-        y = effective_rect.y()
-        line_height = 0
+        return item.sizeHint().height()
 
-        y_offsets = [y]
+    def _update_row_cache(self, cache: _RowCache, col_count: int):
+        """
+        Assigns any unprocessed items to rows
+        """
+        space_y = self.verticalSpacing()
+        for idx in range(cache.processed_count, len(self.itemList)):
+            item = self.itemList[idx]
+            widget = item.widget()
+            if widget is not None and widget.isHidden():
+                continue
+
+            height = self._item_height(item, col_count)
+            if cache.row_items and len(cache.row_items[-1]) < col_count:
+                cache.row_items[-1].append(item)
+                cache.row_heights[-1] = max(cache.row_heights[-1], height)
+            else:
+                if cache.row_tops:
+                    top = cache.row_tops[-1] + cache.row_heights[-1] + space_y
+                else:
+                    top = 0
+                cache.row_starts.append(idx)
+                cache.row_items.append([item])
+                cache.row_tops.append(top)
+                cache.row_heights.append(height)
+
+        cache.processed_count = len(self.itemList)
 
-        assigned_lines = []
-        current_line_items = []
+    def _doLayout(self, rect, testOnly):
+        margins = self.contentsMargins()
+        left = margins.left()
+        top = margins.top()
+        right = margins.right()
+        bottom = margins.bottom()
 
-        visible_items = [i for i in self.itemList if not i.widget().isHidden()]
+        effective_rect = rect.adjusted(left, top, -right, -bottom)
 
-        if not visible_items:
-            return 0
+        col_count = self._column_count_for_width(effective_rect.width())
 
-        for item in visible_items:
-            next_x = x + col_width + space_x
+        cache = self._row_caches.get(col_count)
+        if cache is None:
+            cache = _RowCache()
+            self._row_caches[col_count] = cache
+        self._update_row_cache(cache, col_count)
 
-            current_line_items.append(item)
-            line_height = max(line_height, item.sizeHint().height())
-            if len(current_line_items) == col_count:
-                assigned_lines.append(current_line_items[:])
-                current_line_items = []
+        if not cache.row_items:
+            return 0
 
-                x = effective_rect.x()
-                y = y + line_height + space_y
-                y_offsets.append(y)
+        space_x = self.horizontalSpacing()
+        space_y = self.verticalSpacing()
 
-                next_x = x + item.minimumSize().width() + space_x
-                line_height = 0
+        if not testOnly:
+            self._column_count = col_count
 
-            x = next_x
+            if effective_rect != self._applied_rect or \
+                    col_count != self._applied_column_count:
+                # width has changed, so all items need updating
+                first_row = 0
+            else:
+                first_row = max(0, bisect.bisect_right(
+                    cache.row_starts, self._applied_index) - 1)
 
-        if current_line_items:
-            assigned_lines.append(current_line_items[:])
+            width_without_spacing = effective_rect.width() - \
+                (col_count - 1) * space_x
+            col_width = int(width_without_spacing / col_count)
 
-        if not testOnly:
-            self._column_count = col_count
-            for idx, line in enumerate(assigned_lines):
-                y_offset = y_offsets[idx]
+            for row in range(first_row, len(cache.row_items)):
+                y_offset = effective_rect.y() + cache.row_tops[row]
 
                 x = effective_rect.left()
-                for item in line:
+                for item in cache.row_items[row]:
+                    if isinstance(item, DatasetCardItem):
+                        item.set_column_count(col_count)
+                    else:
+                        try:
+                            item.widget().set_column_count(col_count)
+                        except AttributeError:
+                            pass
+
                     item.setGeometry(
-                        QRect(x, y_offset, col_width, item.sizeHint().height())
+                        QRect(x, y_offset, col_width,
+                              self._item_height(item, col_count))
                     )
 
-                    try:
-                        item.widget().set_column_count(col_count)
-                    except AttributeError:
-                        pass
-
                     x += col_width + space_x
 
+            self._applied_rect = QRect(effective_rect)
+            self._applied_column_count = col_count
+            self._applied_index = len(self.itemList)
+
+        y = effective_rect.y() + cache.row_tops[-1]
+        line_height = cache.row_heights[-1]
+        if len(cache.row_items[-1]) == col_count:
+            y += line_height + space_y
+            line_height = 0
+
         return y + line_height - rect.y() + bottom
 
     def smartSpacing(self, pm):
@@ -215,6 +539,14 @@ class ResponsiveTableWidget(QWidget):
     EXPLORE_VERTICAL_SPACING = 20
     HORIZONTAL_SPACING = 10
 
+    # dataset cards within this distance of the visible area also get
+    # interactive widgets, so that they are ready before they are
+    # scrolled into view
+    REALIZE_MARGIN = 300
+
+    # emitted when the selected datasets change
+    selection_changed = pyqtSignal()
+
     def __init__(self,
                  parent: Optional[QWidget] = None,
                  mode: str = StandardExploreModes.Browse):
@@ -231,7 +563,102 @@ class ResponsiveTableWidget(QWidget):
 
         self.layout().setContentsMargins(0, 0, 0, 0)
 
+        self._model = DatasetListModel(self)
+        # created before connecting to the model signals, so that the
+        # selection is already updated when the cards are updated
+        self._selection_model = QItemSelectionModel(self._model, self)
+        self._selection_model.selectionChanged.connect(
+            self._selection_changed)
+        self._model.rowsInserted.connect(self._rows_inserted)
+        self._model.rowsRemoved.connect(self._rows_removed)
+        self._model.rowsMoved.connect(self._rows_moved)
+        self._model.dataChanged.connect(self._data_changed)
+        self._model.modelReset.connect(self._model_reset)
+        self._delegate = DatasetCardDelegate(self, mode=mode)
+
+        # widgets and dataset card items, in layout order. Dataset card
+        # items always precede all other widgets.
         self._widgets = []
+        # dataset card items, in layout order
+        self._cards: List[DatasetCardItem] = []
+        self._realized_cards: Set[DatasetCardItem] = set()
+        self._visible_rect = QRect()
+
+    def mode(self) -> str:
+        """
+        Returns the explore mode for the table
+        """
+        return self._mode
+
+    def model(self) -> DatasetListModel:
+        """
+        Returns the model containing the table's datasets
+        """
+        return self._model
+
+    def selection_model(self) -> QItemSelectionModel:
+        """
+        Returns the selection model for the table's datasets
+        """
+        return self._selection_model
+
+    def is_row_selected(self, row: int) -> bool:
+        """
+        Returns True if the dataset at a model row is selected
+        """
+        return self._selection_model.isRowSelected(row, QModelIndex())
+
+    def selected_datasets(self) -> List[Dict]:
+        """
+        Returns the selected datasets, in table order
+        """
+        rows = sorted(index.row()
+                      for index in self._selection_model.selectedRows())
+        return [self._model.datasets[row] for row in rows]
+
+    def clear_selection(self):
+        """
+        Deselects all datasets
+        """
+        self._selection_model.clear()
+
+    def card_selection_requested(self, card: DatasetCardItem,
+                                 modifiers: int):
+        """
+        Updates the selection after a card is clicked with a selection
+        modifier.
+
+        Ctrl toggles the clicked card, while shift selects the range of
+        cards from the last ctrl clicked card (adding to the existing
+        selection if ctrl is also held).
+        """
+        index = self._model.index(card.row, 0)
+        current = self._selection_model.currentIndex()
+        if modifiers & Qt.ShiftModifier and current.isValid():
+            first = min(current.row(), card.row)
+            last = max(current.row(), card.row)
+            flags = QItemSelectionModel.Select \
+                if modifiers & Qt.ControlModifier \
+                else QItemSelectionModel.ClearAndSelect
+            self._selection_model.select(
+                QItemSelection(self._model.index(first, 0),
+                               self._model.index(last, 0)),
+                flags | QItemSelectionModel.Rows)
+        else:
+            self._selection_model.setCurrentIndex(
+                index,
+                QItemSelectionModel.Toggle | QItemSelectionModel.Rows)
+
+    def _selection_changed(self, *_):
+        """
+        Updates the selected state of the cards after the selection
+        changes
+        """
+        for card in self._realized_cards:
+            card.widget().set_selected(self.is_row_selected(card.row))
+
+        self.update()
+        self.selection_changed.emit()
 
     def set_margins(self, left: int, top: int, right: int, bottom: int):
         """
@@ -245,11 +672,112 @@ class ResponsiveTableWidget(QWidget):
         """
         return self.layout().actual_height()
 
+    def set_visible_rect(self, rect: QRect):
+        """
+        Sets the visible area of the table, in widget coordinates.
+
+        Interactive widgets are only created for the dataset cards in
+        (or close to) the visible area, with all other cards painted by
+        the table itself.
+        """
+        self._visible_rect = QRect(rect)
+        self._update_realized_cards()
+
+    def _cards_in_rect(self, rect: QRect) -> List[DatasetCardItem]:
+        """
+        Returns the dataset card items which intersect a rect
+        """
+        if rect.isEmpty() or not self._cards:
+            return []
+
+        # cards are in layout order, so we can binary search for the
+        # first card which may intersect the rect
+        lo = 0
+        hi = len(self._cards)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._cards[mid].geometry().bottom() < rect.top():
+                lo = mid + 1
+            else:
+                hi = mid
+
+        res = []
+        for card in self._cards[lo:]:
+            geometry = card.geometry()
+            if geometry.top() > rect.bottom():
+                break
+            if geometry.intersects(rect):
+                res.append(card)
+        return res
+
+    def _update_realized_cards(self):
+        """
+        Creates interactive widgets for visible cards, and removes
+        the widgets for cards which are no longer visible
+        """
+        if self._visible_rect.isEmpty():
+            required = set()
+        else:
+            required = set(self._cards_in_rect(
+                self._visible_rect.adjusted(0, -self.REALIZE_MARGIN,
+                                            0, self.REALIZE_MARGIN)))
+
+        for card in self._realized_cards - required:
+            if card.widget().underMouse():
+                # keep the hovered card interactive
+                continue
+
+            card.unrealize()
+            self._realized_cards.discard(card)
+
+        # realize in layout order, so that thumbnails of equal priority
+        # are downloaded from the top of the table down
+        for card in sorted(required - self._realized_cards,
+                           key=lambda c: c.row):
+            card.realize()
+            self._realized_cards.add(card)
+
+        visible = set(self._cards_in_rect(self._visible_rect))
+        for card in self._realized_cards:
+            card.set_visible(card in visible)
+
+    def layout_changed(self):
+        """
+        Called when the table layout has been updated
+        """
+        self._update_realized_cards()
+
+    def paintEvent(self, event):
+        cards = [card for card in self._cards_in_rect(event.rect())
+                 if not card.is_realized()]
+        if not cards:
+            return
+
+        self._delegate.set_column_count(self.column_count())
+
+        painter = QPainter(self)
+        option = QStyleOptionViewItem()
+        option.initFrom(self)
+        state = option.state & ~QStyle.State_Selected
+        for card in cards:
+            option.rect = card.geometry()
+            option.state = state | QStyle.State_Selected \
+                if self.is_row_selected(card.row) else state
+            self._delegate.paint(painter, option,
+                                 self._model.index(card.row, 0))
+        painter.end()
+
     def clear(self):
         for w in self._widgets:
-            w.deleteLater()
+            if isinstance(w, DatasetCardItem):
+                w.unrealize()
+            else:
+                w.deleteLater()
             self.layout().takeAt(0)
         self._widgets = []
+        self._cards = []
+        self._realized_cards = set()
+        self._model.clear()
 
     def column_count(self):
         return self.layout().column_count()
@@ -268,27 +796,138 @@ class ResponsiveTableWidget(QWidget):
 
     def replace_widget(self, old_widget, new_widget):
         idx = self._widgets.index(old_widget)
-        self._widgets[idx].setParent(None)
-        self._widgets[idx].deleteLater()
+        # remove the old item from the layout before reparenting the
+        # old widget, otherwise the layout will remove it automatically
+        self.layout().takeAt(idx)
+        old_widget.setParent(None)
+        old_widget.deleteLater()
 
         self._widgets[idx] = new_widget
-        self._widgets[idx].setParent(self)
+        if isinstance(new_widget, DatasetCardItem):
+            self.layout().insert_item(idx, new_widget)
+        else:
+            new_widget.setParent(self)
+            self.layout().insert_widget(idx, new_widget)
+
+    def push_dataset(self, dataset: Dict):
+        self.push_datasets([dataset])
+
+    def push_datasets(self, datasets: List[Dict]):
+        """
+        Adds a list of datasets to the table
+        """
+        self._model.append_datasets(datasets)
 
-        self.layout().insert_widget(idx, new_widget)
+    def set_datasets(self, datasets: List[Dict]):
+        """
+        Replaces the datasets shown in the table.
+
+        Cards for datasets which are already shown are kept (including
+        their widgets and thumbnails), and moved if required. Only cards
+        for new datasets are created.
+        """
+        self._model.set_datasets(datasets)
 
-        self.layout().takeAt(idx + 1)
+    def _rows_inserted(self, parent: QModelIndex, first: int, last: int):
+        """
+        Creates the dataset card items for rows added to the model
+        """
+        if first < len(self._cards):
+            cards = []
+            for row in range(first, last + 1):
+                card = DatasetCardItem(self, row)
+                card.set_column_count(self.column_count())
+                cards.append(card)
+
+            self._cards[first:first] = cards
+            self._widgets[first:first] = cards
+            self.layout().insert_items(first, cards)
+            self._update_card_rows(first)
+            self.update()
+            return
+
+        for row in range(first, last + 1):
+            card = DatasetCardItem(self, row)
+            card.set_column_count(self.column_count())
+            self._cards.append(card)
+
+            next_empty_widget = self.find_next_empty_widget()
+            if next_empty_widget is not None:
+                self.replace_widget(next_empty_widget, card)
+            else:
+                self._widgets.insert(len(self._cards) - 1, card)
+                self.layout().insert_item(len(self._cards) - 1, card)
+
+        self.update()
+
+    def _rows_removed(self, parent: QModelIndex, first: int, last: int):
+        """
+        Removes the dataset card items for rows removed from the model
+        """
+        for card in self._cards[first:last + 1]:
+            card.unrealize()
+            self._realized_cards.discard(card)
+
+        del self._cards[first:last + 1]
+        del self._widgets[first:last + 1]
+        self.layout().take_items(first, last - first + 1)
+        self._update_card_rows(first)
+        self.update()
+
+    def _rows_moved(self, parent: QModelIndex, start: int, end: int,
+                    destination: QModelIndex, row: int):
+        """
+        Moves the dataset card items for rows moved within the model
+        """
+        cards = self._cards[start:end + 1]
+        del self._cards[start:end + 1]
+        target = row if row < start else row - len(cards)
+        self._cards[target:target] = cards
+
+        first = min(start, target)
+        self._widgets[first:len(self._cards)] = self._cards[first:]
+        self.layout().replace_items(first, self._cards[first:])
+        self._update_card_rows(first)
+        self.update()
+
+    def _data_changed(self, top_left: QModelIndex, bottom_right: QModelIndex):
+        """
+        Updates the dataset card items for changed rows
+        """
+        for card in self._cards[top_left.row():bottom_right.row() + 1]:
+            if card.is_realized():
+                # recreate the widget for the updated dataset details
+                card.unrealize()
+                card.realize()
 
-    def push_dataset(self, dataset):
-        dataset_widget = DatasetItemWidget(dataset,
-                                           self.column_count(),
-                                           self,
-                                           mode=self._mode)
+        self.update()
 
-        next_empty_widget = self.find_next_empty_widget()
-        if next_empty_widget is not None:
-            self.replace_widget(next_empty_widget, dataset_widget)
+    def _model_reset(self):
+        """
+        Recreates all dataset card items after the model is reset
+        """
+        for card in self._cards:
+            card.unrealize()
+
+        self.layout().take_items(0, len(self._cards))
+        del self._widgets[:len(self._cards)]
+        self._cards = []
+        self._realized_cards = set()
+
+        if self._model.rowCount():
+            self._rows_inserted(QModelIndex(), 0, self._model.rowCount() - 1)
         else:
-            self.push_widget(dataset_widget)
+            self.update()
+
+        # the selection model is cleared on reset without notification
+        self.selection_changed.emit()
+
+    def _update_card_rows(self, first: int):
+        """
+        Updates the model rows for the dataset card items from first onwards
+        """
+        for row in range(first, len(self._cards)):
+            self._cards[row].row = row
 
     def push_widget(self, widget):
         self._widgets.append(widget)
@@ -298,15 +937,15 @@ class ResponsiveTableWidget(QWidget):
         self.setUpdatesEnabled(False)
         for idx in range(len(self._widgets) - 1, -1, -1):
             if isinstance(self._widgets[idx], EmptyDatasetItemWidget):
+                self.layout().takeAt(idx)
                 self._widgets[idx].setParent(None)
                 self._widgets[idx].deleteLater()
-                self.layout().takeAt(idx)
                 del self._widgets[idx]
         self.setUpdatesEnabled(True)
 
     def remove_widget(self, widget):
         idx = self._widgets.index(widget)
+        self.layout().takeAt(idx)
         self._widgets[idx].setParent(None)
         self._widgets[idx].deleteLater()
-        self.layout().takeAt(idx)
         del self._widgets[idx]
@@ -1,22 +1,24 @@
-import json
 import math
 import os
 from functools import partial
 from typing import (
     Optional,
     List,
-    Dict
+    Dict,
+    Set,
+    Tuple
 )
 
 from qgis.PyQt import sip
 from qgis.PyQt.QtCore import (
     Qt,
+    QRect,
+    QTimer,
     pyqtSignal
 )
 from qgis.PyQt.QtGui import (
     QFontMetrics
 )
-from qgis.PyQt.QtNetwork import QNetworkReply
 from qgis.PyQt.QtWidgets import (
     QHBoxLayout,
     QFrame,
@@ -26,11 +28,16 @@ from qgis.PyQt.QtWidgets import (
 )
 
 from .results_panel_widget import ResultsPanelWidget
+from ..footprint_overlay import footprint_overlay
 from ..response_table_layout import ResponsiveTableWidget
+from ..thumbnails import thumbnail_manager
 from ...api import (
+    ApiRequest,
     KoordinatesClient,
     PAGE_SIZE,
-    DataBrowserQuery
+    DataBrowserQuery,
+    ApiUtils,
+    RequestPriority
 )
 from ..enums import StandardExploreModes
 
@@ -40,6 +47,12 @@ pluginPath = os.path.split(os.path.dirname(__file__))[0]
 class DatasetsBrowserWidget(ResultsPanelWidget):
     total_count_changed = pyqtSignal(int)
     visible_count_changed = pyqtSignal(int)
+    # emitted with the number of selected datasets
+    selection_changed = pyqtSignal(int)
+
+    # the next page is prefetched once the user has scrolled past this
+    # fraction of the loaded results
+    PREFETCH_THRESHOLD = 0.5
 
     def __init__(self, mode: str = StandardExploreModes.Browse):
         super().__init__()
@@ -51,19 +64,93 @@ class DatasetsBrowserWidget(ResultsPanelWidget):
             mode=mode
         )
 
+        self.table_widget.selection_changed.connect(
+            self._selection_changed)
+
         layout.addWidget(self.table_widget)
         self.setLayout(layout)
 
         self.setObjectName('DatasetsBrowserWidget')
 
         self._current_query: Optional[DataBrowserQuery] = None
-        self._current_reply: Optional[QNetworkReply] = None
+        self._current_request: Optional[ApiRequest] = None
+        self._current_page_token: Optional[object] = None
+        self._current_query_key: Optional[str] = None
+        # cached results which are shown while being revalidated
+        self._revalidating: Optional[Tuple[List[Dict], str, bool]] = None
         self._current_context = None
         self._load_more_widget = None
         self._no_records_widget = None
         self._datasets = []
+        # the search string for the loaded results
+        self._loaded_search: Optional[str] = None
+        # True if the shown results should be updated in place by the
+        # next results retrieved, instead of being appended to
+        self._replace_results = False
+
+        self._visible_rect = QRect()
+        self._has_more_pages = False
+        self._prefetch_request: Optional[ApiRequest] = None
+        self._prefetch_page: Optional[int] = None
+        self._prefetched_pages: Dict[int, Tuple[List[Dict], str, bool]] = {}
+
         self.setMinimumWidth(340)
 
+        # footprints are only shown for the main browse results
+        self._footprints_token: Optional[object] = None
+        if mode == StandardExploreModes.Browse:
+            self._footprints_token = object()
+            # coalesce model changes into a single footprint update
+            self._footprints_timer = QTimer(self)
+            self._footprints_timer.setSingleShot(True)
+            self._footprints_timer.timeout.connect(self._update_footprints)
+            model = self.table_widget.model()
+            for signal in (model.rowsInserted, model.rowsRemoved,
+                           model.dataChanged, model.modelReset):
+                signal.connect(self._footprints_timer.start)
+            self.destroyed.connect(
+                partial(footprint_overlay().release,
+                        self._footprints_token))
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if self._footprints_token is not None:
+            self._update_footprints()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        if self._footprints_token is not None:
+            footprint_overlay().release(self._footprints_token)
+
+    def _update_footprints(self):
+        """
+        Shows the map footprints for the current results
+        """
+        if sip.isdeleted(self) or not self.isVisible():
+            return
+
+        footprint_overlay().show_datasets(self._footprints_token,
+                                          self.table_widget.model().datasets)
+
+    def _selection_changed(self):
+        """
+        Called when the selected datasets change
+        """
+        self.selection_changed.emit(
+            len(self.table_widget.selection_model().selectedRows()))
+
+    def selected_datasets(self) -> List[Dict]:
+        """
+        Returns the selected datasets, in table order
+        """
+        return self.table_widget.selected_datasets()
+
+    def clear_selection(self):
+        """
+        Deselects all datasets
+        """
+        self.table_widget.clear_selection()
+
     def set_margins(self, left: int, top: int, right: int, bottom: int):
         """
         Sets the interior margins for the table
@@ -77,21 +164,126 @@ class DatasetsBrowserWidget(ResultsPanelWidget):
         return self.table_widget.content_height()
 
     def cancel_active_requests(self):
-        if self._current_reply is not None and \
-                not sip.isdeleted(self._current_reply):
-            self._current_reply.abort()
+        if self._current_request is not None:
+            self._current_request.cancel()
+
+        self._current_request = None
+        self._current_page_token = None
+        self._revalidating = None
+
+        self._clear_prefetched_pages()
+
+    def viewport_changed(self, visible_rect: QRect):
+        self._visible_rect = visible_rect
+        self.table_widget.set_visible_rect(
+            visible_rect.translated(-self.table_widget.pos()).intersected(
+                self.table_widget.rect())
+        )
+        self._update_prefetch()
+
+    def _clear_prefetched_pages(self):
+        """
+        Discards any prefetched pages, e.g. after the query changes
+        """
+        if self._prefetch_request is not None:
+            self._prefetch_request.cancel()
+
+        self._prefetch_request = None
+        self._prefetch_page = None
+        self._prefetched_pages = {}
+
+    def _next_page(self) -> int:
+        """
+        Returns the number of the next page of results to load
+        """
+        return math.ceil(len(self._datasets) / PAGE_SIZE) + 1
+
+    def _update_prefetch(self):
+        """
+        Starts fetching the next page of results in the background, if
+        the user has scrolled far enough through the current results
+        """
+        if not self._has_more_pages or self._current_request is not None \
+                or self._current_page_token is not None:
+            return
+
+        if self._visible_rect.isEmpty() or \
+                self._visible_rect.bottom() < \
+                self.content_height() * self.PREFETCH_THRESHOLD:
+            return
+
+        next_page = self._next_page()
+        if next_page in self._prefetched_pages or \
+                self._prefetch_page == next_page:
+            return
+
+        self._prefetch_page = next_page
+        request = KoordinatesClient.instance().datasets_async(
+            query=self._current_query,
+            context=self._current_context,
+            page=next_page,
+            priority=RequestPriority.Background
+        )
+        self._prefetch_request = request
+        request.add_callback(
+            partial(self._prefetch_request_finished, request, next_page))
+
+    def _prefetch_request_finished(self, request: ApiRequest, page: int,
+                                   result: Optional[Tuple[List[Dict], str,
+                                                          bool]]):
+        if sip.isdeleted(self):
+            return
 
-        self._current_reply = None
+        if request is not self._prefetch_request:
+            # either an old request, or the request has been promoted to
+            # the current request
+            return
+
+        self._prefetch_request = None
+        self._prefetch_page = None
+
+        if result is None:
+            return
+
+        self._prefetched_pages[page] = result
+
+        # also warm up the repository details for the page
+        KoordinatesClient.instance().prefetch_repositories(
+            self._repository_urls(result[0]),
+            lambda: None
+        )
 
     def _create_temporary_items_for_page(self, count=PAGE_SIZE):
         for i in range(count):
             self.table_widget.push_empty_widget()
 
     def populate(self, query: DataBrowserQuery, context):
+        if self._replace_results or self.table_widget.model().rowCount():
+            # keep showing the existing results until the results for the
+            # new query are available, and then update them in place
+            self._replace_results = True
+            if self._load_more_widget:
+                self.table_widget.remove_widget(self._load_more_widget)
+                self._load_more_widget = None
+        else:
+            self._clear_results()
+        self._clear_prefetched_pages()
+        self._has_more_pages = False
+        self._fetch_records(query, context)
+
+    def _clear_results(self):
+        """
+        Removes all results from the table, replacing them with
+        placeholders for a page of results
+        """
         self.table_widget.setUpdatesEnabled(False)
         self.table_widget.clear()
+        # don't waste bandwidth on thumbnails for the previous results
+        thumbnail_manager().cancel_orphaned_downloads()
 
         self._datasets = []
+        self._loaded_search = None
+        self._replace_results = False
         self._create_temporary_items_for_page()
         self.table_widget.setUpdatesEnabled(True)
 
@@ -99,66 +291,275 @@ class DatasetsBrowserWidget(ResultsPanelWidget):
         self._no_records_widget = None
 
         self.visible_count_changed.emit(-1)
-        self._fetch_records(query, context)
+
+    def prefilter_search(self, search: str):
+        """
+        Called when the search string is edited, before the results for
+        the new search are requested.
+
+        If the new search only extends the search for the loaded results
+        then the loaded results are immediately narrowed down locally,
+        and these are shown until the new results are available.
+        """
+        # any results still being retrieved for the previous search
+        # are superseded
+        self.cancel_active_requests()
+
+        if self._loaded_search is None or \
+                not ApiUtils.search_narrows(search, self._loaded_search):
+            return
+
+        terms = ApiUtils.search_terms(search)
+        datasets = [dataset for dataset in self._datasets
+                    if ApiUtils.dataset_matches_search(dataset, terms)]
+        self._show_local_results(datasets)
+
+    def _show_local_results(self, datasets: List[Dict]):
+        """
+        Shows results which were found locally, while the results for
+        the current query are retrieved from the server
+        """
+        self.table_widget.setUpdatesEnabled(False)
+        for widget in (self._load_more_widget, self._no_records_widget):
+            if widget:
+                self.table_widget.remove_widget(widget)
+        self._load_more_widget = None
+        self._no_records_widget = None
+        self._has_more_pages = False
+
+        self.table_widget.remove_empty_widgets()
+        self.table_widget.set_datasets(datasets)
+        if not datasets:
+            # the server side search may still find matches
+            self._create_temporary_items_for_page()
+        self.table_widget.setUpdatesEnabled(True)
+        thumbnail_manager().cancel_orphaned_downloads()
+
+        self._replace_results = True
+        self.setCursor(Qt.WaitCursor)
+        self.total_count_changed.emit(-1)
+        self.visible_count_changed.emit(len(datasets))
 
     def _fetch_records(self,
                        query: Optional[DataBrowserQuery] = None,
                        context: Optional[str] = None,
                        page: int = 1):
-        if self._current_reply is not None and not sip.isdeleted(
-                self._current_reply):
-            self._current_reply.abort()
-            self._current_reply = None
+        if self._current_request is not None:
+            self._current_request.cancel()
+            self._current_request = None
 
         if query is not None:
             self._current_query = query
         if context is not None:
             self._current_context = context
 
-        self._current_reply = KoordinatesClient.instance().datasets_async(
+        self._current_page_token = None
+        self._current_query_key = None
+        self._revalidating = None
+
+        client = KoordinatesClient.instance()
+        if page == 1:
+            local = None
+            if self._current_query is not None:
+                local = client.datasets_in_extent(self._current_query,
+                                                  self._current_context)
+            if local is not None and local[1]:
+                # all matching datasets have already been retrieved, so
+                # the query can be answered without the server
+                self._show_page(local[0], str(len(local[0])), True)
+                return
+
+            self._current_query_key = client.datasets_query_key(
+                query=self._current_query,
+                context=self._current_context,
+                page=page
+            )
+            cached = client.query_result_cache().lookup(
+                self._current_query_key)
+            preliminary = None
+            if cached is None and local is not None:
+                preliminary = local[0]
+            elif cached is None and self._current_query is not None \
+                    and self._current_query.search:
+                preliminary = client.mirrored_datasets(self._current_query,
+                                                       self._current_context)
+            if preliminary:
+                # answer from the datasets which are available locally,
+                # and merge in the server results when they arrive
+                self._show_preliminary_results(preliminary)
+            elif cached is not None:
+                # show the cached results immediately...
+                self._show_page(*cached.value)
+                if cached.is_fresh():
+                    return
+
+                # ...and then revalidate them in the background
+                self._revalidating = cached.value
+
+        if self._revalidating is None:
+            self.setCursor(Qt.WaitCursor)
+
+        request = client.datasets_async(
             query=self._current_query,
             context=self._current_context,
             page=page
         )
-        self._current_reply.finished.connect(
-            partial(self._reply_finished, self._current_reply))
-        self.setCursor(Qt.WaitCursor)
+        self._current_request = request
+        request.add_callback(partial(self._request_finished, request))
 
-    def _reply_finished(self, reply: QNetworkReply):
+    def _request_finished(self, request: ApiRequest,
+                          result: Optional[Tuple[List[Dict], str, bool]]):
         if sip.isdeleted(self):
             return
 
-        if reply != self._current_reply:
-            # an old reply we don't care about anymore
+        if request is not self._current_request:
+            # an old request we don't care about anymore
             return
 
-        self._current_reply = None
-
-        if reply.error() == QNetworkReply.OperationCanceledError:
+        self._current_request = None
+        revalidating = self._revalidating
+        self._revalidating = None
+
+        if result is None:
+            if revalidating is None and not request.is_canceled() \
+                    and self._current_query_key is not None:
+                # fall back to the catalog mirror, e.g. when offline
+                mirrored = KoordinatesClient.instance().mirrored_datasets(
+                    self._current_query, self._current_context)
+                if mirrored:
+                    self._replace_results = True
+                    self._show_page(mirrored, str(len(mirrored)), True)
+                    return
+
+            self.setCursor(Qt.ArrowCursor)
+            if revalidating is None and self._replace_results:
+                # the results shown are for a previous query, or were
+                # narrowed down locally, so can't be left in place
+                self._show_request_failed()
             return
 
-        if reply.error() != QNetworkReply.NoError:
-            print('error occurred :(')
+        if self._current_query_key is not None:
+            KoordinatesClient.instance().query_result_cache().insert(
+                self._current_query_key, result)
+
+        if revalidating is not None:
+            if result == revalidating:
+                # the cached results are still current
+                self._update_prefetch()
+                return
+
+            self._replace_results = True
+            self._clear_prefetched_pages()
+
+        self._show_page(*result)
+
+    def _show_request_failed(self):
+        """
+        Removes results which don't match the current query, after the
+        request for the query's results has failed
+        """
+        # discard any results which are still being prepared
+        self._current_page_token = None
+
+        self.table_widget.setUpdatesEnabled(False)
+        self.table_widget.clear()
+        thumbnail_manager().cancel_orphaned_downloads()
+
+        self._datasets = []
+        self._loaded_search = None
+        self._replace_results = False
+        self._has_more_pages = False
+        self._load_more_widget = None
+        self._no_records_widget = NoRecordsItemWidget(
+            self.tr('Results could not be retrieved'))
+        self.table_widget.push_widget(self._no_records_widget)
+        self.table_widget.setUpdatesEnabled(True)
+
+        self.total_count_changed.emit(-1)
+        self.visible_count_changed.emit(0)
+
+    def _show_preliminary_results(self, datasets: List[Dict]):
+        """
+        Shows results which are available locally, e.g. from the catalog
+        mirror, while the results for the current query are retrieved
+        """
+        page_token = object()
+        self._current_page_token = page_token
+        KoordinatesClient.instance().prefetch_repositories(
+            self._repository_urls(datasets),
+            partial(self._preliminary_results_ready, page_token, datasets)
+        )
+
+    def _preliminary_results_ready(self, page_token: object,
+                                   datasets: List[Dict]):
+        """
+        Called when preliminary results are ready to be shown
+        """
+        if sip.isdeleted(self) or page_token is not self._current_page_token:
             return
-        #            self.error_occurred.emit(request.reply().errorString())
 
-        result = json.loads(reply.readAll().data().decode())
-        if 'panels' in result:
-            datasets = [item['content'] for item in
-                        result['panels'][0]['items']]
-        else:
-            datasets = result
+        self._current_page_token = None
+        self._show_local_results(datasets)
 
-        tokens = reply.rawHeader(b"X-Resource-Range").data().decode().split(
-            "/")
-        total = tokens[-1]
+    def _show_page(self, datasets: List[Dict], total: str, finished: bool):
+        """
+        Shows a page of results
+        """
         self.total_count_changed.emit(int(total))
-        last = tokens[0].split("-")[-1]
-        finished = last == total
+
+        # resolve the repository details for the whole page in parallel
+        # before creating the cards, so that the cards don't each need
+        # to block on retrieving their repository details
+        page_token = object()
+        self._current_page_token = page_token
+        KoordinatesClient.instance().prefetch_repositories(
+            self._repository_urls(datasets),
+            partial(self._page_ready, page_token, datasets, total, finished)
+        )
+
+    @staticmethod
+    def _repository_urls(datasets: List[Dict]) -> Set[str]:
+        """
+        Returns the repository URLs which must be retrieved for a list
+        of datasets
+        """
+        urls = set()
+        for dataset in datasets:
+            url = ApiUtils.repository_url_from_dataset_response(dataset)
+            if url:
+                urls.add(url)
+        return urls
+
+    def _page_ready(self, page_token: object, datasets: List[Dict],
+                    total: str, finished: bool):
+        """
+        Called when a page of datasets is ready to be shown
+        """
+        if sip.isdeleted(self):
+            return
+
+        if page_token is not self._current_page_token:
+            # an old page we don't care about anymore
+            return
+
+        self._current_page_token = None
 
         self.table_widget.setUpdatesEnabled(False)
-        self._add_datasets(datasets)
-        self._datasets.extend(datasets)
+        if self._replace_results:
+            self._replace_results = False
+            self.table_widget.set_datasets(datasets)
+            self._datasets = list(datasets)
+            # don't waste bandwidth on thumbnails for removed results
+            thumbnail_manager().cancel_orphaned_downloads()
+        else:
+            self._add_datasets(datasets)
+            self._datasets.extend(datasets)
+        if self._current_query is not None:
+            self._loaded_search = self._current_query.search or ''
+            if finished and len(self._datasets) == int(total):
+                KoordinatesClient.instance().extent_query_completed(
+                    self._current_query, self._datasets,
+                    self._current_context)
         self.visible_count_changed.emit(len(self._datasets))
 
         self.setCursor(Qt.ArrowCursor)
@@ -183,7 +584,24 @@ class DatasetsBrowserWidget(ResultsPanelWidget):
 
         self.table_widget.setUpdatesEnabled(True)
 
+        self._has_more_pages = not finished
+        self._update_prefetch()
+
     def set_datasets(self, datasets: List[Dict]):
+        datasets = list(datasets)
+        page_token = object()
+        self._current_page_token = page_token
+        KoordinatesClient.instance().prefetch_repositories(
+            self._repository_urls(datasets),
+            partial(self._set_datasets, page_token, datasets)
+        )
+
+    def _set_datasets(self, page_token: object, datasets: List[Dict]):
+        if sip.isdeleted(self) or page_token is not self._current_page_token:
+            return
+
+        self._current_page_token = None
+
         self.table_widget.setUpdatesEnabled(False)
         self._add_datasets(datasets)
         self._datasets.extend(datasets)
@@ -191,16 +609,32 @@ class DatasetsBrowserWidget(ResultsPanelWidget):
         self.table_widget.setUpdatesEnabled(True)
 
     def _add_datasets(self, datasets):
-        for i, dataset in enumerate(datasets):
-            self.table_widget.push_dataset(dataset)
+        self.table_widget.push_datasets(datasets)
 
     def load_more(self):
-        next_page = math.ceil(len(self._datasets) / PAGE_SIZE) + 1
+        next_page = self._next_page()
+        # only the first page of results is cached
+        self._current_query_key = None
+        self._revalidating = None
 
         self.table_widget.remove_widget(self._load_more_widget)
         self._load_more_widget = None
         self._create_temporary_items_for_page()
-        self._fetch_records(page=next_page)
+
+        if next_page in self._prefetched_pages:
+            self._show_page(*self._prefetched_pages.pop(next_page))
+        elif self._prefetch_page == next_page and \
+                self._prefetch_request is not None:
+            # promote the in-progress prefetch to the current request
+            request = self._prefetch_request
+            self._current_request = request
+            self._prefetch_request = None
+            self._prefetch_page = None
+            self.setCursor(Qt.WaitCursor)
+            request.set_priority(RequestPriority.Interactive)
+            request.add_callback(partial(self._request_finished, request))
+        else:
+            self._fetch_records(page=next_page)
 
 
 class LoadMoreItemWidget(QFrame):
@@ -220,9 +654,9 @@ class LoadMoreItemWidget(QFrame):
 
 
 class NoRecordsItemWidget(QFrame):
-    def __init__(self):
+    def __init__(self, message: str = "No data available"):
         QFrame.__init__(self)
-        self.no_data_frame = QLabel("No data available")
+        self.no_data_frame = QLabel(message)
 
         self.no_data_frame.setStyleSheet(
             """
@@ -77,6 +77,12 @@ class ExplorePanelWidget(ResultsPanelWidget):
     def cancel_active_requests(self):
         self.browser.cancel_active_requests()
 
+    def viewport_changed(self, visible_rect: QRect):
+        self.browser.viewport_changed(
+            visible_rect.translated(-self.browser.pos()).intersected(
+                self.browser.rect())
+        )
+
     def paintEvent(self, event):
         painter = QStylePainter(self)
         painter.setRenderHint(QPainter.Antialiasing, True)
@@ -2,6 +2,7 @@ import json
 import os
 from functools import partial
 from typing import (
+    Dict,
     List,
     Optional,
     Union
@@ -10,6 +11,8 @@ from typing import (
 from qgis.PyQt import sip
 from qgis.PyQt.QtCore import (
     Qt,
+    QRect,
+    QTimer,
     pyqtSignal
 )
 from qgis.PyQt.QtNetwork import QNetworkReply
@@ -23,7 +26,9 @@ from qgis.gui import QgsScrollArea
 
 from koordinates.api import (
     KoordinatesClient,
-    DataBrowserQuery
+    DataBrowserQuery,
+    Capability,
+    LayerUtils
 )
 from .datasets_browser_widget import DatasetsBrowserWidget
 from ..enums import StandardExploreModes
@@ -43,6 +48,8 @@ class ResultsPanel(QWidget):
     visible_count_changed = pyqtSignal(int)
     publisher_selected = pyqtSignal(Publisher)
     publisher_cleared = pyqtSignal()
+    # emitted with the number of selected datasets
+    selection_changed = pyqtSignal(int)
 
     def __init__(self):
         super().__init__()
@@ -76,6 +83,18 @@ class ResultsPanel(QWidget):
         layout.addWidget(self.scroll_area)
         self.setLayout(layout)
 
+        # throttles updates to the visible areas of the child items
+        # while scrolling
+        self._visible_area_timer = QTimer(self)
+        self._visible_area_timer.setSingleShot(True)
+        self._visible_area_timer.setInterval(50)
+        self._visible_area_timer.timeout.connect(self._update_visible_areas)
+
+        self.scroll_area.verticalScrollBar().valueChanged.connect(
+            self._visible_area_timer.start)
+        self.scroll_area.verticalScrollBar().rangeChanged.connect(
+            self._visible_area_timer.start)
+
         self.scroll_area.setFrameShape(QFrame.NoFrame)
         self.scroll_area.setStyleSheet(
             "#qt_scrollarea_viewport{ background: transparent; }")
@@ -102,11 +121,71 @@ class ResultsPanel(QWidget):
         for item in self.child_items:
             item.cancel_active_requests()
 
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self._visible_area_timer.start()
+
+    def _update_visible_areas(self):
+        """
+        Notifies child items of their visible areas
+        """
+        viewport = self.scroll_area.viewport()
+        visible_rect = QRect(
+            0,
+            self.scroll_area.verticalScrollBar().value(),
+            viewport.width(),
+            viewport.height()
+        )
+        for item in self.child_items:
+            item_rect = visible_rect.translated(-item.pos()).intersected(
+                item.rect())
+            item.viewport_changed(item_rect)
+
     def clear_existing_items(self):
+        had_selection = bool(self.selected_datasets())
         for item in self.child_items:
             self.container_layout.removeWidget(item)
             item.deleteLater()
         self.child_items.clear()
+        if had_selection:
+            self.selection_changed.emit(0)
+
+    def _browse_widget(self) -> Optional[DatasetsBrowserWidget]:
+        """
+        Returns the browse results widget, if browse results are shown
+        """
+        if self.current_mode == StandardExploreModes.Browse and \
+                self.child_items and \
+                isinstance(self.child_items[0], DatasetsBrowserWidget):
+            return self.child_items[0]
+
+        return None
+
+    def selected_datasets(self) -> List[Dict]:
+        """
+        Returns the selected datasets from the browse results
+        """
+        browse_widget = self._browse_widget()
+        if browse_widget is None:
+            return []
+
+        return browse_widget.selected_datasets()
+
+    def add_selected_datasets(self):
+        """
+        Adds all selected datasets which can be added to the project, as
+        a single batch
+        """
+        client = KoordinatesClient.instance()
+        datasets = [client.dataset(details)
+                    for details in self.selected_datasets()]
+        datasets = [dataset for dataset in datasets
+                    if Capability.Add in dataset.capabilities]
+        if not datasets:
+            return
+
+        LayerUtils.add_datasets_to_project(datasets)
+        self._browse_widget().clear_selection()
 
     def populate(self, query: DataBrowserQuery, context):
         self.cancel_active_requests()
@@ -127,10 +206,21 @@ class ResultsPanel(QWidget):
             item.set_margins(0, 0, 16, 16)
             item.total_count_changed.connect(self.total_count_changed)
             item.visible_count_changed.connect(self.visible_count_changed)
+            item.selection_changed.connect(self.selection_changed)
             item.populate(query, context)
             self.child_items.append(item)
             self.container_layout.addWidget(item)
 
+    def prefilter_search(self, search: str):
+        """
+        Called when the search string is edited, before the results for
+        the new search are requested
+        """
+        if self.current_mode == StandardExploreModes.Browse and \
+                self.child_items and \
+                isinstance(self.child_items[0], DatasetsBrowserWidget):
+            self.child_items[0].prefilter_search(search)
+
     def explore(self, section_slug: str, context):
         self.scroll_area.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOn)
         self.container_layout.setContentsMargins(0, 6, 6, 6)
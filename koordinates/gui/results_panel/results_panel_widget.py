@@ -1,5 +1,6 @@
 from typing import Optional
 
+from qgis.PyQt.QtCore import QRect
 from qgis.PyQt.QtWidgets import (
     QWidget
 )
@@ -18,3 +19,13 @@ class ResultsPanelWidget(QWidget):
         Cancels any active request
         """
         pass
+
+    def viewport_changed(self, visible_rect: QRect):
+        """
+        Called when the visible area of the widget changes, e.g. when the
+        results are scrolled.
+
+        The visible_rect is given in widget coordinates, and will be empty
+        if the widget is not visible.
+        """
+        pass
@@ -1,17 +1,29 @@
+import heapq
+import itertools
+import weakref
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import OrderedDict
 from functools import partial
 from typing import (
+    Callable,
     Dict,
-    Optional
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple
 )
 
+from qgis.PyQt import sip
 from qgis.PyQt.QtCore import QUrl
 from qgis.PyQt.QtCore import (
     Qt,
     QObject,
+    QRunnable,
+    QThreadPool,
     pyqtSignal,
-    QSize
+    QSize,
+    QTimer
 )
 from qgis.PyQt.QtGui import (
     QImage,
@@ -20,15 +32,88 @@ from qgis.PyQt.QtGui import (
     QBrush
 )
 from qgis.PyQt.QtNetwork import QNetworkReply, QNetworkRequest
-from qgis.core import QgsNetworkAccessManager
+from qgis.core import (
+    QgsNetworkAccessManager,
+    QgsSettings
+)
 
 from .gui_utils import GuiUtils
 from ..api import (
     Publisher,
-    PublisherType
+    PublisherType,
+    RequestPriority
 )
 
 
+class ThumbnailJobSignals(QObject):
+    """
+    Signals for ThumbnailJob
+    """
+
+    finished = pyqtSignal(object)
+
+
+class ThumbnailJob(QRunnable):
+    """
+    Runs thumbnail image processing on a worker thread.
+
+    The function must only use thread-safe classes, e.g. QImage and
+    QPainter painting onto a QImage (but never QPixmap or widgets).
+    """
+
+    def __init__(self, function: Callable, *args):
+        super().__init__()
+        self.setAutoDelete(False)
+        self.function = function
+        self.args = args
+        self.signals = ThumbnailJobSignals()
+
+    def run(self):
+        try:
+            result = self.function(*self.args)
+        except Exception:  # pylint: disable=broad-except
+            result = None
+        self.signals.finished.emit(result)
+
+
+_thumbnail_thread_pool: Optional[QThreadPool] = None
+_active_jobs: Set[ThumbnailJob] = set()
+
+
+def run_thumbnail_job(callback: Callable[[object], None],
+                      function: Callable,
+                      *args):
+    """
+    Runs a function on the thumbnail worker thread pool, calling
+    callback with its result on the GUI thread
+    """
+    global _thumbnail_thread_pool  # pylint: disable=global-statement
+    if _thumbnail_thread_pool is None:
+        _thumbnail_thread_pool = QThreadPool()
+        _thumbnail_thread_pool.setMaxThreadCount(
+            max(1, QThreadPool.globalInstance().maxThreadCount() // 2))
+
+    job = ThumbnailJob(function, *args)
+
+    def finished(result):
+        _active_jobs.discard(job)
+        callback(result)
+
+    # the job is kept alive until its result has been delivered
+    _active_jobs.add(job)
+    job.signals.finished.connect(finished)
+    _thumbnail_thread_pool.start(job)
+
+
+def decode_image(data: bytes) -> QImage:
+    """
+    Decodes image data. Safe to call on a worker thread.
+    """
+    image = QImage()
+    image.loadFromData(data)
+    return image
+
+
 class ThumbnailProcessor(ABC):
     """
     An interface for processing thumbnails
@@ -155,6 +240,151 @@ class PublisherThumbnailProcessor(ThumbnailProcessor):
         return thumbnail
 
 
+class ThumbnailCache:
+    """
+    A memory-budgeted store of downloaded thumbnail images.
+
+    The size of each image is accounted for in bytes, and the least
+    recently used images are evicted once the cache exceeds the
+    maximum size.
+    """
+
+    DEFAULT_MAX_SIZE_MB = 64
+    SIZE_SETTING = "koordinates/thumbnail_cache_size_mb"
+
+    # maximum sizes read from the settings, by setting key
+    _max_sizes: Dict[str, int] = {}
+
+    def __init__(self):
+        self._images: Dict[Hashable, QImage] = OrderedDict()
+        self._size = 0
+
+    @classmethod
+    def max_size(cls) -> int:
+        """
+        Returns the maximum size of the cache, in bytes
+        """
+        max_size = ThumbnailCache._max_sizes.get(cls.SIZE_SETTING)
+        if max_size is None:
+            size_mb = QgsSettings().value(cls.SIZE_SETTING,
+                                          cls.DEFAULT_MAX_SIZE_MB,
+                                          int, QgsSettings.Plugins)
+            max_size = size_mb * 1024 * 1024
+            ThumbnailCache._max_sizes[cls.SIZE_SETTING] = max_size
+
+        return max_size
+
+    @classmethod
+    def set_max_size(cls, size_mb: int):
+        """
+        Sets the maximum size of the cache, in megabytes
+        """
+        QgsSettings().setValue(cls.SIZE_SETTING,
+                               size_mb, QgsSettings.Plugins)
+        ThumbnailCache._max_sizes[cls.SIZE_SETTING] = size_mb * 1024 * 1024
+
+    @staticmethod
+    def image_size(image: QImage) -> int:
+        """
+        Returns the memory used by an image, in bytes
+        """
+        try:
+            return image.sizeInBytes()
+        except AttributeError:
+            # requires Qt 5.10+
+            return image.byteCount()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._images
+
+    def __len__(self) -> int:
+        return len(self._images)
+
+    def size(self) -> int:
+        """
+        Returns the current size of the cached images, in bytes
+        """
+        return self._size
+
+    def get(self, key: Hashable) -> Optional[QImage]:
+        """
+        Returns the cached image for a key (usually the image URL), or
+        None if the key is not cached
+        """
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def insert(self, key: Hashable, image: QImage):
+        """
+        Stores an image in the cache
+        """
+        self.remove(key)
+        self._images[key] = image
+        self._size += ThumbnailCache.image_size(image)
+        self._evict()
+
+    def remove(self, key: Hashable):
+        """
+        Removes an image from the cache
+        """
+        image = self._images.pop(key, None)
+        if image is not None:
+            self._size -= ThumbnailCache.image_size(image)
+
+    def clear(self):
+        """
+        Removes all images from the cache
+        """
+        self._images.clear()
+        self._size = 0
+
+    def _evict(self):
+        """
+        Evicts the least recently used images until the cache fits
+        within the maximum size.
+
+        The most recently inserted image is always retained.
+        """
+        max_size = self.max_size()
+        while self._size > max_size and len(self._images) > 1:
+            _, image = self._images.popitem(last=False)
+            self._size -= ThumbnailCache.image_size(image)
+
+
+class CompositedThumbnailCache(ThumbnailCache):
+    """
+    A memory-budgeted store of final composited thumbnails, e.g. dataset
+    card thumbnails with their rounded corners and type overlays.
+
+    Keys must identify everything which affects the composited image,
+    such as the source image URL, target size, card arrangement and
+    device pixel ratio.
+    """
+
+    DEFAULT_MAX_SIZE_MB = 32
+    SIZE_SETTING = "koordinates/composited_thumbnail_cache_size_mb"
+
+
+_thumbnail_cache = ThumbnailCache()
+_composited_thumbnail_cache = CompositedThumbnailCache()
+
+
+def thumbnail_cache() -> ThumbnailCache:
+    """
+    Returns the shared thumbnail image cache
+    """
+    return _thumbnail_cache
+
+
+def composited_thumbnail_cache() -> CompositedThumbnailCache:
+    """
+    Returns the shared composited thumbnail cache
+    """
+    return _composited_thumbnail_cache
+
+
 class GenericThumbnailManager(QObject):
     """
     A generic thumbnail manager, for widgets with their own logic
@@ -164,16 +394,24 @@ class GenericThumbnailManager(QObject):
 
     def __init__(self, parent: Optional[QObject] = None):
         super().__init__(parent)
-        self.thumbnails: Dict[str, QImage] = {}
+        self.thumbnails = thumbnail_cache()
         self.queued_replies = set()
+        self._queued_urls: Set[str] = set()
+        self._downloaded_urls: Set[str] = set()
 
     def thumbnail(self, url: str) -> Optional[QImage]:
-        return self.thumbnails.get(url)
+        image = self.thumbnails.get(url)
+        if image is None and url in self._downloaded_urls:
+            # evicted from the cache, so fetch it again (from the
+            # network disk cache, if possible)
+            self.download_thumbnail(url)
+        return image
 
     def download_thumbnail(self, url: str):
         if url in self.thumbnails:
-            return self.thumbnails[url]
-        else:
+            return self.thumbnails.get(url)
+        elif url not in self._queued_urls:
+            self._queued_urls.add(url)
             req = QNetworkRequest(QUrl(url))
             req.setAttribute(QNetworkRequest.CacheLoadControlAttribute,
                              QNetworkRequest.PreferCache)
@@ -188,79 +426,279 @@ class GenericThumbnailManager(QObject):
 
     def thumbnail_downloaded(self, reply):
         self.queued_replies.remove(reply)
+        url = reply.url().toString()
         if reply.error() == QNetworkReply.NoError:
-            url = reply.url().toString()
-            img = QImage()
-            img.loadFromData(reply.readAll())
-            self.thumbnails[url] = img
-            self.downloaded.emit(url)
+            run_thumbnail_job(partial(self._thumbnail_decoded, url),
+                              decode_image, reply.readAll().data())
+        else:
+            self._queued_urls.discard(url)
+
+    def _thumbnail_decoded(self, url: str, img: Optional[QImage]):
+        self._queued_urls.discard(url)
+        if sip.isdeleted(self) or img is None:
+            return
+
+        self.thumbnails.insert(url, img)
+        self._downloaded_urls.add(url)
+        self.downloaded.emit(url)
 
 
 class ThumbnailManager:
+    """
+    Downloads thumbnails for widgets.
+
+    Downloads are scheduled in priority order, with a limited number of
+    downloads in flight at any time. Widgets can raise the priority of
+    their pending download (e.g. when they are scrolled into view), and
+    downloads which no widget is waiting on can be canceled.
+
+    Downloaded images are held in the shared memory-budgeted thumbnail
+    cache. Widgets waiting on a download are only weakly referenced,
+    so that widgets deleted before the download completes can be
+    garbage collected.
+    """
+
+    MAX_IN_FLIGHT = 4
+
     def __init__(self):
-        self.thumbnails = {}
-        self.widgets = defaultdict(list)
-        self.widget_processors: Dict[object, ThumbnailProcessor] = {}
-        self.queued_replies = set()
+        self.thumbnails = thumbnail_cache()
+        self.widgets: Dict[str, List[weakref.ref]] = {}
+        self.widget_processors: Dict[object, ThumbnailProcessor] = \
+            weakref.WeakKeyDictionary()
+        self.queued_replies: Dict[str, QNetworkReply] = {}
+
+        self._widget_urls: Dict[object, str] = weakref.WeakKeyDictionary()
+        self._widget_priorities: Dict[object, RequestPriority] = \
+            weakref.WeakKeyDictionary()
+        # priority values for URLs which are waiting to be downloaded
+        self._queued_urls: Dict[str, int] = {}
+        self._queue: List[Tuple[int, int, str]] = []
+        self._counter = itertools.count()
+        self._dispatch_scheduled = False
 
     def downloadThumbnail(self,
                           url: str,
                           widget,
-                          processor: Optional[ThumbnailProcessor] = None):
+                          processor: Optional[ThumbnailProcessor] = None,
+                          priority: RequestPriority =
+                          RequestPriority.Interactive):
         if not url and processor:
             thumbnail = processor.process_thumbnail(None)
             widget.setThumbnail(thumbnail)
             return
 
-        if url in self.thumbnails:
-            thumbnail = self.thumbnails[url]
+        thumbnail = self.thumbnails.get(url)
+        if thumbnail is not None:
             if processor:
                 thumbnail = processor.process_thumbnail(thumbnail)
             widget.setThumbnail(thumbnail)
+            return
+
+        self.release_widget(widget)
+
+        if processor:
+            self.widget_processors[widget] = processor
+        self._widget_urls[widget] = url
+        self._widget_priorities[widget] = priority
+
+        if url in self.widgets:
+            # already queued, just wait for the existing download
+            self.widgets[url].append(weakref.ref(widget))
+            self._update_url_priority(url)
+            return
+
+        self.widgets[url] = [weakref.ref(widget)]
+        self._enqueue(url, priority.value)
+
+    def set_priority(self, widget, priority: RequestPriority):
+        """
+        Changes the priority of the pending download for a widget.
+
+        Has no effect if the widget is not waiting on a download, or
+        if the download has already started.
+        """
+        if self._widget_priorities.get(widget) in (None, priority):
+            return
+
+        self._widget_priorities[widget] = priority
+        self._update_url_priority(self._widget_urls[widget])
+
+    def release_widget(self, widget):
+        """
+        Stops delivering the pending download for a widget to it.
+
+        Queued downloads which no other widget is waiting on are
+        discarded.
+        """
+        url = self._widget_urls.pop(widget, None)
+        self._widget_priorities.pop(widget, None)
+        self.widget_processors.pop(widget, None)
+        if url is None:
+            return
+
+        self.widgets[url] = [ref for ref in self.widgets.get(url, [])
+                             if ref() is not None and ref() is not widget]
+        if not self.widgets[url] and url in self._queued_urls:
+            del self.widgets[url]
+            del self._queued_urls[url]
+
+    def cancel_orphaned_downloads(self):
+        """
+        Cancels all queued and in flight downloads which no widget
+        is waiting on
+        """
+        for url in list(self._queued_urls.keys()):
+            if not self._waiting_widgets(url, remove=False):
+                self.widgets.pop(url, None)
+                del self._queued_urls[url]
+
+        for url, reply in list(self.queued_replies.items()):
+            if not self._waiting_widgets(url, remove=False) and \
+                    not sip.isdeleted(reply):
+                reply.abort()
+
+    def _update_url_priority(self, url: str):
+        """
+        Re-queues a queued URL using the highest priority of the
+        widgets waiting on it
+        """
+        if url not in self._queued_urls:
+            return
+
+        priorities = [self._widget_priorities.get(w,
+                                                  RequestPriority.Background)
+                      for w in self._waiting_widgets(url, remove=False)]
+        if not priorities:
+            return
+
+        value = min(p.value for p in priorities)
+        if value != self._queued_urls[url]:
+            self._enqueue(url, value)
+
+    def _enqueue(self, url: str, priority: int):
+        """
+        Adds a URL to the download queue.
+
+        Downloads are started on the next event loop iteration, so that
+        widgets created together can adjust their priorities before any
+        downloads start.
+        """
+        # any previous queue entry for the URL becomes stale, and is
+        # skipped when it is popped
+        self._queued_urls[url] = priority
+        heapq.heappush(self._queue, (priority, next(self._counter), url))
+
+        if not self._dispatch_scheduled:
+            self._dispatch_scheduled = True
+            QTimer.singleShot(0, self._dispatch)
+
+    def _dispatch(self):
+        """
+        Starts queued downloads, up to the maximum number of downloads
+        in flight
+        """
+        self._dispatch_scheduled = False
+        while self._queue and len(self.queued_replies) < self.MAX_IN_FLIGHT:
+            priority, _, url = heapq.heappop(self._queue)
+            if self._queued_urls.get(url) != priority:
+                continue
+
+            del self._queued_urls[url]
+            self._start(url)
+
+    def _start(self, url: str):
+        """
+        Starts the download for a URL
+        """
+        req = QNetworkRequest(QUrl(url))
+        req.setAttribute(QNetworkRequest.CacheLoadControlAttribute,
+                         QNetworkRequest.PreferCache)
+        req.setAttribute(QNetworkRequest.CacheSaveControlAttribute, True)
+        reply = QgsNetworkAccessManager.instance().get(req)
+        self.queued_replies[url] = reply
+        if reply.isFinished():
+            self.thumbnailDownloaded(reply, url)
         else:
-            self.widgets[url].append(widget)
-            if processor:
-                self.widget_processors[widget] = processor
+            reply.finished.connect(
+                partial(self.thumbnailDownloaded, reply, url))
 
-            req = QNetworkRequest(QUrl(url))
-            req.setAttribute(QNetworkRequest.CacheLoadControlAttribute,
-                             QNetworkRequest.PreferCache)
-            req.setAttribute(QNetworkRequest.CacheSaveControlAttribute, True)
-            reply = QgsNetworkAccessManager.instance().get(req)
-            self.queued_replies.add(reply)
-            if reply.isFinished():
-                self.thumbnailDownloaded(reply)
-            else:
-                reply.finished.connect(
-                    partial(self.thumbnailDownloaded, reply))
+    def _waiting_widgets(self, url: str, remove: bool = True) -> list:
+        """
+        Returns the widgets waiting on a URL, skipping any which have
+        since been deleted.
 
-    def thumbnailDownloaded(self, reply):
-        self.queued_replies.remove(reply)
-        if reply.error() == QNetworkReply.NoError:
-            url = reply.url().toString()
-            img = QImage()
-            img.loadFromData(reply.readAll())
-            self.thumbnails[url] = img
-            for w in self.widgets[url]:
-                thumbnail_image = QImage(img)
-                if w in self.widget_processors:
-                    thumbnail_image = \
-                        self.widget_processors[w].process_thumbnail(
-                            thumbnail_image
-                        )
-                    del self.widget_processors[w]
-
-                try:
-                    w.setThumbnail(thumbnail_image)
-                except Exception:
-                    # the widget might have been deleted
-                    pass
+        If remove is True then the widgets will no longer wait on the URL.
+        """
+        widgets = []
+        refs = self.widgets.pop(url, []) if remove else \
+            self.widgets.get(url, [])
+        for ref in refs:
+            w = ref()
+            if w is None:
+                continue
+            if isinstance(w, sip.simplewrapper) and sip.isdeleted(w):
+                continue
+            widgets.append(w)
+
+        if remove:
+            for w in widgets:
+                self._widget_urls.pop(w, None)
+                self._widget_priorities.pop(w, None)
+        return widgets
+
+    def thumbnailDownloaded(self, reply, url: str):
+        if self.queued_replies.get(url) is reply:
+            del self.queued_replies[url]
+        QTimer.singleShot(0, self._dispatch)
+
+        if reply.error() != QNetworkReply.NoError:
+            for w in self._waiting_widgets(url):
+                self.widget_processors.pop(w, None)
+            reply.deleteLater()
+            return
+
+        # widgets may continue to join the url's waiting list while
+        # the image is decoded
+        data = reply.readAll().data()
+        reply.deleteLater()
+        run_thumbnail_job(partial(self._thumbnail_decoded, url),
+                          decode_image, data)
+
+    def _thumbnail_decoded(self, url: str, img: Optional[QImage]):
+        widgets = self._waiting_widgets(url)
+        if img is None:
+            for w in widgets:
+                self.widget_processors.pop(w, None)
+            return
+
+        self.thumbnails.insert(url, img)
+        for w in widgets:
+            thumbnail_image = QImage(img)
+            processor = self.widget_processors.pop(w, None)
+            if processor:
+                thumbnail_image = processor.process_thumbnail(
+                    thumbnail_image
+                )
+
+            try:
+                w.setThumbnail(thumbnail_image)
+            except Exception:
+                # the widget might have been deleted
+                pass
 
 
 _thumbnailManager = ThumbnailManager()
 
 
+def thumbnail_manager() -> ThumbnailManager:
+    """
+    Returns the shared thumbnail manager
+    """
+    return _thumbnailManager
+
+
 def downloadThumbnail(url: str,
                       widget,
-                      processor: Optional[ThumbnailProcessor] = None):
-    _thumbnailManager.downloadThumbnail(url, widget, processor)
+                      processor: Optional[ThumbnailProcessor] = None,
+                      priority: RequestPriority = RequestPriority.Interactive):
+    _thumbnailManager.downloadThumbnail(url, widget, processor, priority)
@@ -0,0 +1,366 @@
+import locale
+import os
+from functools import partial
+from typing import (
+    Optional,
+    Set
+)
+
+from qgis.PyQt import sip
+from qgis.PyQt.QtCore import QDir
+from qgis.PyQt.QtWidgets import (
+    QDialog,
+    QDialogButtonBox,
+    QFormLayout,
+    QLabel,
+    QSizePolicy,
+    QSpinBox,
+    QVBoxLayout,
+    QWidget
+)
+from qgis.core import (
+    Qgis,
+    QgsCoordinateReferenceSystem,
+    QgsCoordinateTransform,
+    QgsCsException,
+    QgsApplication,
+    QgsProject,
+    QgsRasterLayer,
+    QgsRectangle,
+    QgsSettings
+)
+from qgis.gui import (
+    QgsGui,
+    QgsMessageBar,
+    QgsFileWidget
+)
+from qgis.utils import iface
+
+from .extentselectionpanel import ExtentSelectionPanel
+from ..api import (
+    Dataset,
+    KoordinatesClient,
+    LayerUtils,
+    RequestPriority
+)
+from ..api.wmts_capabilities import WmtsCapabilities
+from ..core import TileExportTask
+
+# running export tasks, kept alive until they complete
+_ACTIVE_TASKS: Set[TileExportTask] = set()
+
+
+class TileExportDialog(QDialog):
+    """
+    A dialog for exporting the tiles for a dataset over an extent to an
+    MBTiles file, for offline use
+    """
+
+    # exports larger than this are refused, as they would take a
+    # very long time and produce huge files
+    MAX_TILES = 250000
+    DEFAULT_MAX_ZOOM = 14
+
+    def __init__(self, dataset: Dataset, parent: Optional[QWidget] = None):
+        parent = parent or iface.mainWindow()
+        super().__init__(parent)
+
+        self.dataset = dataset
+        self._capabilities: Optional[WmtsCapabilities] = None
+        self._styles_ready = False
+
+        self.setObjectName('TileExportDialog')
+        self.setWindowTitle(
+            self.tr('Export for Offline Use — {}').format(dataset.title()))
+        QgsGui.enableAutoGeometryRestore(self)
+
+        layout = QVBoxLayout()
+
+        self.bar = QgsMessageBar()
+        self.bar.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Fixed)
+        layout.addWidget(self.bar)
+
+        self.extent_panel = ExtentSelectionPanel(self)
+        self.extent_panel.combo_mode.currentIndexChanged.connect(
+            self._update_tile_count)
+        layout.addWidget(self.extent_panel)
+
+        form_layout = QFormLayout()
+        self.min_zoom_spin = QSpinBox()
+        self.max_zoom_spin = QSpinBox()
+        for spin in (self.min_zoom_spin, self.max_zoom_spin):
+            spin.setRange(0, self.DEFAULT_MAX_ZOOM)
+        self.max_zoom_spin.setValue(self.DEFAULT_MAX_ZOOM)
+        form_layout.addRow(self.tr('Minimum zoom level'),
+                           self.min_zoom_spin)
+        form_layout.addRow(self.tr('Maximum zoom level'),
+                           self.max_zoom_spin)
+
+        self.dest_widget = QgsFileWidget()
+        self.dest_widget.setDialogTitle(self.tr('Export Tiles To'))
+        self.dest_widget.setStorageMode(QgsFileWidget.StorageMode.SaveFile)
+        self.dest_widget.setFilter(self.tr('MBTiles (*.mbtiles)'))
+        self.dest_widget.setDefaultRoot(
+            QgsSettings().value("koordinates/lastDir", QDir.homePath(), str,
+                                QgsSettings.Plugins)
+        )
+        form_layout.addRow(self.tr('Destination'), self.dest_widget)
+
+        self.tile_count_label = QLabel()
+        form_layout.addRow(self.tr('Tiles'), self.tile_count_label)
+        layout.addLayout(form_layout)
+
+        for spin in (self.min_zoom_spin, self.max_zoom_spin):
+            spin.valueChanged.connect(self._update_tile_count)
+
+        self.button_box = QDialogButtonBox(
+            QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        self.button_box.accepted.connect(self.accept)
+        self.button_box.rejected.connect(self.reject)
+        layout.addWidget(self.button_box)
+        self._update_ok_enabled()
+
+        self.setLayout(layout)
+
+        # the same style as layers added to the project
+        dataset.styles_async(self._styles_retrieved)
+        KoordinatesClient.instance().wmts_capabilities_async(
+            dataset,
+            callback=self._capabilities_retrieved,
+            priority=RequestPriority.Interactive)
+
+        self._update_tile_count()
+
+    def _styles_retrieved(self, _):
+        """
+        Called when the dataset styles are available
+        """
+        if sip.isdeleted(self):
+            return
+
+        self._styles_ready = True
+        self._update_ok_enabled()
+
+    def _update_ok_enabled(self):
+        """
+        Enables the OK button once all details required for the export
+        are available
+        """
+        self.button_box.button(QDialogButtonBox.Ok).setEnabled(
+            self._styles_ready and self._capabilities is not None)
+
+    def _capabilities_retrieved(self, content: Optional[bytes]):
+        """
+        Called when the WMTS capabilities for the dataset are available
+        """
+        if sip.isdeleted(self):
+            return
+
+        try:
+            self._capabilities = WmtsCapabilities(content) \
+                if content else None
+        except ValueError:
+            self._capabilities = None
+
+        if self._capabilities is None:
+            self.bar.pushMessage(
+                self.tr('Could not retrieve the tile service details'),
+                Qgis.Warning)
+            return
+
+        zoom_levels = len(self._capabilities.tile_matrices(
+            LayerUtils.WMTS_TILE_MATRIX_SET))
+        if zoom_levels:
+            for spin in (self.min_zoom_spin, self.max_zoom_spin):
+                spin.setMaximum(zoom_levels - 1)
+
+        self._update_ok_enabled()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # the dialog is hidden while an extent is drawn on the map
+        self._update_tile_count()
+
+    def extent(self) -> Optional[QgsRectangle]:
+        """
+        Returns the selected extent in EPSG:4326, or None if no valid
+        extent is selected
+        """
+        extent = self.extent_panel.getExtent()
+        if extent is None or extent.isEmpty():
+            return None
+
+        transform = QgsCoordinateTransform(
+            extent.crs(),
+            QgsCoordinateReferenceSystem('EPSG:4326'),
+            QgsProject.instance()
+        )
+        try:
+            extent = transform.transformBoundingBox(extent)
+        except QgsCsException:
+            return None
+
+        extent = extent.intersect(QgsRectangle(-180, -90, 180, 90))
+        if extent.isEmpty():
+            return None
+
+        return extent
+
+    def tile_count(self) -> Optional[int]:
+        """
+        Returns the number of tiles for the current settings, or None
+        if no valid extent is selected
+        """
+        extent = self.extent()
+        if extent is None:
+            return None
+
+        return TileExportTask.tile_count(extent,
+                                         self.min_zoom_spin.value(),
+                                         self.max_zoom_spin.value())
+
+    def _update_tile_count(self):
+        """
+        Updates the estimated tile count
+        """
+        if self.max_zoom_spin.value() < self.min_zoom_spin.value():
+            self.tile_count_label.setText(self.tr('Invalid zoom range'))
+            return
+
+        count = self.tile_count()
+        if count is None:
+            self.tile_count_label.setText(self.tr('Invalid extent'))
+        else:
+            self.tile_count_label.setText(
+                locale.format_string("%d", count, grouping=True))
+
+    def accept(self):
+        count = self.tile_count()
+        if count is None:
+            self.bar.pushMessage(self.tr('Invalid extent value'),
+                                 Qgis.Warning, duration=5)
+            return
+
+        if self.max_zoom_spin.value() < self.min_zoom_spin.value():
+            self.bar.pushMessage(self.tr('Invalid zoom range'),
+                                 Qgis.Warning, duration=5)
+            return
+
+        if count > self.MAX_TILES:
+            self.bar.pushMessage(
+                self.tr('Too many tiles. Select a smaller extent or '
+                        'reduce the maximum zoom level'),
+                Qgis.Warning, duration=5)
+            return
+
+        if not self.destination():
+            self.bar.pushMessage(
+                self.tr('Destination must not be empty'),
+                Qgis.Warning, duration=5)
+            return
+
+        task = self.create_task()
+        if task is None:
+            self.bar.pushMessage(
+                self.tr('This dataset does not support tile export'),
+                Qgis.Warning, duration=5)
+            return
+
+        QgsSettings().setValue(
+            "koordinates/lastDir",
+            os.path.dirname(self.destination()),
+            QgsSettings.Plugins
+        )
+
+        start_tile_export(task)
+        super().accept()
+
+    def destination(self) -> str:
+        """
+        Returns the destination file
+        """
+        path = self.dest_widget.filePath()
+        if path and not path.lower().endswith('.mbtiles'):
+            path += '.mbtiles'
+        return path
+
+    def create_task(self) -> Optional[TileExportTask]:
+        """
+        Creates the export task for the current settings
+        """
+        if self._capabilities is None:
+            return None
+
+        style_id = self.dataset.default_style_id()
+        source = '{}|{}|{}'.format(self.dataset.id,
+                                   '' if style_id is None else style_id,
+                                   LayerUtils.WMTS_TILE_MATRIX_SET)
+
+        # resumed exports must use the same color as the existing tiles
+        color = TileExportTask.resume_metadata(
+            self.destination(), source).get('koordinates_color') or \
+            LayerUtils.get_random_color_string()
+
+        layer_identifier = LayerUtils.wmts_layer_identifier(self.dataset.id)
+        template = self._capabilities.tile_url_template(
+            layer_identifier,
+            LayerUtils.wmts_style(style_id, color),
+            LayerUtils.WMTS_TILE_MATRIX_SET
+        )
+        if not template:
+            return None
+
+        tile_format = self._capabilities.tile_format(layer_identifier) or ''
+        return TileExportTask(
+            self.tr('Exporting {}').format(self.dataset.title()),
+            template,
+            self.extent(),
+            self.min_zoom_spin.value(),
+            self.max_zoom_spin.value(),
+            self.destination(),
+            self.dataset.title(),
+            source,
+            tile_format='jpg' if 'jpeg' in tile_format else 'png',
+            metadata={'koordinates_color': color}
+        )
+
+
+def start_tile_export(task: TileExportTask):
+    """
+    Starts a tile export task, adding the exported tiles to the project
+    as a local layer once the export is complete
+    """
+    _ACTIVE_TASKS.add(task)
+    task.taskCompleted.connect(partial(_tile_export_completed, task))
+    task.taskTerminated.connect(partial(_tile_export_failed, task))
+    QgsApplication.taskManager().addTask(task)
+
+
+def _tile_export_completed(task: TileExportTask):
+    """
+    Called when a tile export task completes successfully
+    """
+    _ACTIVE_TASKS.discard(task)
+    layer = QgsRasterLayer(task.destination, task.name, 'gdal')
+    if layer.isValid():
+        QgsProject.instance().addMapLayer(layer)
+    else:
+        iface.messageBar().pushMessage(
+            'Could not load exported tiles from {}'.format(task.destination),
+            Qgis.Warning,
+            duration=5)
+
+
+def _tile_export_failed(task: TileExportTask):
+    """
+    Called when a tile export task fails or is canceled
+    """
+    _ACTIVE_TASKS.discard(task)
+    if task.isCanceled():
+        return
+
+    iface.messageBar().pushMessage(
+        'Tile export failed for {}: {}. Export to the same file again to '
+        'resume.'.format(task.name, task.error or 'unknown error'),
+        Qgis.Warning,
+        duration=0)
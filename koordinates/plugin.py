@@ -21,6 +21,7 @@ from .gui import (
     KoordinatesDataItemProvider,
     OperationManagerMessageBarBridge
 )
+from .gui.footprint_overlay import unload_footprint_overlay
 
 
 class KoordinatesPlugin:
@@ -72,6 +73,8 @@ class KoordinatesPlugin:
 
         self.iface.removePluginMenu("Koordinates", self.explorerAction)
 
+        unload_footprint_overlay()
+
         if self.data_item_provider and \
                 not sip.isdeleted(self.data_item_provider):
             QgsApplication.dataItemProviderRegistry().removeProvider(
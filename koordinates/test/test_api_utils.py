@@ -13,8 +13,12 @@ __date__ = '12/09/2022'
 __license__ = "GPL"
 __copyright__ = 'Copyright 2022, Koordinates'
 
+import datetime
+import timeit
 import unittest
 
+from dateutil import parser
+
 from ..api import (
     ApiUtils,
     DataType,
@@ -181,6 +185,114 @@ class TestApiUtils(unittest.TestCase):
                                'user_capabilities': ['can-clone']}
             }), {Capability.Clone, Capability.Add})
 
+    def test_repository_url(self):
+        """
+        Test retrieving repository URLs from response
+        """
+        self.assertIsNone(ApiUtils.repository_url_from_dataset_response(
+            {'type': 'layer', 'kind': 'vector'}))
+        self.assertIsNone(ApiUtils.repository_url_from_dataset_response(
+            {'type': 'layer', 'kind': 'vector',
+             'repository': {'id': 'something'}}))
+        self.assertEqual(ApiUtils.repository_url_from_dataset_response(
+            {'type': 'layer', 'kind': 'vector',
+             'repository': 'https://koordinates.com/repos/1/'}),
+            'https://koordinates.com/repos/1/')
+        self.assertIsNone(ApiUtils.repository_url_from_dataset_response(
+            {'type': 'repo',
+             'repository': 'https://koordinates.com/repos/1/'}))
+
+    def test_parse_datetime(self):
+        utc = datetime.timezone.utc
+        self.assertEqual(ApiUtils.parse_datetime('2022-10-14T00:09:21Z'),
+                         datetime.datetime(2022, 10, 14, 0, 9, 21,
+                                           tzinfo=utc))
+        self.assertEqual(
+            ApiUtils.parse_datetime('2022-11-30T22:01:56.979877Z'),
+            datetime.datetime(2022, 11, 30, 22, 1, 56, 979877, tzinfo=utc))
+        self.assertEqual(
+            ApiUtils.parse_datetime('2022-11-30T22:01:56.979+12:00'),
+            datetime.datetime(2022, 11, 30, 10, 1, 56, 979000, tzinfo=utc))
+        self.assertEqual(ApiUtils.parse_datetime('2022-10-14'),
+                         datetime.datetime(2022, 10, 14))
+        # formats which require the dateutil fallback
+        self.assertEqual(ApiUtils.parse_datetime('2022-10-14T00:09:21.5Z'),
+                         datetime.datetime(2022, 10, 14, 0, 9, 21, 500000,
+                                           tzinfo=utc))
+        self.assertEqual(ApiUtils.parse_datetime('14 Oct 2022'),
+                         datetime.datetime(2022, 10, 14))
+
+    def test_parse_datetime_matches_dateutil(self):
+        """
+        Compares parse_datetime against dateutil for representative API
+        timestamps
+        """
+        for text in ('2022-10-14T00:09:21Z',
+                     '2022-11-30T22:01:56.979877Z',
+                     '2022-11-30T22:01:56.979+12:00',
+                     '2022-11-30T22:01:56-05:30',
+                     '2022-10-14T00:09:21',
+                     '2022-10-14T00:09:21.123456',
+                     '2022-10-14'):
+            self.assertEqual(ApiUtils.parse_datetime(text),
+                             parser.parse(text), text)
+
+    def test_parse_datetime_benchmark(self):
+        """
+        Benchmarks parse_datetime against dateutil for 10,000 timestamps
+        """
+        start = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+        texts = []
+        for i in range(5000):
+            value = start + datetime.timedelta(minutes=37 * i,
+                                               microseconds=i)
+            texts.append(value.strftime('%Y-%m-%dT%H:%M:%SZ'))
+            texts.append(value.strftime('%Y-%m-%dT%H:%M:%S.%fZ'))
+
+        fast = timeit.timeit(
+            lambda: [ApiUtils.parse_datetime(text) for text in texts],
+            number=1)
+        slow = timeit.timeit(
+            lambda: [parser.parse(text) for text in texts],
+            number=1)
+        self.assertLess(fast, slow)
+
+    def test_search(self):
+        """
+        Test local search helpers
+        """
+        self.assertEqual(ApiUtils.search_terms(None), [])
+        self.assertEqual(ApiUtils.search_terms(' Road  Centre '),
+                         ['road', 'centre'])
+
+        self.assertTrue(ApiUtils.search_narrows('roa', ''))
+        self.assertTrue(ApiUtils.search_narrows('road', 'roa'))
+        self.assertTrue(ApiUtils.search_narrows('road c', 'road'))
+        self.assertTrue(ApiUtils.search_narrows('Road  C', 'road'))
+        self.assertFalse(ApiUtils.search_narrows('road', 'road'))
+        self.assertFalse(ApiUtils.search_narrows('road ', 'Road'))
+        self.assertFalse(ApiUtils.search_narrows('roa', 'road'))
+        self.assertFalse(ApiUtils.search_narrows('rail', 'road'))
+        self.assertFalse(ApiUtils.search_narrows('', 'road'))
+
+        dataset = {
+            'title': 'NZ Road Centrelines',
+            'description': 'Road centrelines for New Zealand',
+            'publisher': {'name': 'LINZ'}
+        }
+        self.assertTrue(ApiUtils.dataset_matches_search(dataset, []))
+        self.assertTrue(ApiUtils.dataset_matches_search(
+            dataset, ApiUtils.search_terms('road centre')))
+        self.assertTrue(ApiUtils.dataset_matches_search(
+            dataset, ApiUtils.search_terms('zealand')))
+        self.assertFalse(ApiUtils.dataset_matches_search(
+            dataset, ApiUtils.search_terms('linz roads')))
+        self.assertTrue(ApiUtils.dataset_matches_search(
+            dataset, ApiUtils.search_terms('linz')))
+        self.assertFalse(ApiUtils.dataset_matches_search(
+            {'title': None, 'publisher': None},
+            ApiUtils.search_terms('road')))
+
 
 if __name__ == '__main__':
     unittest.main()
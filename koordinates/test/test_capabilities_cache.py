@@ -0,0 +1,141 @@
+# coding=utf-8
+"""Tests WMTS capabilities cache
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+from ..api.capabilities_cache import CapabilitiesCache
+from ..api.layer_utils import LayerUtils
+
+QGIS_APP = get_qgis_app()
+
+
+class TestCapabilitiesCache(unittest.TestCase):
+    """
+    Test the CapabilitiesCache class
+    """
+
+    def test_url(self):
+        """
+        Test capabilities URLs
+        """
+        url = LayerUtils.wmts_capabilities_url(123, 'xxx')
+        self.assertEqual(
+            url,
+            'https://koordinates.com/services;key=xxx/wmts/1.0.0/layer/'
+            '123/WMTSCapabilities.xml')
+        # API keys must not be stored
+        self.assertNotIn('xxx', CapabilitiesCache.cache_key(url))
+
+    def test_version(self):
+        """
+        Test capabilities versions
+        """
+        self.assertEqual(
+            CapabilitiesCache.version_for_details(
+                {'published_at': '2022-01-01T00:00:00Z'}),
+            CapabilitiesCache.version_for_details(
+                {'published_at': '2022-01-01T00:00:00Z',
+                 'title': 'changed'}))
+        self.assertNotEqual(
+            CapabilitiesCache.version_for_details(
+                {'published_at': '2022-01-01T00:00:00Z'}),
+            CapabilitiesCache.version_for_details(
+                {'published_at': '2023-01-01T00:00:00Z'}))
+
+    def test_store(self):
+        """
+        Test storing and retrieving documents
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'cache.sqlite')
+            cache = CapabilitiesCache(path)
+            self.assertIsNone(cache.lookup('https://a', '1'))
+
+            cache.store('https://a', '1', b'<Capabilities/>')
+            self.assertEqual(cache.lookup('https://a', '1'),
+                             b'<Capabilities/>')
+            # other versions must not be returned
+            self.assertIsNone(cache.lookup('https://a', '2'))
+            self.assertIsNone(cache.lookup('https://b', '1'))
+
+            # must persist between sessions
+            cache = CapabilitiesCache(path)
+            self.assertEqual(cache.lookup('https://a', '1'),
+                             b'<Capabilities/>')
+
+            # new versions replace the old version
+            cache.store('https://a', '2', b'<Capabilities2/>')
+            self.assertIsNone(cache.lookup('https://a', '1'))
+            self.assertEqual(cache.lookup('https://a', '2'),
+                             b'<Capabilities2/>')
+            self.assertEqual(cache.count(), 1)
+
+            cache.clear()
+            self.assertEqual(cache.count(), 0)
+
+    def test_eviction(self):
+        """
+        Test that the least recently used documents are evicted
+        """
+        cache = CapabilitiesCache(':memory:', max_documents=2)
+        cache.store('https://a', '1', b'a')
+        cache.store('https://b', '1', b'b')
+        # mark a as recently used
+        self.assertEqual(cache.lookup('https://a', '1'), b'a')
+
+        cache.store('https://c', '1', b'c')
+        self.assertEqual(cache.count(), 2)
+        self.assertEqual(cache.lookup('https://a', '1'), b'a')
+        self.assertIsNone(cache.lookup('https://b', '1'))
+        self.assertEqual(cache.lookup('https://c', '1'), b'c')
+
+    def test_access_batching(self):
+        """
+        Test that access times are written in batches
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'cache.sqlite')
+            cache = CapabilitiesCache(path)
+            cache.store('https://a', '1', b'a')
+
+            def last_access() -> int:
+                connection = sqlite3.connect(path)
+                try:
+                    return connection.execute(
+                        'SELECT last_access FROM capabilities'
+                    ).fetchone()[0]
+                finally:
+                    connection.close()
+
+            stored_access = last_access()
+            self.assertEqual(cache.lookup('https://a', '1'), b'a')
+            self.assertEqual(last_access(), stored_access)
+
+            cache.flush()
+            self.assertGreater(last_access(), stored_access)
+
+            # access times continue from the stored values
+            cache = CapabilitiesCache(path)
+            self.assertEqual(cache.lookup('https://a', '1'), b'a')
+            cache.flush()
+            self.assertEqual(last_access(), stored_access + 2)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestCapabilitiesCache)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
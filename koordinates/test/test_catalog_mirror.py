@@ -0,0 +1,125 @@
+# coding=utf-8
+"""Tests catalog mirror
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import os
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+from ..api.catalog_mirror import CatalogMirror
+
+QGIS_APP = get_qgis_app()
+
+DATASETS = [
+    {'id': 1, 'title': 'NZ Road Centrelines',
+     'description': 'Road centrelines for New Zealand',
+     'publisher': {'id': 'site:1', 'name': 'LINZ'}},
+    {'id': 2, 'title': 'NZ Building Outlines',
+     'description': 'Outlines of buildings',
+     'publisher': {'id': 'site:1', 'name': 'LINZ'}},
+    {'id': 3, 'title': 'Rail lines',
+     'description': 'Railway network, including roadside sidings',
+     'publisher': {'id': 'site:2', 'name': 'Transport Agency'}},
+]
+
+
+@unittest.skipUnless(CatalogMirror.is_available(), 'FTS5 is not available')
+class TestCatalogMirror(unittest.TestCase):
+    """
+    Test the CatalogMirror class
+    """
+
+    @staticmethod
+    def ids(datasets):
+        return [dataset['id'] for dataset in datasets]
+
+    def test_match_expression(self):
+        """
+        Test converting searches to match expressions
+        """
+        self.assertIsNone(CatalogMirror.match_expression(None))
+        self.assertIsNone(CatalogMirror.match_expression('  '))
+        self.assertEqual(CatalogMirror.match_expression('Road'), '"road"*')
+        self.assertEqual(CatalogMirror.match_expression('nz "ro'),
+                         '"nz" """ro"*')
+
+    def test_search(self):
+        """
+        Test searching mirrored datasets
+        """
+        mirror = CatalogMirror(':memory:')
+        mirror.store_datasets(DATASETS)
+        self.assertEqual(mirror.dataset_count(), 3)
+
+        # title matches rank above description matches
+        self.assertEqual(self.ids(mirror.search('road', 10)), [1, 3])
+        self.assertEqual(self.ids(mirror.search('ro', 10)), [1, 3])
+        self.assertEqual(self.ids(mirror.search('NZ outlines', 10)), [2])
+        self.assertCountEqual(self.ids(mirror.search('linz', 10)), [1, 2])
+        self.assertEqual(self.ids(mirror.search('"', 10)), [])
+        self.assertEqual(mirror.search('nothing', 10), [])
+
+        # empty searches return the most recently seen datasets
+        self.assertEqual(self.ids(mirror.search('', 2)), [3, 2])
+
+        # updated datasets must replace the existing index entries
+        mirror.store_datasets([{'id': 1, 'title': 'Street centrelines',
+                                'publisher': {'id': 'site:1',
+                                              'name': 'LINZ'}}])
+        self.assertEqual(mirror.dataset_count(), 3)
+        self.assertEqual(self.ids(mirror.search('road', 10)), [3])
+        self.assertEqual(self.ids(mirror.search('street', 10)), [1])
+        self.assertEqual(self.ids(mirror.search('', 1)), [1])
+
+        self.assertEqual(mirror.publisher('site:2'),
+                         {'id': 'site:2', 'name': 'Transport Agency'})
+        self.assertIsNone(mirror.publisher('site:3'))
+
+        mirror.clear()
+        self.assertEqual(mirror.dataset_count(), 0)
+        self.assertEqual(mirror.search('linz', 10), [])
+
+    def test_eviction(self):
+        """
+        Test least recently seen datasets are evicted
+        """
+        mirror = CatalogMirror(':memory:', max_datasets=2)
+        mirror.store_datasets(DATASETS[:2])
+        mirror.store_datasets(DATASETS[:1])
+        mirror.store_datasets(DATASETS[2:])
+        self.assertEqual(mirror.dataset_count(), 2)
+        self.assertEqual(self.ids(mirror.search('', 10)), [3, 1])
+        self.assertEqual(mirror.search('building', 10), [])
+
+    def test_facets(self):
+        """
+        Test storing facets
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'catalog.sqlite')
+            mirror = CatalogMirror(path)
+            self.assertIsNone(mirror.facets('a'))
+            mirror.store_facets('a', {'category': [], 'from': 'all'})
+            mirror.store_datasets(DATASETS)
+
+            # must persist between sessions
+            mirror = CatalogMirror(path)
+            self.assertEqual(mirror.facets('a'),
+                             {'category': [], 'from': 'all'})
+            self.assertEqual(self.ids(mirror.search('rail', 10)), [3])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestCatalogMirror)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -20,6 +20,7 @@ from qgis.PyQt.QtCore import (
     QTime,
     QDateTime
 )
+from qgis.core import QgsRectangle
 
 from ..api import (
     DataBrowserQuery,
@@ -362,6 +363,22 @@ class TestDataBrowser(unittest.TestCase):
         self.assertEqual(SortOrder.to_text(SortOrder.AlphabeticalZA), 'Alphabetical (Z-A)')
         self.assertEqual(SortOrder.to_text(SortOrder.Oldest), 'Oldest')
 
+    def test_extent(self):
+        query = DataBrowserQuery()
+        self.assertFalse(query.has_filters())
+        query.extent = QgsRectangle(170.5, -45, 175, -40.25)
+        self.assertEqual(query.build_query(),
+                         {'sort': 'popularity',
+                          'bbox': '170.500000,-45.000000,175.000000,-40.250000',
+                          'kind': ['layer', 'table', 'set', 'document']})
+
+        # the search string, extent and order aren't filters
+        query.search = 'roads'
+        query.order = SortOrder.AlphabeticalAZ
+        self.assertFalse(query.has_filters())
+        query.data_types = {DataType.Rasters}
+        self.assertTrue(query.has_filters())
+
     def test_capabilities(self):
         """
         Test capabilities for different data types
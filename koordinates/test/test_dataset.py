@@ -21,7 +21,8 @@ from .utilities import get_qgis_app
 from ..api import (
     Dataset,
     DataType,
-    Capability
+    Capability,
+    KoordinatesClient
 )
 
 QGIS_APP = get_qgis_app()
@@ -96,3 +97,115 @@ class TestDataset(unittest.TestCase):
             self.assertEqual(point_cloud_dataset.id, 'aaa')
             self.assertEqual(point_cloud_dataset.capabilities,
                              {Capability.Clone, Capability.Add})
+
+    def test_publisher(self):
+        """
+        Test that datasets share publisher objects
+        """
+        dataset1 = Dataset({'id': 'aaa',
+                            'publisher': {'id': 'p1', 'name': 'pub'}})
+        dataset2 = Dataset({'id': 'bbb',
+                            'publisher': {'id': 'p1', 'name': 'pub'}})
+        dataset3 = Dataset({'id': 'ccc',
+                            'publisher': {'id': 'p2', 'name': 'pub 2'}})
+        self.assertEqual(dataset1.publisher().name(), 'pub')
+        self.assertIs(dataset1.publisher(), dataset1.publisher())
+        self.assertIs(dataset1.publisher(), dataset2.publisher())
+        self.assertIsNot(dataset1.publisher(), dataset3.publisher())
+        self.assertIsNone(Dataset({'id': 'ddd'}).publisher())
+
+    def test_lazy_fields(self):
+        """
+        Test lazily computed dataset fields
+        """
+        dataset = Dataset({'id': 'aaa',
+                           'type': 'layer',
+                           'kind': 'vector',
+                           'data': {'crs': {'id': 'EPSG:2193'}}})
+        self.assertEqual(dataset.datatype, DataType.Vectors)
+        self.assertEqual(dataset.crs.id(), 'EPSG:2193')
+        self.assertIs(dataset.crs, dataset.crs)
+        self.assertIsNone(dataset.gridded_extent)
+        self.assertIsNone(dataset.created_at_date())
+        with self.assertRaises(AttributeError):
+            dataset.some_attribute = 1
+
+    def test_identity_map(self):
+        """
+        Test that the client shares dataset objects
+        """
+        client = KoordinatesClient.instance()
+        details = {'id': 12345,
+                   'type': 'layer',
+                   'kind': 'vector',
+                   'title': 'old title',
+                   'styles': [{'id': 1,
+                               'url': 'http://style',
+                               'description': '',
+                               'name': 'style'}]}
+        dataset = client.dataset(details)
+        self.assertEqual(len(dataset.styles()), 1)
+
+        other = client.dataset({'id': 12345,
+                                'type': 'layer',
+                                'kind': 'vector',
+                                'title': 'new title'})
+        self.assertIs(other, dataset)
+        self.assertEqual(dataset.title(), 'new title')
+        # the original details may be shared, so must not be modified
+        self.assertEqual(details['title'], 'old title')
+        # previously retrieved styles must be retained
+        self.assertEqual(len(other.styles()), 1)
+
+        self.assertIsNot(client.dataset({'id': 12346}), dataset)
+
+        # older details, e.g. from cached query results, don't overwrite
+        # fresher details
+        dataset = client.dataset({'id': 12347,
+                                  'title': 'fresh title',
+                                  'updated_at': '2022-10-14T00:09:21Z'})
+        client.dataset({'id': 12347,
+                        'title': 'stale title',
+                        'description': 'description',
+                        'updated_at': '2022-10-13T00:09:21Z'})
+        self.assertEqual(dataset.title(), 'fresh title')
+        self.assertEqual(dataset.details['description'], 'description')
+        self.assertEqual(dataset.details['updated_at'],
+                         '2022-10-14T00:09:21Z')
+
+        client.dataset({'id': 12347,
+                        'title': 'newer title',
+                        'updated_at': '2022-10-15T00:09:21Z'})
+        self.assertEqual(dataset.title(), 'newer title')
+
+    def test_styles_async(self):
+        """
+        Test retrieving styles asynchronously
+        """
+        dataset = Dataset({'id': 'aaa',
+                           'type': 'layer',
+                           'kind': 'vector',
+                           'styles': [{'id': 3,
+                                       'url': 'http://style1',
+                                       'description': '',
+                                       'name': 'style 1'},
+                                      {'id': 4,
+                                       'url': 'http://style2',
+                                       'description': '',
+                                       'name': 'style 2'}]})
+        self.assertIsNone(dataset.default_style_id())
+
+        results = []
+        dataset.styles_async(results.append)
+        # styles embedded in the details are available immediately
+        self.assertEqual([[style.id() for style in styles]
+                          for styles in results], [[3, 4]])
+        self.assertEqual(dataset.default_style_id(), 3)
+
+        dataset = Dataset({'id': 'bbb',
+                           'type': 'layer',
+                           'kind': 'vector'})
+        results = []
+        dataset.styles_async(results.append)
+        self.assertEqual(results, [[]])
+        self.assertIsNone(dataset.default_style_id())
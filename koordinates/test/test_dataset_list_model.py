@@ -0,0 +1,168 @@
+# coding=utf-8
+"""Tests dataset list model
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import unittest
+
+from qgis.PyQt.QtCore import (
+    Qt,
+    QCoreApplication
+)
+from qgis.PyQt.QtWidgets import QLabel
+
+from .utilities import get_qgis_app
+from ..gui.dataset_list_model import DatasetListModel
+from ..gui.response_table_layout import ResponsiveTableWidget
+
+QGIS_APP = get_qgis_app()
+
+
+class TestDatasetListModel(unittest.TestCase):
+    """
+    Test the DatasetListModel class
+    """
+
+    @staticmethod
+    def ids(model: DatasetListModel):
+        return [dataset['id'] for dataset in model.datasets]
+
+    def test_set_datasets(self):
+        """
+        Test diffing datasets by ID
+        """
+        model = DatasetListModel()
+        datasets = [{'id': i, 'title': str(i)} for i in range(1, 6)]
+        model.set_datasets(datasets)
+        self.assertEqual(self.ids(model), [1, 2, 3, 4, 5])
+
+        signals = []
+        model.rowsInserted.connect(
+            lambda _, first, last: signals.append(('insert', first, last)))
+        model.rowsRemoved.connect(
+            lambda _, first, last: signals.append(('remove', first, last)))
+        model.rowsMoved.connect(
+            lambda *args: signals.append(('move', args[1], args[4])))
+        model.dataChanged.connect(
+            lambda first, last: signals.append(('change', first.row())))
+        model.modelReset.connect(lambda: signals.append(('reset',)))
+
+        # reordering must move the existing rows
+        model.set_datasets(list(reversed(datasets)))
+        self.assertEqual(self.ids(model), [5, 4, 3, 2, 1])
+        self.assertEqual({s[0] for s in signals}, {'move'})
+
+        # removing and inserting only touches the differences
+        signals.clear()
+        model.set_datasets([datasets[4], {'id': 6, 'title': '6'},
+                            {'id': 7, 'title': '7'}, datasets[2],
+                            datasets[1]])
+        self.assertEqual(self.ids(model), [5, 6, 7, 3, 2])
+        self.assertEqual(signals, [('remove', 4, 4), ('remove', 1, 1),
+                                   ('insert', 1, 2)])
+
+        # changed datasets are updated in place
+        signals.clear()
+        model.set_datasets([datasets[4], {'id': 6, 'title': '6'},
+                            {'id': 7, 'title': 'seven'}, datasets[2],
+                            datasets[1]])
+        self.assertEqual(model.datasets[2]['title'], 'seven')
+        self.assertEqual(signals, [('change', 2)])
+
+        # duplicate IDs can't be diffed
+        signals.clear()
+        model.set_datasets([datasets[0], datasets[0]])
+        self.assertEqual(self.ids(model), [1, 1])
+        self.assertEqual(signals, [('reset',)])
+
+        signals.clear()
+        model.set_datasets([])
+        self.assertEqual(model.rowCount(), 0)
+
+    def test_table_selection(self):
+        """
+        Test selecting datasets in a results table
+        """
+        table = ResponsiveTableWidget()
+        datasets = [{'id': i, 'title': str(i)} for i in range(1, 7)]
+        table.set_datasets(datasets)
+
+        changes = []
+        table.selection_changed.connect(lambda: changes.append(True))
+
+        def click(row: int, modifiers):
+            table.card_selection_requested(table._cards[row], int(modifiers))
+
+        self.assertEqual(table.selected_datasets(), [])
+        click(3, Qt.ControlModifier)
+        click(1, Qt.ControlModifier)
+        self.assertEqual([d['id'] for d in table.selected_datasets()], [2, 4])
+        self.assertTrue(changes)
+
+        # ctrl click toggles
+        click(3, Qt.ControlModifier)
+        self.assertEqual([d['id'] for d in table.selected_datasets()], [2])
+
+        # shift click selects a range from the last ctrl clicked card
+        click(4, Qt.ShiftModifier)
+        self.assertEqual([d['id'] for d in table.selected_datasets()], [4, 5])
+        click(5, Qt.ControlModifier)
+        click(0, Qt.ShiftModifier | Qt.ControlModifier)
+        self.assertEqual([d['id'] for d in table.selected_datasets()],
+                         [1, 2, 3, 4, 5, 6])
+
+        # the selection follows datasets when results are updated in place
+        table.clear_selection()
+        click(2, Qt.ControlModifier)
+        click(4, Qt.ControlModifier)
+        table.set_datasets([datasets[4], datasets[0], datasets[1]])
+        self.assertEqual([d['id'] for d in table.selected_datasets()], [5])
+
+        changes.clear()
+        table.clear()
+        self.assertEqual(table.selected_datasets(), [])
+        self.assertTrue(changes)
+
+    def test_table_push_widget(self):
+        """
+        Test laying out a widget pushed to a visible results table
+        """
+        table = ResponsiveTableWidget()
+        table.resize(400, 1000)
+        table.show()
+        table.set_datasets([{'id': 1, 'title': '1'}])
+        table.layout().setGeometry(table.rect())
+        height = table.content_height()
+        spacing = table.layout().verticalSpacing()
+
+        widget = QLabel('Load more...')
+        widget.setFixedHeight(21)
+        table.push_widget(widget)
+        # the new widget is only shown by a queued call, so is still
+        # hidden when the content height is calculated straight away
+        self.assertTrue(widget.isHidden())
+        self.assertEqual(table.content_height(), height)
+
+        QCoreApplication.processEvents()
+        self.assertFalse(widget.isHidden())
+        table.layout().setGeometry(table.rect())
+        self.assertEqual(widget.geometry().top(), height)
+        self.assertEqual(widget.geometry().height(), 21)
+        self.assertEqual(table.content_height(), height + 21 + spacing)
+
+        widget.hide()
+        self.assertEqual(table.content_height(), height)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestDatasetListModel)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,138 @@
+# coding=utf-8
+"""Tests dataset extent index
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import unittest
+
+from qgis.core import QgsRectangle
+
+from .utilities import get_qgis_app
+from ..api.extent_index import DatasetExtentIndex
+
+QGIS_APP = get_qgis_app()
+
+
+def dataset(dataset_id: int, title: str,
+            x_min: float, y_min: float, x_max: float, y_max: float):
+    return {
+        'id': dataset_id,
+        'title': title,
+        'data': {
+            'extent': {
+                'type': 'Polygon',
+                'coordinates': [[[x_min, y_min], [x_max, y_min],
+                                 [x_max, y_max], [x_min, y_max],
+                                 [x_min, y_min]]]
+            }
+        }
+    }
+
+
+class TestDatasetExtentIndex(unittest.TestCase):
+    """
+    Test the DatasetExtentIndex class
+    """
+
+    @staticmethod
+    def ids(datasets):
+        return [d['id'] for d in datasets]
+
+    def test_intersecting(self):
+        """
+        Test finding datasets by extent
+        """
+        index = DatasetExtentIndex()
+        index.add_datasets([
+            dataset(1, 'Wellington roads', 174.6, -41.4, 175.0, -41.1),
+            dataset(2, 'Auckland roads', 174.5, -37.1, 175.0, -36.7),
+            dataset(3, 'NZ buildings', 166, -47.5, 178.6, -34),
+            {'id': 4, 'title': 'No extent'}
+        ])
+        self.assertEqual(len(index), 3)
+
+        wellington = QgsRectangle(174.7, -41.35, 174.9, -41.2)
+        self.assertEqual(self.ids(index.intersecting(wellington)), [1, 3])
+        self.assertEqual(self.ids(index.intersecting(wellington, 'ROADS')),
+                         [1])
+        self.assertEqual(
+            self.ids(index.intersecting(QgsRectangle(0, 0, 1, 1))), [])
+
+        # updated datasets replace the existing entries
+        index.add_datasets([
+            dataset(1, 'Wellington roads', 172, -44, 173, -43)
+        ])
+        self.assertEqual(len(index), 3)
+        self.assertEqual(self.ids(index.intersecting(wellington)), [3])
+        self.assertEqual(
+            self.ids(index.intersecting(QgsRectangle(172.5, -43.5,
+                                                     172.6, -43.4))),
+            [1, 3])
+
+        index.clear()
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.intersecting(wellington), [])
+
+    def test_coverage(self):
+        """
+        Test tracking completely retrieved extents
+        """
+        index = DatasetExtentIndex()
+        roads = dataset(1, 'Wellington roads', 174.6, -41.4, 175.0, -41.1)
+        # matched by the server on fields other than the title
+        transport = dataset(2, 'Transport', 174.6, -41.4, 175.0, -41.1)
+        rail = dataset(3, 'Wellington railroads', 174.6, -41.4, 175.0, -41.1)
+        index.add_datasets([roads, transport, rail])
+
+        region = QgsRectangle(174, -42, 176, -40)
+        inside = QgsRectangle(174.5, -41.5, 175, -41)
+        self.assertFalse(index.is_covered(inside, None))
+        self.assertIsNone(index.covered_datasets(inside, None))
+
+        index.mark_covered(region, 'road', [roads, transport])
+        self.assertTrue(index.is_covered(inside, 'road'))
+        self.assertTrue(index.is_covered(region, 'Road'))
+        # the results are those retrieved from the server, not local
+        # matches for the search
+        self.assertEqual(self.ids(index.covered_datasets(inside, 'road')),
+                         [1, 2])
+        # the server's results for narrower searches aren't necessarily
+        # a subset of the covered results
+        self.assertFalse(index.is_covered(inside, 'roads'))
+        self.assertIsNone(index.covered_datasets(inside, 'roads'))
+        self.assertFalse(index.is_covered(inside, 'rail'))
+        self.assertFalse(index.is_covered(inside, None))
+        self.assertFalse(
+            index.is_covered(QgsRectangle(173, -41.5, 175, -41), 'road'))
+
+        # an empty search is answered with the datasets retrieved for it,
+        # not every dataset retrieved for other queries
+        other = dataset(4, 'Private roads', 174.6, -41.4, 175.0, -41.1)
+        index.add_datasets([other])
+        index.mark_covered(QgsRectangle(170, -45, 180, -35), '',
+                           [roads, transport, rail])
+        self.assertTrue(index.is_covered(inside, None))
+        self.assertEqual(self.ids(index.covered_datasets(inside, '')),
+                         [1, 2, 3])
+        self.assertEqual(
+            self.ids(index.covered_datasets(QgsRectangle(171, -44, 172, -43),
+                                            '')),
+            [])
+        self.assertFalse(index.is_covered(inside, 'rail'))
+
+        index.clear()
+        self.assertFalse(index.is_covered(inside, None))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestDatasetExtentIndex)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
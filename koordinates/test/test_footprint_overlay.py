@@ -0,0 +1,106 @@
+# coding=utf-8
+"""Tests footprint overlay
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import unittest
+
+from qgis.PyQt.QtCore import QPointF
+from qgis.core import (
+    QgsPointXY,
+    QgsRectangle
+)
+
+from .utilities import get_qgis_app
+from ..gui.footprint_overlay import (
+    FootprintCanvasItem,
+    FootprintOverlay
+)
+
+QGIS_APP = get_qgis_app()
+
+
+def dataset(dataset_id: int,
+            x_min: float, y_min: float, x_max: float, y_max: float):
+    return {
+        'id': dataset_id,
+        'title': str(dataset_id),
+        'data': {
+            'extent': {
+                'type': 'Polygon',
+                'coordinates': [[[x_min, y_min], [x_max, y_min],
+                                 [x_max, y_max], [x_min, y_max],
+                                 [x_min, y_min]]]
+            }
+        }
+    }
+
+
+class TestFootprintOverlay(unittest.TestCase):
+    """
+    Test the FootprintOverlay class
+    """
+
+    def test_map_to_item_transform(self):
+        """
+        Test calculating the map to item transform
+        """
+        extent = QgsRectangle(1000, 2000, 1400, 2200)
+        transform = FootprintCanvasItem.map_to_item_transform(
+            extent,
+            QPointF(10, 20), QPointF(410, 20), QPointF(10, 220)
+        )
+        self.assertEqual(transform.map(QPointF(1000, 2200)), QPointF(10, 20))
+        self.assertEqual(transform.map(QPointF(1400, 2000)),
+                         QPointF(410, 220))
+        self.assertEqual(transform.map(QPointF(1200, 2100)),
+                         QPointF(210, 120))
+
+    def test_hit_testing(self):
+        """
+        Test finding datasets from footprints
+        """
+        overlay = FootprintOverlay()
+        owner = object()
+        overlay.show_datasets(owner, [
+            dataset(1, 170, -45, 175, -40),
+            dataset(2, 174, -42, 175, -41),
+            {'id': 3, 'title': 'no extent'}
+        ])
+        self.assertEqual(sorted(overlay.dataset_ids_in_extent(
+            QgsRectangle(174.5, -41.5, 174.6, -41.4))), ['1', '2'])
+        # the smallest footprint wins
+        self.assertEqual(overlay.dataset_at(QgsPointXY(174.5, -41.5)), '2')
+        self.assertEqual(overlay.dataset_at(QgsPointXY(171, -44)), '1')
+        self.assertIsNone(overlay.dataset_at(QgsPointXY(0, 0)))
+
+        overlay.set_highlighted(2)
+        self.assertEqual(overlay.highlighted(), '2')
+        overlay.set_highlighted(3)
+        self.assertIsNone(overlay.highlighted())
+
+        # removed datasets are no longer highlighted
+        overlay.set_highlighted(2)
+        overlay.show_datasets(owner, [dataset(1, 170, -45, 175, -40)])
+        self.assertIsNone(overlay.highlighted())
+        self.assertEqual(overlay.dataset_at(QgsPointXY(174.5, -41.5)), '1')
+
+        # only the owner can release the footprints
+        overlay.release(object())
+        self.assertEqual(overlay.dataset_at(QgsPointXY(171, -44)), '1')
+        overlay.release(owner)
+        self.assertIsNone(overlay.dataset_at(QgsPointXY(171, -44)))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestFootprintOverlay)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
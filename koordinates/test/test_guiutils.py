@@ -42,6 +42,22 @@ class GuiUtilsTest(unittest.TestCase):
                       GuiUtils.get_icon_svg('filter.svg'))
         self.assertFalse(GuiUtils.get_icon_svg('not_an_icon.svg'))
 
+    def testGetSvgAsImage(self):
+        """
+        Tests get_svg_as_image
+        """
+        image = GuiUtils.get_svg_as_image('filter.svg', 20, 30)
+        self.assertFalse(image.isNull())
+        self.assertEqual(image.width(), 20)
+        self.assertEqual(image.height(), 30)
+        self.assertTrue(
+            GuiUtils.get_svg_as_image('not_an_icon.svg', 20, 20).isNull())
+
+        # modifying a returned image must not affect the cached image
+        image.fill(0xffff0000)
+        self.assertNotEqual(
+            GuiUtils.get_svg_as_image('filter.svg', 20, 30), image)
+
     def testGetUiFilePath(self):
         """
         Tests get_ui_file_path svg path
@@ -0,0 +1,100 @@
+# coding=utf-8
+"""Tests metadata cache
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import os
+import tempfile
+import unittest
+
+from .utilities import get_qgis_app
+from ..api.metadata_cache import MetadataCache
+
+QGIS_APP = get_qgis_app()
+
+
+class TestMetadataCache(unittest.TestCase):
+    """
+    Test the MetadataCache class
+    """
+
+    def test_cache_key(self):
+        """
+        Test cache keys
+        """
+        self.assertEqual(MetadataCache.cache_key('https://a', 'key 1'),
+                         MetadataCache.cache_key('https://a', 'key 1'))
+        self.assertNotEqual(MetadataCache.cache_key('https://a', 'key 1'),
+                            MetadataCache.cache_key('https://a', 'key 2'))
+        self.assertNotEqual(MetadataCache.cache_key('https://a', 'key 1'),
+                            MetadataCache.cache_key('https://b', 'key 1'))
+        self.assertNotIn('key 1', MetadataCache.cache_key('https://a', 'key 1'))
+
+    def test_store(self):
+        """
+        Test storing and retrieving documents
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'cache.sqlite')
+            cache = MetadataCache(path)
+            self.assertIsNone(cache.lookup('a'))
+
+            cache.store('a', b'{"id": 1}', '"etag"', None)
+            cached = cache.lookup('a')
+            self.assertEqual(cached.content, b'{"id": 1}')
+            self.assertEqual(cached.etag, '"etag"')
+            self.assertIsNone(cached.last_modified)
+            self.assertEqual(cache.size(), 9)
+
+            # must persist between sessions
+            cache = MetadataCache(path)
+            self.assertEqual(cache.lookup('a').content, b'{"id": 1}')
+
+            cache.remove('a')
+            self.assertIsNone(cache.lookup('a'))
+            self.assertEqual(cache.size(), 0)
+
+    def test_eviction(self):
+        """
+        Test least recently used documents are evicted
+        """
+        original_size = MetadataCache.max_size() // (1024 * 1024)
+        MetadataCache.set_max_size(1)
+        try:
+            cache = MetadataCache(':memory:')
+            content = b'x' * 400 * 1024
+            cache.store('a', content, '"a"', None)
+            cache.store('b', content, '"b"', None)
+            cache.touch('a')
+            cache.store('c', content, '"c"', None)
+
+            self.assertIsNotNone(cache.lookup('a'))
+            self.assertIsNone(cache.lookup('b'))
+            self.assertIsNotNone(cache.lookup('c'))
+        finally:
+            MetadataCache.set_max_size(original_size)
+
+    def test_statistics(self):
+        """
+        Test hit and miss counters
+        """
+        cache = MetadataCache(':memory:')
+        self.assertEqual(cache.statistics(), {'hits': 0, 'misses': 0})
+        cache.record_hit()
+        cache.record_miss()
+        cache.record_miss()
+        self.assertEqual(cache.statistics(), {'hits': 1, 'misses': 2})
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestMetadataCache)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,132 @@
+# coding=utf-8
+"""Tests query result cache
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import unittest
+
+from .utilities import get_qgis_app
+from ..api import (
+    DataBrowserQuery,
+    DataType,
+    KoordinatesClient,
+    QueryResultCache,
+    SortOrder
+)
+
+QGIS_APP = get_qgis_app()
+
+
+class TestQueryResultCache(unittest.TestCase):
+    """
+    Test the QueryResultCache class
+    """
+
+    def test_canonical_key(self):
+        """
+        Test canonical query keys
+        """
+        self.assertEqual(
+            QueryResultCache.canonical_key('data/', {'a': 1, 'b': [1, 2]}),
+            QueryResultCache.canonical_key('data/', {'b': [1, 2], 'a': 1}))
+        self.assertNotEqual(
+            QueryResultCache.canonical_key('data/', {'a': 1}),
+            QueryResultCache.canonical_key('data/', {'a': 2}))
+        self.assertNotEqual(
+            QueryResultCache.canonical_key('data/', {'a': 1}),
+            QueryResultCache.canonical_key('users/me/data/', {'a': 1}))
+        self.assertNotEqual(
+            QueryResultCache.canonical_key('data/', {'a': 1}, 'key 1'),
+            QueryResultCache.canonical_key('data/', {'a': 1}, 'key 2'))
+
+    def test_datasets_query_key(self):
+        """
+        Test datasets query keys
+        """
+        client = KoordinatesClient.instance()
+        query = DataBrowserQuery()
+        query.data_types = {DataType.Rasters}
+
+        same_query = DataBrowserQuery()
+        same_query.data_types = {DataType.Rasters}
+
+        other_query = DataBrowserQuery()
+        other_query.data_types = {DataType.Grids}
+
+        self.assertEqual(client.datasets_query_key(1, query),
+                         client.datasets_query_key(1, same_query))
+        self.assertNotEqual(client.datasets_query_key(1, query),
+                            client.datasets_query_key(2, query))
+        self.assertNotEqual(client.datasets_query_key(1, query),
+                            client.datasets_query_key(1, other_query))
+        self.assertNotEqual(
+            client.datasets_query_key(1, query),
+            client.datasets_query_key(1, query, {'type': 'user'}))
+
+        # facets don't depend on the page or result order
+        sorted_query = DataBrowserQuery()
+        sorted_query.data_types = {DataType.Rasters}
+        sorted_query.order = SortOrder.AlphabeticalAZ
+        self.assertNotEqual(client.datasets_query_key(1, query),
+                            client.datasets_query_key(1, sorted_query))
+        self.assertEqual(
+            client.datasets_query_key(1, query, is_facets=True),
+            client.datasets_query_key(2, sorted_query, is_facets=True))
+        self.assertNotEqual(
+            client.datasets_query_key(1, query, is_facets=True),
+            client.datasets_query_key(1, query))
+
+    def test_cache(self):
+        """
+        Test storing and retrieving results
+        """
+        cache = QueryResultCache()
+        self.assertIsNone(cache.lookup('a'))
+        cache.insert('a', [1, 2, 3])
+        self.assertEqual(cache.lookup('a').value, [1, 2, 3])
+        self.assertTrue(cache.lookup('a').is_fresh())
+
+        cache.remove('a')
+        self.assertIsNone(cache.lookup('a'))
+
+    def test_expiry(self):
+        """
+        Test stale and expired results
+        """
+        cache = QueryResultCache(fresh_seconds=0)
+        cache.insert('a', 1)
+        # stale, but not expired
+        self.assertEqual(cache.lookup('a').value, 1)
+        self.assertFalse(cache.lookup('a').is_fresh())
+
+        cache = QueryResultCache(ttl_seconds=0)
+        cache.insert('a', 1)
+        self.assertIsNone(cache.lookup('a'))
+
+    def test_max_entries(self):
+        """
+        Test least recently used results are evicted
+        """
+        cache = QueryResultCache(max_entries=2)
+        cache.insert('a', 1)
+        cache.insert('b', 2)
+        cache.lookup('a')
+        cache.insert('c', 3)
+        self.assertIsNotNone(cache.lookup('a'))
+        self.assertIsNone(cache.lookup('b'))
+        self.assertIsNotNone(cache.lookup('c'))
+        self.assertEqual(len(cache), 2)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestQueryResultCache)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
@@ -0,0 +1,382 @@
+# coding=utf-8
+"""Tests request engine
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import gc
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from qgis.PyQt.QtCore import QUrl
+from qgis.PyQt.QtNetwork import QNetworkRequest
+
+from .utilities import get_qgis_app
+from ..api import (
+    ApiRequest,
+    KoordinatesClient,
+    RequestEngine,
+    RequestPriority
+)
+
+QGIS_APP = get_qgis_app()
+
+
+def parse_json(reply):
+    return json.loads(reply.readAll().data().decode())
+
+
+class TestRequestEngine(unittest.TestCase):
+    """
+    Test the RequestEngine class
+    """
+
+    def write_json(self, dir_name: str, name: str, content) -> QNetworkRequest:
+        """
+        Writes a JSON file, returning a network request for it
+        """
+        path = os.path.join(dir_name, name)
+        with open(path, 'wt') as f:
+            f.write(json.dumps(content))
+
+        return QNetworkRequest(QUrl.fromLocalFile(path))
+
+    def test_completed(self):
+        """
+        Test already completed requests
+        """
+        request = ApiRequest.completed({'a': 1})
+        self.assertTrue(request.is_finished())
+        self.assertFalse(request.is_canceled())
+        self.assertEqual(request.result(), {'a': 1})
+
+        results = []
+        request.add_callback(results.append)
+        self.assertEqual(results, [{'a': 1}])
+
+    def test_request(self):
+        """
+        Test a basic request
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine()
+            results = []
+            request = engine.submit(
+                self.write_json(tmpdirname, 'a.json', {'id': 1}),
+                parse_json
+            )
+            request.add_callback(results.append)
+            request.wait()
+
+            self.assertTrue(request.is_finished())
+            self.assertIsNone(request.error_string())
+            self.assertEqual(request.result(), {'id': 1})
+            self.assertEqual(results, [{'id': 1}])
+            self.assertEqual(engine.in_flight_count(), 0)
+
+    def test_parse_error(self):
+        """
+        Test a request with an invalid response
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, 'bad.json')
+            with open(path, 'wt') as f:
+                f.write('not json')
+
+            engine = RequestEngine()
+            request = engine.submit(QNetworkRequest(QUrl.fromLocalFile(path)),
+                                    parse_json)
+            request.wait()
+            self.assertTrue(request.is_finished())
+            self.assertTrue(request.error_string())
+            self.assertIsNone(request.result())
+
+    def test_parser_exception(self):
+        """
+        Test that unexpected parser exceptions still finish the request
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            def parser(reply):
+                return parse_json(reply)['missing']
+
+            engine = RequestEngine()
+            results = []
+            request = engine.submit(
+                self.write_json(tmpdirname, 'a.json', {'id': 1}),
+                parser)
+            request.add_callback(results.append)
+            request.wait()
+            self.assertTrue(request.is_finished())
+            self.assertEqual(request.error_string(), "'missing'")
+            self.assertIsNone(request.result())
+            self.assertEqual(results, [None])
+
+    def test_threaded(self):
+        """
+        Test requests parsed on a worker thread
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine()
+
+            parse_threads = []
+
+            def parser(reply):
+                parse_threads.append(threading.get_ident())
+                return parse_json(reply)
+
+            request = engine.submit(
+                self.write_json(tmpdirname, 'a.json', {'id': 1}),
+                parser, threaded=True)
+            request.wait()
+            self.assertTrue(request.is_finished())
+            self.assertIsNone(request.error_string())
+            self.assertEqual(request.result(), {'id': 1})
+            self.assertEqual(len(parse_threads), 1)
+            self.assertNotEqual(parse_threads[0], threading.get_ident())
+
+            path = os.path.join(tmpdirname, 'bad.json')
+            with open(path, 'wt') as f:
+                f.write('not json')
+
+            request = engine.submit(QNetworkRequest(QUrl.fromLocalFile(path)),
+                                    parse_json, threaded=True)
+            request.wait()
+            self.assertTrue(request.is_finished())
+            self.assertTrue(request.error_string())
+            self.assertIsNone(request.result())
+
+    def test_priority(self):
+        """
+        Test that queued requests are dispatched in priority order
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine(max_in_flight=1)
+
+            order = []
+            first = engine.submit(
+                self.write_json(tmpdirname, 'a.json', 'a'),
+                parse_json, RequestPriority.Background)
+            second = engine.submit(
+                self.write_json(tmpdirname, 'b.json', 'b'),
+                parse_json, RequestPriority.Background)
+            third = engine.submit(
+                self.write_json(tmpdirname, 'c.json', 'c'),
+                parse_json, RequestPriority.Interactive)
+            for request in (first, second, third):
+                request.add_callback(order.append)
+
+            self.assertEqual(engine.in_flight_count(), 1)
+            self.assertEqual(engine.queued_count(), 2)
+
+            first.wait()
+            third.wait()
+            second.wait()
+            self.assertEqual(order, ['a', 'c', 'b'])
+
+    def test_cancel(self):
+        """
+        Test canceling queued requests
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine(max_in_flight=1)
+
+            results = []
+            first = engine.submit(
+                self.write_json(tmpdirname, 'a.json', 'a'),
+                parse_json)
+            second = engine.submit(
+                self.write_json(tmpdirname, 'b.json', 'b'),
+                parse_json, RequestPriority.Background)
+            second.add_callback(results.append)
+
+            engine.cancel_all(RequestPriority.Background)
+            self.assertTrue(second.is_canceled())
+            self.assertFalse(first.is_canceled())
+            self.assertEqual(engine.queued_count(), 0)
+
+            first.wait()
+            self.assertEqual(first.result(), 'a')
+            self.assertEqual(results, [])
+
+    def test_cancel_in_flight(self):
+        """
+        Test canceling a request which has been dispatched
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine()
+
+            finished = []
+            results = []
+            request = engine.submit(
+                self.write_json(tmpdirname, 'a.json', 'a'),
+                parse_json)
+            request.add_callback(results.append)
+            request.finished.connect(finished.append)
+            self.assertTrue(request.is_started())
+
+            request.cancel()
+            self.assertTrue(request.is_finished())
+            self.assertTrue(request.is_canceled())
+            self.assertEqual(finished, [request])
+            self.assertEqual(results, [])
+            self.assertEqual(engine.in_flight_count(), 0)
+
+    def test_coalesce(self):
+        """
+        Test that concurrent identical client requests are coalesced
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            url = self.write_json(tmpdirname, 'a.json', {'id': 1}).url()
+
+            results = []
+            client = KoordinatesClient.instance()
+            first = client.get_json_async(url.toString(), results.append)
+            second = client.get_json_async(url.toString(), results.append,
+                                           RequestPriority.Background)
+            # each caller has a separate handle for the shared request
+            self.assertIsNot(first, second)
+            self.assertIs(first.shared_request(), second.shared_request())
+
+            first.wait()
+            self.assertTrue(second.is_finished())
+            self.assertEqual(results, [{'id': 1}, {'id': 1}])
+
+            # once finished, a new request must be made
+            third = client.get_json_async(url.toString())
+            self.assertIsNot(third, first)
+            third.wait()
+            self.assertEqual(third.result(), {'id': 1})
+
+    def test_client_errors(self):
+        """
+        Test that only failed blocking client requests report errors
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            url = QUrl.fromLocalFile(
+                os.path.join(tmpdirname, 'missing.json')).toString()
+
+            errors = []
+            client = KoordinatesClient.instance()
+            client.error_occurred.connect(errors.append)
+
+            # asynchronous requests are handled by their callers
+            request = client.get_json_async(url)
+            request.wait()
+            self.assertTrue(request.error_string())
+            self.assertEqual(errors, [])
+
+            self.assertEqual(client.get_json(url), {})
+            self.assertEqual(len(errors), 1)
+            client.error_occurred.disconnect(errors.append)
+
+    def test_prefetch_repositories(self):
+        """
+        Test prefetching repository details
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            client = KoordinatesClient.instance()
+            url = self.write_json(tmpdirname, 'repo.json',
+                                  {'id': 1}).url().toString()
+            missing = QUrl.fromLocalFile(
+                os.path.join(tmpdirname, 'missing.json')).toString()
+
+            finished = []
+            client.prefetch_repositories({url, missing},
+                                         lambda: finished.append(True))
+            client.repository_details_async(url).wait()
+            client.repository_details_async(missing).wait()
+            self.assertEqual(finished, [True])
+            self.assertEqual(client.cached_repository_details(url),
+                             {'id': 1})
+            # failures are retried
+            self.assertIsNone(client.cached_repository_details(missing))
+
+            # canceled requests still finish the prefetch
+            url = self.write_json(tmpdirname, 'canceled.json',
+                                  {'id': 2}).url().toString()
+            finished = []
+            client.prefetch_repositories({url},
+                                         lambda: finished.append(True))
+            request = client.get_json_async(url)
+            request.shared_request().cancel()
+            self.assertTrue(request.is_canceled())
+            self.assertEqual(finished, [True])
+            self.assertIsNone(client.cached_repository_details(url))
+
+    def test_cancel_shared(self):
+        """
+        Test canceling handles for a shared request
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine(max_in_flight=1)
+            engine.submit(self.write_json(tmpdirname, 'a.json', 'a'),
+                          parse_json)
+            request = engine.submit(
+                self.write_json(tmpdirname, 'b.json', 'b'),
+                parse_json)
+
+            first_results = []
+            second_results = []
+            first = request.share()
+            first.add_callback(first_results.append)
+            second = request.share()
+            second.add_callback(second_results.append)
+
+            # canceling one handle only detaches that caller
+            first.cancel()
+            self.assertTrue(first.is_canceled())
+            self.assertFalse(request.is_canceled())
+            self.assertFalse(second.is_finished())
+
+            second.wait()
+            self.assertEqual(second.result(), 'b')
+            self.assertEqual(second_results, ['b'])
+            self.assertEqual(first_results, [])
+
+            # the shared request is canceled with its last handle
+            request = engine.submit(
+                self.write_json(tmpdirname, 'c.json', 'c'),
+                parse_json)
+            first = request.share()
+            second = request.share()
+            first.cancel()
+            second.cancel()
+            self.assertTrue(request.is_canceled())
+
+            # handles for a finished request are finished immediately
+            handle = request.share()
+            self.assertTrue(handle.is_finished())
+            self.assertTrue(handle.is_canceled())
+
+    def test_unreferenced_handle(self):
+        """
+        Test that handles are kept alive until the shared request finishes
+        """
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            engine = RequestEngine()
+            request = engine.submit(
+                self.write_json(tmpdirname, 'a.json', 'a'),
+                parse_json)
+
+            results = []
+            request.share().add_callback(results.append)
+            gc.collect()
+
+            request.wait()
+            self.assertEqual(results, ['a'])
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestRequestEngine)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
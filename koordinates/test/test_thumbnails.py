@@ -0,0 +1,101 @@
+# coding=utf-8
+"""Tests thumbnail handling
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import unittest
+
+from qgis.PyQt.QtGui import QImage
+
+from .utilities import get_qgis_app
+from ..gui.thumbnails import (
+    CompositedThumbnailCache,
+    ThumbnailCache
+)
+
+QGIS_APP = get_qgis_app()
+
+
+class TestThumbnails(unittest.TestCase):
+    """
+    Test thumbnail handling
+    """
+
+    def test_cache(self):
+        """
+        Test storing and retrieving thumbnails
+        """
+        cache = ThumbnailCache()
+        self.assertIsNone(cache.get('a'))
+        self.assertNotIn('a', cache)
+
+        image = QImage(10, 10, QImage.Format_ARGB32)
+        cache.insert('a', image)
+        self.assertIn('a', cache)
+        self.assertEqual(cache.get('a').size(), image.size())
+        self.assertEqual(cache.size(), 400)
+
+        # replacing an image must not double count its size
+        cache.insert('a', image)
+        self.assertEqual(cache.size(), 400)
+        self.assertEqual(len(cache), 1)
+
+        cache.remove('a')
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.size(), 0)
+
+    def test_eviction(self):
+        """
+        Test least recently used thumbnails are evicted
+        """
+        original_size = ThumbnailCache.max_size() // (1024 * 1024)
+        composited_size = CompositedThumbnailCache.max_size()
+        ThumbnailCache.set_max_size(1)
+        try:
+            self.assertEqual(ThumbnailCache.max_size(), 1024 * 1024)
+            # each cache has a separate budget
+            self.assertEqual(CompositedThumbnailCache.max_size(),
+                             composited_size)
+
+            cache = ThumbnailCache()
+            # 400 KB each
+            image = QImage(320, 320, QImage.Format_ARGB32)
+            cache.insert('a', QImage(image))
+            cache.insert('b', QImage(image))
+            cache.get('a')
+            cache.insert('c', QImage(image))
+
+            self.assertIn('a', cache)
+            self.assertNotIn('b', cache)
+            self.assertIn('c', cache)
+            self.assertLessEqual(cache.size(), 1024 * 1024)
+        finally:
+            ThumbnailCache.set_max_size(original_size)
+
+    def test_composited_cache(self):
+        """
+        Test composited thumbnail cache
+        """
+        self.assertNotEqual(CompositedThumbnailCache.SIZE_SETTING,
+                            ThumbnailCache.SIZE_SETTING)
+
+        cache = CompositedThumbnailCache()
+        image = QImage(10, 10, QImage.Format_ARGB32)
+        cache.insert(('http://a', 300, 150, 1.0), image)
+        self.assertIn(('http://a', 300, 150, 1.0), cache)
+        self.assertNotIn(('http://a', 300, 150, 2.0), cache)
+        self.assertIsNone(cache.get(('http://a', 200, 150, 1.0)))
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestThumbnails)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)
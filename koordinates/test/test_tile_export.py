@@ -0,0 +1,324 @@
+# coding=utf-8
+"""Tests offline tile export
+
+.. note:: This program is free software; you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation; either version 2 of the License, or
+(at your option) any later version.
+"""
+
+__revision__ = '$Format:%H$'
+__license__ = "GPL"
+__copyright__ = 'Copyright 2022, Koordinates'
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer
+)
+
+from qgis.core import QgsRectangle
+
+from .utilities import get_qgis_app
+from ..api.layer_utils import LayerUtils
+from ..api.wmts_capabilities import WmtsCapabilities
+from ..core.tile_export_task import (
+    MBTilesStore,
+    TileExportTask
+)
+
+QGIS_APP = get_qgis_app()
+
+CAPABILITIES = b"""<?xml version="1.0" encoding="UTF-8"?>
+<Capabilities xmlns="http://www.opengis.net/wmts/1.0"
+    xmlns:ows="http://www.opengis.net/ows/1.1" version="1.0.0">
+  <Contents>
+    <Layer>
+      <ows:Identifier>layer-123</ows:Identifier>
+      <Format>image/png</Format>
+      <ResourceURL format="image/png" resourceType="tile"
+        template="https://tiles/layer/123/{Style}/{TileMatrixSet}/{TileMatrix}/{TileCol}/{TileRow}.png"/>
+    </Layer>
+    <TileMatrixSet>
+      <ows:Identifier>EPSG:3857</ows:Identifier>
+      <TileMatrix><ows:Identifier>0</ows:Identifier></TileMatrix>
+      <TileMatrix><ows:Identifier>1</ows:Identifier></TileMatrix>
+      <TileMatrix><ows:Identifier>2</ows:Identifier></TileMatrix>
+    </TileMatrixSet>
+  </Contents>
+</Capabilities>"""
+
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    """
+    Serves tiles for /{mode}/{zoom}/{column}/{row}.png requests.
+
+    Tiles in column 0 are missing, and all other tiles are identical.
+    In 'flaky' mode the first request for each tile fails, and in
+    'fail' mode all requests fail.
+    """
+
+    TILE = b'\x89PNG tile'
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        mode, zoom, column, row = \
+            self.path.strip('/').split('.')[0].split('/')
+        tile = (int(zoom), int(column), int(row))
+        with self.server.lock:
+            self.server.requests.append(tile)
+            attempts = self.server.requests.count(tile)
+
+        if mode == 'fail' or (mode == 'flaky' and attempts == 1):
+            self.send_response(500)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif column == '0':
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(self.TILE)))
+            self.end_headers()
+            self.wfile.write(self.TILE)
+
+    def log_message(self, *args):  # pylint: disable=arguments-differ
+        pass
+
+
+class TestTileExport(unittest.TestCase):
+    """
+    Test offline tile export
+    """
+
+    WORLD = QgsRectangle(-180, -85, 180, 85)
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                         TileRequestHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.requests = []
+        cls.server_thread = threading.Thread(
+            target=cls.server.serve_forever, daemon=True)
+        cls.server_thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        with self.server.lock:
+            self.server.requests.clear()
+
+    def template(self, mode: str = 'tiles') -> str:
+        """
+        Returns the tile URL template for the test server
+        """
+        return 'http://127.0.0.1:{}/{}/{{TileMatrix}}/{{TileCol}}/' \
+               '{{TileRow}}.png'.format(self.server.server_port, mode)
+
+    def task(self, path: str, mode: str = 'tiles', source: str = 'tiles',
+             max_zoom: int = 2, color: str = 'ff0000') -> TileExportTask:
+        """
+        Creates an export task for the test server
+        """
+        return TileExportTask('export', self.template(mode), self.WORLD,
+                              0, max_zoom, path, 'tiles', source,
+                              metadata={'koordinates_color': color})
+
+    def test_capabilities(self):
+        """
+        Test parsing WMTS capabilities
+        """
+        with self.assertRaises(ValueError):
+            WmtsCapabilities(b'not xml')
+
+        capabilities = WmtsCapabilities(CAPABILITIES)
+        self.assertEqual(
+            capabilities.tile_url_template(
+                LayerUtils.wmts_layer_identifier(123),
+                LayerUtils.wmts_style(None, 'red'),
+                LayerUtils.WMTS_TILE_MATRIX_SET),
+            'https://tiles/layer/123/style=auto,color=red/EPSG:3857/'
+            '{TileMatrix}/{TileCol}/{TileRow}.png')
+        self.assertIsNone(capabilities.tile_url_template(
+            'layer-456', 'style', 'EPSG:3857'))
+        self.assertEqual(capabilities.tile_format('layer-123'), 'image/png')
+        self.assertEqual(capabilities.tile_matrices('EPSG:3857'),
+                         ['0', '1', '2'])
+        self.assertEqual(capabilities.tile_matrices('EPSG:4326'), [])
+
+    def test_tile_range(self):
+        """
+        Test calculating tile ranges
+        """
+        world = QgsRectangle(-180, -90, 180, 90)
+        self.assertEqual(TileExportTask.tile_range(world, 0), (0, 0, 0, 0))
+        self.assertEqual(TileExportTask.tile_range(world, 2), (0, 3, 0, 3))
+        self.assertEqual(TileExportTask.tile_count(world, 0, 2), 21)
+
+        # north east quadrant
+        extent = QgsRectangle(10, 10, 20, 20)
+        self.assertEqual(TileExportTask.tile_range(extent, 1), (1, 1, 0, 0))
+        self.assertEqual(TileExportTask.tile_count(extent, 0, 1), 2)
+
+    def test_tile_url(self):
+        """
+        Test building tile URLs
+        """
+        task = TileExportTask('export',
+                              'https://tiles/{TileMatrix}/{TileCol}/'
+                              '{TileRow}.png',
+                              QgsRectangle(-180, -90, 180, 90),
+                              0, 1, '/tmp/tiles.mbtiles', 'tiles', 'a')
+        self.assertEqual(task.tile_url((3, 5, 2)),
+                         'https://tiles/3/5/2.png')
+
+    def test_store(self):
+        """
+        Test storing tiles in an MBTiles file
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tiles.mbtiles')
+            store = MBTilesStore(path)
+            store.set_metadata({'name': 'test', 'format': 'png'})
+            store.add_tile((1, 0, 0), b'a')
+            store.add_tile((1, 1, 0), b'a')
+            store.add_tile((1, 1, 1), b'b')
+            store.close()
+
+            store = MBTilesStore(path)
+            self.assertEqual(store.metadata(),
+                             {'name': 'test', 'format': 'png'})
+            self.assertEqual(store.tile_count(), 3)
+            # identical tiles are stored once
+            self.assertEqual(store.image_count(), 2)
+            # rows are converted to and from the TMS convention
+            self.assertEqual(store.existing_tiles(1),
+                             {(1, 0, 0), (1, 1, 0), (1, 1, 1)})
+            self.assertEqual(store.existing_tiles(2), set())
+
+            store.clear()
+            self.assertEqual(store.tile_count(), 0)
+            self.assertEqual(store.image_count(), 0)
+            self.assertEqual(store.metadata(), {})
+            store.close()
+
+    def test_export(self):
+        """
+        Test exporting and resuming an export
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tiles.mbtiles')
+
+            # failed requests are retried
+            task = self.task(path, mode='flaky')
+            self.assertTrue(task.run())
+            self.assertIsNone(task.error)
+            self.assertEqual(task.downloaded_count, 21)
+            self.assertEqual(task.skipped_count, 0)
+            self.assertEqual(task.failed_count, 0)
+            self.assertEqual(len(self.server.requests), 42)
+
+            store = MBTilesStore(path)
+            # missing tiles are not stored, and identical tiles are
+            # stored once
+            self.assertEqual(store.tile_count(), 14)
+            self.assertEqual(store.image_count(), 1)
+            self.assertEqual(store.existing_tiles(0), set())
+            self.assertEqual(store.existing_tiles(1), {(1, 1, 0), (1, 1, 1)})
+            metadata = store.metadata()
+            self.assertEqual(metadata['minzoom'], '0')
+            self.assertEqual(metadata['maxzoom'], '2')
+            self.assertEqual(metadata['koordinates_color'], 'ff0000')
+            store.close()
+
+            self.assertEqual(
+                TileExportTask.resume_metadata(path, 'tiles')[
+                    'koordinates_color'], 'ff0000')
+            self.assertEqual(TileExportTask.resume_metadata(path, 'other'),
+                             {})
+            self.assertEqual(TileExportTask.resume_metadata(
+                os.path.join(temp_dir, 'missing.mbtiles'), 'tiles'), {})
+
+            # resuming skips the stored tiles
+            self.server.requests.clear()
+            task = self.task(path)
+            self.assertTrue(task.run())
+            self.assertEqual(task.skipped_count, 14)
+            self.assertEqual(task.downloaded_count, 7)
+            self.assertEqual(len(self.server.requests), 7)
+            self.assertTrue(all(tile[1] == 0
+                                for tile in self.server.requests))
+
+            store = MBTilesStore(path)
+            self.assertEqual(store.tile_count(), 14)
+            self.assertEqual(store.image_count(), 1)
+            store.close()
+
+            # a different source replaces the existing tiles
+            task = self.task(path, source='other', max_zoom=1,
+                             color='00ff00')
+            self.assertTrue(task.run())
+            self.assertEqual(task.skipped_count, 0)
+            self.assertEqual(task.downloaded_count, 5)
+
+            store = MBTilesStore(path)
+            self.assertEqual(store.tile_count(), 2)
+            self.assertEqual(store.metadata()['maxzoom'], '1')
+            self.assertEqual(store.metadata()['koordinates_color'],
+                             '00ff00')
+            store.close()
+
+    def test_export_failure(self):
+        """
+        Test an export with tiles which can't be downloaded
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tiles.mbtiles')
+            task = self.task(path, mode='fail', max_zoom=1)
+            self.assertFalse(task.run())
+            self.assertEqual(task.failed_count, 5)
+            self.assertEqual(task.downloaded_count, 0)
+            self.assertTrue(task.error)
+            self.assertEqual(len(self.server.requests),
+                             5 * TileExportTask.MAX_ATTEMPTS)
+
+    def test_cancel(self):
+        """
+        Test canceling an export
+        """
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'tiles.mbtiles')
+            task = self.task(path, max_zoom=4)
+
+            def progress_changed(progress):
+                if progress > 0:
+                    task.cancel()
+
+            task.progressChanged.connect(progress_changed)
+            self.assertFalse(task.run())
+            self.assertTrue(task.isCanceled())
+            self.assertLess(len(self.server.requests),
+                            TileExportTask.tile_count(self.WORLD, 0, 4))
+
+            # the tiles downloaded before canceling can be resumed
+            store = MBTilesStore(path)
+            stored = store.tile_count()
+            store.close()
+
+            task = self.task(path, max_zoom=4)
+            self.assertTrue(task.run())
+            self.assertEqual(task.skipped_count, stored)
+
+
+if __name__ == "__main__":
+    suite = unittest.makeSuite(TestTileExport)
+    runner = unittest.TextTestRunner(verbosity=2)
+    runner.run(suite)